@@ -19,7 +19,7 @@ def analyze_3months_signals():
     # 获取数据（3个月约90根K线，OKX单次最多100根）
     fetcher = OKXDataFetcher('ARUSDT')
     print("📥 正在获取过去3个月的日线数据...")
-    df = fetcher.fetch_klines('1d', 100)  # OKX最多100根
+    df = fetcher.fetch_klines('ARUSDT', '1d', 100)
     
     print(f"✅ 获取到 {len(df)} 根K线数据")
     print(f"   数据范围: {df.index[0].strftime('%Y-%m-%d')} 到 {df.index[-1].strftime('%Y-%m-%d')}")
@@ -0,0 +1,108 @@
+"""
+并发获取引擎 - 基于 asyncio 同时获取多个交易对、多个周期的K线
+"""
+import asyncio
+import time
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+
+class AsyncFetchEngine:
+    """
+    多交易对 × 多周期并发获取引擎
+
+    每个 (交易对, 周期) 作为一个任务在线程中调用 OKXDataFetcher.fetch_klines，
+    复用其连接池、本地存储和回补逻辑；请求速率由获取器内的 OKX 令牌桶控制，
+    这里只限制同时在途的任务数（专用线程池，不受默认执行器线程数限制）。
+    获取器配置了基础周期时，每个交易对只作为一个任务，由 fetch_timeframes
+    请求一次基础周期并在本地合成其余周期。
+    """
+
+    def __init__(self, fetcher, max_concurrency: int = 16):
+        self.fetcher = fetcher
+        self.max_concurrency = max_concurrency
+
+    async def fetch(self, symbol: str, interval: str, limit: Optional[int],
+                    executor: ThreadPoolExecutor) -> Optional[pd.DataFrame]:
+        """获取单个 (交易对, 周期)，失败时返回 None"""
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(
+                executor, self.fetcher.fetch_klines, symbol, interval, limit
+            )
+        except Exception as e:
+            print(f"❌ 获取 {symbol} {interval} 数据失败: {e}")
+            return None
+
+    async def fetch_symbol(self, symbol: str, intervals: List[str], limit: Optional[int],
+                           executor: ThreadPoolExecutor) -> Dict[str, Optional[pd.DataFrame]]:
+        """由基础周期获取单个交易对的所有周期，失败时各周期均为 None"""
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(
+                executor, self.fetcher.fetch_timeframes, symbol, intervals, limit
+            )
+        except Exception as e:
+            print(f"❌ 获取 {symbol} {'/'.join(intervals)} 数据失败: {e}")
+            return {interval: None for interval in intervals}
+
+    async def fetch_all(self, symbols: List[str], intervals: List[str],
+                        limit: Optional[int] = None) -> Dict[str, Dict[str, Optional[pd.DataFrame]]]:
+        """
+        并发获取所有交易对的所有周期
+
+        Args:
+            limit: K线数量，默认为获取器中各 (交易对, 周期) 声明的所需数量
+
+        Returns:
+            {symbol: {interval: DataFrame 或 None}}
+        """
+        if getattr(self.fetcher, "base_interval", None):
+            return await self._fetch_all_by_symbol(symbols, intervals, limit)
+
+        tasks = [(symbol, interval) for symbol in symbols for interval in intervals]
+
+        started = time.perf_counter()
+        # 线程数即同时在途的任务数
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            frames = await asyncio.gather(*(
+                self.fetch(symbol, interval, limit, executor) for symbol, interval in tasks
+            ))
+        elapsed = time.perf_counter() - started
+
+        result: Dict[str, Dict[str, Optional[pd.DataFrame]]] = {symbol: {} for symbol in symbols}
+        for (symbol, interval), df in zip(tasks, frames):
+            result[symbol][interval] = df
+
+        print(f"✅ 并发获取 {len(symbols)} 个交易对 × {len(intervals)} 个周期，耗时 {elapsed:.2f}s")
+        return result
+
+    async def _fetch_all_by_symbol(self, symbols: List[str], intervals: List[str],
+                                   limit: Optional[int]) -> Dict[str, Dict[str, Optional[pd.DataFrame]]]:
+        """每个交易对一个任务：只请求基础周期"""
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            frames = await asyncio.gather(*(
+                self.fetch_symbol(symbol, intervals, limit, executor) for symbol in symbols
+            ))
+        elapsed = time.perf_counter() - started
+
+        print(f"✅ 并发获取 {len(symbols)} 个交易对 × {len(intervals)} 个周期"
+              f"（基础周期 {self.fetcher.base_interval}），耗时 {elapsed:.2f}s")
+        return dict(zip(symbols, frames))
+
+    def fetch_all_sync(self, symbols: List[str], intervals: List[str],
+                       limit: Optional[int] = None) -> Dict[str, Dict[str, Optional[pd.DataFrame]]]:
+        """
+        同步入口
+
+        asyncio.run 不能在运行中的事件循环里调用（如实时模式下 K 线收盘回调中），
+        此时在单独线程中启动新的事件循环并等待结果；协程代码应直接 await fetch_all。
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self.fetch_all(symbols, intervals, limit))
+        with ThreadPoolExecutor(max_workers=1) as runner:
+            return runner.submit(asyncio.run, self.fetch_all(symbols, intervals, limit)).result()
@@ -0,0 +1,117 @@
+"""
+历史K线回补模块 - 分页规划与断点续传
+"""
+import json
+import math
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from app.candle_parser import Candles, candles_from_rows
+
+
+# 各周期K线时长（毫秒），1M 为变长周期，无法预先规划分页
+BAR_MILLISECONDS = {
+    "1m": 60_000,
+    "3m": 180_000,
+    "5m": 300_000,
+    "15m": 900_000,
+    "30m": 1_800_000,
+    "1H": 3_600_000,
+    "2H": 7_200_000,
+    "4H": 14_400_000,
+    "6H": 21_600_000,
+    "12H": 43_200_000,
+    "1D": 86_400_000,
+    "1W": 604_800_000,
+}
+
+
+def plan_page_cursors(anchor_ms: int, bar_ms: int, page_size: int,
+                      limit: Optional[int] = None, start_ms: Optional[int] = None) -> List[int]:
+    """
+    规划分页游标（OKX `after` 参数：返回早于该时间戳的数据）
+
+    第 0 页不带游标（由调用方单独获取，用于确定 anchor）。其余分页游标
+    对齐到 page_size * bar 的整数倍，这样即使中断期间产生了新K线，
+    断点中已完成的分页依然可以复用。
+
+    Args:
+        anchor_ms: 最新K线开盘时间 + 一个周期
+        bar_ms: 单根K线时长（毫秒）
+        page_size: 每页K线数量
+        limit: 需要的K线总数（与 start_ms 二选一）
+        start_ms: 回补起始时间（毫秒）
+
+    Returns:
+        第 1 页起的 `after` 游标列表（从新到旧）
+    """
+    span = page_size * bar_ms
+    aligned = anchor_ms // span * span
+    if start_ms is not None:
+        pages = math.ceil(max(aligned - start_ms, 0) / span)
+    elif limit is not None:
+        pages = math.ceil(limit / page_size)
+    else:
+        pages = 0
+    return [aligned - i * span for i in range(pages)]
+
+
+class BackfillCheckpoint:
+    """
+    回补断点文件，记录已完成的分页，中断后可从断点继续
+
+    文件为 JSON Lines 格式：首行为规划参数，之后每行一个已完成分页，
+    每完成一页只追加一行，避免重复写入整个文件。
+    """
+
+    def __init__(self, checkpoint_dir: str, inst_id: str, bar: str, page_size: int):
+        self.path = Path(checkpoint_dir) / f"{inst_id}_{bar}.jsonl"
+        self.plan_key = f"{bar}:{page_size}"
+        self.pages: Dict[int, Candles] = {}
+        self._load()
+
+    def _load(self):
+        """加载断点（规划参数不同则丢弃旧断点）"""
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                header = json.loads(f.readline() or "{}")
+                if header.get("plan") != self.plan_key:
+                    return
+                for line in f:
+                    try:
+                        page = json.loads(line)
+                    except ValueError:
+                        break  # 中断时写了半行，之后的内容丢弃
+                    self.pages[int(page["cursor"])] = candles_from_rows(page["rows"])
+        except (OSError, ValueError):
+            self.pages = {}
+
+    def done(self, cursor: int) -> bool:
+        """该分页是否已完成"""
+        return cursor in self.pages
+
+    def get(self, cursor: int) -> Candles:
+        """读取已完成分页的数据"""
+        return self.pages.get(cursor, Candles.empty())
+
+    def save(self, cursor: int, page: Candles):
+        """记录一个完成的分页并落盘（含未收盘K线的分页不记录）"""
+        if not page.confirm.all():
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if not self.pages and self.path.exists():
+            self.path.unlink()  # 旧规划的断点
+        is_new = not self.path.exists()
+        with open(self.path, "a", encoding="utf-8") as f:
+            if is_new:
+                f.write(json.dumps({"plan": self.plan_key}) + "\n")
+            f.write(json.dumps({"cursor": cursor, "rows": page.to_rows()}) + "\n")
+        self.pages[cursor] = page
+
+    def clear(self):
+        """回补完成后删除断点"""
+        self.pages = {}
+        if self.path.exists():
+            self.path.unlink()
@@ -0,0 +1,76 @@
+"""
+批量指标计算模块 - 多个交易对的指标一次算完
+
+输入为对齐的 (交易对, 时间) 矩阵（每行一个交易对的 close/high/low），所有指标沿时间轴
+由 app/kernels.py 的内核一次向量化计算，不再为每个交易对各走一遍 pandas 流程。
+按配置组合这些指标并去重共用的中间序列见 app/indicator_plan.py（输出的键与 IndicatorCalculator
+的列名、StreamingIndicators 的键一致）。
+"""
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app import kernels
+
+
+def stack_frames(frames: Sequence[pd.DataFrame],
+                 columns: Tuple[str, ...] = ("close", "high", "low")) -> Dict[str, np.ndarray]:
+    """
+    把等长的K线 DataFrame 按列堆叠成 (交易对, 时间) 矩阵
+
+    Args:
+        frames: K线数据列表（长度必须相同）
+        columns: 需要的列
+
+    Returns:
+        {列名: float64 矩阵}
+    """
+    lengths = {len(df) for df in frames}
+    if len(lengths) > 1:
+        raise ValueError(f"K线数量不一致，无法堆叠: {sorted(lengths)}")
+    return {
+        column: np.array([df[column].to_numpy(dtype=np.float64) for df in frames], dtype=np.float64)
+        for column in columns
+    }
+
+
+def group_by_length(frames: Dict[str, pd.DataFrame]) -> List[List[str]]:
+    """按K线数量分组（同组的交易对可以堆叠成一个矩阵）"""
+    groups: Dict[int, List[str]] = {}
+    for symbol, df in frames.items():
+        groups.setdefault(len(df), []).append(symbol)
+    return list(groups.values())
+
+
+def rsi(close: np.ndarray, length: int = 14) -> np.ndarray:
+    """RSI（涨跌幅的简单移动平均之比，第一根的涨跌幅取 0）"""
+    delta = np.zeros_like(close)
+    delta[..., 1:] = np.diff(close, axis=-1)
+    gain = kernels.sma(np.where(delta > 0, delta, 0.0), length)
+    loss = kernels.sma(np.where(delta < 0, -delta, 0.0), length)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return 100 - (100 / (1 + gain / loss))
+
+
+def rsv(close: np.ndarray, high: np.ndarray, low: np.ndarray, period: int = 9) -> np.ndarray:
+    """RSV = (收盘价 - N日最低价) / (N日最高价 - N日最低价) × 100（缺失时取 50）"""
+    lowest_low = kernels.rolling_min(low, period)
+    highest_high = kernels.rolling_max(high, period)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        value = (close - lowest_low) / (highest_high - lowest_low) * 100
+    value[np.isnan(value)] = 50.0
+    return value
+
+
+def last_two(series: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """最新一根与上一根（沿最后一维，只有一根时两者相同）"""
+    return series[..., -1], series[..., -2 if series.shape[-1] > 1 else -1]
+
+
+def previous(series: np.ndarray) -> np.ndarray:
+    """每根K线的上一根（沿最后一维，第一根取自身，与只有一根K线时 detect_signal 的取法相同）"""
+    out = np.empty_like(series)
+    out[..., :1] = series[..., :1]
+    out[..., 1:] = series[..., :-1]
+    return out
@@ -0,0 +1,102 @@
+"""
+K线缓冲区模块 - 固定容量的内存K线序列，未收盘K线原地更新并发出事件
+
+WebSocket 推送（okx_stream）写入缓冲区，下游通过 subscribe 接收 BarEvent 增量更新，
+不需要每次拿到一个新的 DataFrame。
+"""
+import time
+import numpy as np
+import pandas as pd
+from typing import Callable, List, Optional
+
+from app.kline_store import OHLCV_COLUMNS
+
+
+class BarEvent:
+    """缓冲区中一根K线的变化（原地更新未收盘K线、新K线开始或K线收盘）"""
+
+    __slots__ = ("index", "ts", "ohlcv", "confirmed", "is_new")
+
+    def __init__(self, index: int, ts: int, ohlcv: np.ndarray, confirmed: bool, is_new: bool):
+        self.index = index          # 在缓冲区中的位置（最后一根为 count - 1）
+        self.ts = ts                # 开盘时间（毫秒）
+        self.ohlcv = ohlcv          # 该K线当前的 OHLCV（副本）
+        self.confirmed = confirmed  # 是否已收盘
+        self.is_new = is_new        # 是否为新出现的K线（否则为原地更新）
+
+    def __repr__(self) -> str:
+        kind = "new" if self.is_new else "update"
+        return f"BarEvent({kind}, ts={self.ts}, close={self.ohlcv[3]}, confirmed={self.confirmed})"
+
+
+# K线更新监听器：每次推送写入缓冲区后调用
+BarListener = Callable[[BarEvent], None]
+
+
+class CandleBuffer:
+    """固定容量的K线内存缓冲区（超出容量时丢弃最旧的K线）"""
+
+    def __init__(self, capacity: int = 500):
+        self.capacity = capacity
+        self.ts = np.zeros(capacity, dtype=np.int64)
+        self.ohlcv = np.zeros((capacity, 5), dtype=np.float64)
+        self.count = 0
+        self.last_confirmed_ts: Optional[int] = None
+        self.listeners: List[BarListener] = []
+
+    def subscribe(self, listener: BarListener):
+        """订阅K线更新事件（下游指标据此增量更新，而不是重新计算整个 DataFrame）"""
+        self.listeners.append(listener)
+
+    def seed(self, df: pd.DataFrame, bar_ms: Optional[int] = None):
+        """用 REST 获取的历史K线初始化缓冲区"""
+        df = df.tail(self.capacity)
+        self.count = len(df)
+        self.ts[:self.count] = df.index.values.astype("datetime64[ms]").astype(np.int64)
+        self.ohlcv[:self.count] = df[OHLCV_COLUMNS].to_numpy()
+        if self.count:
+            # REST 数据不带收盘标记，按时钟判断最后一根是否已收盘
+            now_ms = int(time.time() * 1000)
+            last = int(self.ts[self.count - 1])
+            closed = bar_ms is not None and last + bar_ms <= now_ms
+            self.last_confirmed_ts = last if closed else (
+                int(self.ts[self.count - 2]) if self.count > 1 else None
+            )
+
+    def update(self, ts: int, ohlcv: List[float], confirm: bool) -> bool:
+        """
+        写入一条K线（WebSocket 推送），与最后一根开盘时间相同时原地更新
+
+        Returns:
+            这条推送是否让一根K线由未收盘变为已收盘
+        """
+        last = int(self.ts[self.count - 1]) if self.count else None
+        if last is not None and ts < last:
+            return False  # 过期推送
+
+        is_new = last is None or ts > last
+        if is_new:
+            if self.count == self.capacity:
+                self.ts[:-1] = self.ts[1:]
+                self.ohlcv[:-1] = self.ohlcv[1:]
+                self.count -= 1
+            self.count += 1
+        self.ts[self.count - 1] = ts
+        self.ohlcv[self.count - 1] = ohlcv
+
+        closed = confirm and (self.last_confirmed_ts is None or ts > self.last_confirmed_ts)
+        if closed:
+            self.last_confirmed_ts = ts
+        if self.listeners:
+            event = BarEvent(self.count - 1, ts, self.ohlcv[self.count - 1].copy(),
+                             bool(confirm), is_new)
+            for listener in self.listeners:
+                listener(event)
+        return closed
+
+    def frame(self) -> pd.DataFrame:
+        """当前缓冲区的 DataFrame 快照"""
+        index = pd.DatetimeIndex(
+            pd.to_datetime(self.ts[:self.count], unit="ms"), name="timestamp"
+        )
+        return pd.DataFrame(self.ohlcv[:self.count].copy(), index=index, columns=OHLCV_COLUMNS)
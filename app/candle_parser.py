@@ -0,0 +1,174 @@
+"""
+K线数据解析模块 - 将 OKX 行情响应直接解析为 NumPy 数组
+
+OKX 的K线数据是字符串二维数组：
+    {"code": "0", "msg": "", "data": [["ts", "o", "h", "l", "c", "vol", "volCcy", "volCcyQuote", "confirm"], ...]}
+
+快速路径不为每个字段创建 Python 对象：截取 data 数组的字节，去掉引号和括号后
+由 numpy 一次性解析进预分配的 float64 缓冲区，再切出时间戳、OHLCV 和收盘标记。
+只有外层的 code/msg 用 JSON 解码器解析。
+"""
+import json
+import warnings
+import numpy as np
+import pandas as pd
+from typing import List, Optional, Sequence, Union
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:  # orjson 不可用时退回标准库
+    _loads = json.loads
+
+from app.kline_store import OHLCV_COLUMNS
+
+
+ROW_FIELDS = 9
+
+
+class Candles:
+    """一组按时间升序排列的K线数组"""
+
+    def __init__(self, ts: np.ndarray, ohlcv: np.ndarray, confirm: np.ndarray):
+        self.ts = ts            # int64 开盘时间（毫秒）
+        self.ohlcv = ohlcv      # (n, 5) float64
+        self.confirm = confirm  # bool，是否已收盘
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+    def select(self, key: Union[slice, np.ndarray]) -> "Candles":
+        """按切片或布尔掩码选取"""
+        return Candles(self.ts[key], self.ohlcv[key], self.confirm[key])
+
+    def tail(self, n: int) -> "Candles":
+        """最近 n 根K线"""
+        return self.select(slice(max(len(self) - n, 0), None))
+
+    def to_rows(self) -> List[list]:
+        """转换为可 JSON 序列化的行（断点文件使用）"""
+        return [
+            [int(ts), *ohlcv.tolist(), bool(confirm)]
+            for ts, ohlcv, confirm in zip(self.ts, self.ohlcv, self.confirm)
+        ]
+
+    @classmethod
+    def empty(cls) -> "Candles":
+        return cls(np.empty(0, dtype=np.int64), np.empty((0, 5)), np.empty(0, dtype=bool))
+
+
+class OKXAPIError(ValueError):
+    """OKX 返回非 0 错误码"""
+
+
+def candles_from_rows(rows: Sequence[Sequence], descending: bool = False) -> Candles:
+    """
+    从行列表构造 Candles（WebSocket 推送、断点文件等已解码的数据）
+
+    Args:
+        rows: OKX 格式的行 [ts, o, h, l, c, vol, ...,  confirm]，
+              或 to_rows() 产生的 [ts, o, h, l, c, vol, confirm]
+        descending: 输入是否为倒序（OKX REST 接口为倒序）
+    """
+    n = len(rows)
+    ts = np.empty(n, dtype=np.int64)
+    ohlcv = np.empty((n, 5), dtype=np.float64)
+    confirm = np.empty(n, dtype=bool)
+    for i, row in enumerate(reversed(rows) if descending else rows):
+        ts[i] = int(row[0])
+        ohlcv[i] = row[1:6]
+        flag = row[-1]
+        confirm[i] = flag is True or flag == "1"
+    return Candles(ts, ohlcv, confirm)
+
+
+def _envelope(raw: bytes, data_start: int, data_end: int) -> dict:
+    """解析去掉 data 数组后的外层 JSON（code/msg）"""
+    return _loads(raw[:data_start] + b"null" + raw[data_end:])
+
+
+def parse_candles(raw: Union[bytes, str]) -> Candles:
+    """
+    解析 OKX K线接口的原始响应
+
+    Args:
+        raw: 响应体字节
+
+    Returns:
+        升序排列的 Candles
+
+    Raises:
+        OKXAPIError: code 不为 "0"
+    """
+    if isinstance(raw, str):
+        raw = raw.encode()
+
+    marker = raw.find(b'"data":')
+    if marker < 0:
+        return _parse_decoded(_loads(raw))
+    start = raw.find(b"[", marker)
+    end = raw.find(b"]]", start)
+    end = end + 2 if end >= 0 else raw.find(b"]", start) + 1
+    if start < 0 or end <= 0:
+        return _parse_decoded(_loads(raw))
+
+    envelope = _envelope(raw, start, end)
+    if str(envelope.get("code")) != "0":
+        raise OKXAPIError(f"OKX API 错误: {envelope.get('msg', 'Unknown error')}")
+
+    body = raw[start:end].translate(None, b'"[] \n\r\t')
+    if not body:
+        return Candles.empty()
+
+    with warnings.catch_warnings():
+        # numpy 遇到无法解析的字段时只发出警告并截断，这里改为抛出异常
+        warnings.simplefilter("error", DeprecationWarning)
+        try:
+            values = np.fromstring(body, dtype=np.float64, sep=",")
+        except (ValueError, DeprecationWarning):
+            values = None
+    if values is None or values.size % ROW_FIELDS != 0:
+        # 存在空字段等非常规内容，退回逐行解析
+        return _parse_decoded(_loads(raw))
+
+    # OKX 返回倒序（最新在前），翻转为升序；ohlcv 保持为 values 的视图
+    table = values.reshape(-1, ROW_FIELDS)[::-1]
+    return Candles(table[:, 0].astype(np.int64), table[:, 1:6], table[:, 8] == 1.0)
+
+
+def _parse_decoded(result: dict) -> Candles:
+    """慢速路径：已解码的 JSON 结果"""
+    if str(result.get("code")) != "0":
+        raise OKXAPIError(f"OKX API 错误: {result.get('msg', 'Unknown error')}")
+    return candles_from_rows(result.get("data") or [], descending=True)
+
+
+def candles_to_frame(candles: Candles, limit: Optional[int] = None) -> pd.DataFrame:
+    """
+    构造以时间戳为索引的 OHLCV DataFrame（只在这里复制一次数据）
+
+    Args:
+        limit: 只保留最近 limit 根
+    """
+    if limit is not None:
+        candles = candles.tail(limit)
+    index = pd.DatetimeIndex(pd.to_datetime(candles.ts, unit="ms"), name="timestamp")
+    return pd.DataFrame(
+        np.ascontiguousarray(candles.ohlcv), index=index, columns=OHLCV_COLUMNS, copy=False
+    )
+
+
+def merge_candles(pages: List[Candles]) -> Candles:
+    """合并多页K线：按时间戳排序去重（重复时保留后出现的页）"""
+    pages = [page for page in pages if len(page)]
+    if not pages:
+        return Candles.empty()
+    ts = np.concatenate([page.ts for page in pages])
+    ohlcv = np.concatenate([page.ohlcv for page in pages])
+    confirm = np.concatenate([page.confirm for page in pages])
+
+    # 反转后 unique 取到的是每个时间戳最后一次出现的位置
+    reversed_ts = ts[::-1]
+    _, first = np.unique(reversed_ts, return_index=True)
+    keep = len(ts) - 1 - first
+    return Candles(ts[keep], ohlcv[keep], confirm[keep])
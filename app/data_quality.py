@@ -0,0 +1,250 @@
+"""
+K线数据质量检查模块 - 在计算指标之前检查并修复 OHLCV 数据
+
+全部检查都是对整列数组的向量化运算（不逐行循环），单根实时K线和数百万行的历史回补
+都可以在获取后、计算指标前直接调用：
+
+- 时间戳乱序 / 重复：排序，重复时保留最后出现的一根
+- 缺失K线（时间间隔大于周期）：只统计，不插值
+- 价格非有限值或非正数：删除该K线
+- high < low、high/low 未包住 open/close：修正为 OHLC 的最大/最小值
+- 成交量为 0：只标记（停牌或流动性极差时可能真实存在）
+- 单根尖刺（收盘价大幅偏离后立即回归）：收盘价改为前后收盘价的均值
+"""
+import numpy as np
+import pandas as pd
+from typing import Dict, Optional, Tuple
+
+from app.kline_store import OHLCV_COLUMNS
+
+
+# 每根K线的问题标记（按位组合）
+FLAG_DUPLICATE = 1
+FLAG_INVALID_PRICE = 2
+FLAG_HIGH_LOW = 4
+FLAG_ZERO_VOLUME = 8
+FLAG_SPIKE = 16
+FLAG_AFTER_GAP = 32
+
+# 估计收益率尺度时的最大样本数
+SCALE_SAMPLE = 100_000
+
+
+class QualityReport:
+    """一次检查的结果"""
+
+    def __init__(self, rows: int, bar_ms: Optional[int]):
+        self.rows = rows                  # 检查前的行数
+        self.bar_ms = bar_ms              # 周期（毫秒，未知时按时间间隔中位数推断）
+        self.flags = np.zeros(0, dtype=np.uint8)  # 检查后每行的问题标记
+        self.unsorted = False
+        self.duplicates = 0
+        self.invalid_prices = 0
+        self.high_low_fixed = 0
+        self.zero_volume = 0
+        self.spikes = 0
+        self.gaps = 0                     # 缺口数量
+        self.missing_bars = 0             # 缺口内缺失的K线总数
+        self.largest_gap_bars = 0         # 最大缺口缺失的K线数
+        self.repaired = False
+
+    @property
+    def clean(self) -> bool:
+        """是否没有发现任何问题"""
+        return not (self.unsorted or self.duplicates or self.invalid_prices or self.high_low_fixed
+                    or self.zero_volume or self.spikes or self.gaps)
+
+    def summary(self) -> Dict:
+        """统计摘要（写入 DataFrame.attrs["quality"]）"""
+        return {
+            "rows": self.rows,
+            "unsorted": self.unsorted,
+            "duplicates": self.duplicates,
+            "invalid_prices": self.invalid_prices,
+            "high_low_fixed": self.high_low_fixed,
+            "zero_volume": self.zero_volume,
+            "spikes": self.spikes,
+            "gaps": self.gaps,
+            "missing_bars": self.missing_bars,
+            "largest_gap_bars": self.largest_gap_bars,
+            "repaired": self.repaired,
+        }
+
+    def __str__(self) -> str:
+        if self.clean:
+            return f"{self.rows} 根K线无异常"
+        parts = []
+        if self.unsorted:
+            parts.append("时间戳乱序")
+        if self.duplicates:
+            parts.append(f"重复 {self.duplicates}")
+        if self.invalid_prices:
+            parts.append(f"无效价格 {self.invalid_prices}")
+        if self.high_low_fixed:
+            parts.append(f"高低价异常 {self.high_low_fixed}")
+        if self.zero_volume:
+            parts.append(f"零成交量 {self.zero_volume}")
+        if self.spikes:
+            parts.append(f"尖刺 {self.spikes}")
+        if self.gaps:
+            parts.append(f"缺口 {self.gaps} 处（缺 {self.missing_bars} 根，最大 {self.largest_gap_bars} 根）")
+        return " | ".join(parts)
+
+
+def check_arrays(ts: np.ndarray, ohlcv: np.ndarray, bar_ms: Optional[int] = None,
+                 repair: bool = True, spike_sigma: float = 8.0
+                 ) -> Tuple[np.ndarray, np.ndarray, QualityReport]:
+    """
+    检查（并修复）K线数组
+
+    Args:
+        ts: int64 开盘时间（毫秒）
+        ohlcv: (n, 5) float64 数组
+        bar_ms: 周期（毫秒），为空时取时间间隔的中位数
+        repair: 是否修复；为 False 时只标记，返回原数组
+        spike_sigma: 尖刺判定阈值（对数收益率偏离的稳健标准差倍数）
+
+    Returns:
+        (ts, ohlcv, report)；修复时返回新数组，输入数组不会被修改
+    """
+    report = QualityReport(len(ts), bar_ms)
+    if len(ts) == 0:
+        return ts, ohlcv, report
+
+    # 乱序与重复：按时间排序，重复时间戳保留最后出现的一根
+    steps = np.diff(ts)
+    report.unsorted = bool((steps < 0).any())
+    if report.unsorted:
+        reversed_ts = ts[::-1]
+        _, first = np.unique(reversed_ts, return_index=True)
+        keep = len(ts) - 1 - first
+        report.duplicates = len(ts) - len(keep)
+    else:
+        duplicated = steps == 0
+        report.duplicates = int(duplicated.sum())
+        keep = np.flatnonzero(np.r_[~duplicated, True]) if report.duplicates else None
+
+    if repair and keep is not None:
+        ts = ts[keep]
+    # 按列转成连续数组（跨步访问 (n, 5) 数组的单列比连续数组慢数倍）；修复在副本上进行
+    columns = np.ascontiguousarray(ohlcv[keep].T if repair and keep is not None else ohlcv.T)
+    if repair and np.shares_memory(columns, ohlcv):
+        columns = columns.copy()
+    flags = np.zeros(len(ts), dtype=np.uint8)
+    if keep is not None and not repair:
+        flags[np.setdiff1d(np.arange(len(ts)), keep)] |= FLAG_DUPLICATE
+
+    opens, highs, lows, closes, volumes = columns
+
+    # 非有限值或非正价格（NaN 经 minimum 传播，floor > 0 不成立）
+    with np.errstate(invalid="ignore"):
+        floor = np.minimum(opens, highs)
+        np.minimum(floor, lows, out=floor)
+        np.minimum(floor, closes, out=floor)
+        ceiling = np.maximum(opens, highs)
+        np.maximum(ceiling, lows, out=ceiling)
+        np.maximum(ceiling, closes, out=ceiling)
+        invalid = ~((floor > 0) & (ceiling < np.inf))
+    report.invalid_prices = int(invalid.sum())
+    flags[invalid] |= FLAG_INVALID_PRICE
+
+    # high/low 未包住 OHLC（high 不是四价最大值或 low 不是四价最小值）
+    bad_range = ((highs != ceiling) | (lows != floor)) & ~invalid
+    report.high_low_fixed = int(bad_range.sum())
+    flags[bad_range] |= FLAG_HIGH_LOW
+    if repair and report.high_low_fixed:
+        highs[bad_range] = ceiling[bad_range]
+        lows[bad_range] = floor[bad_range]
+
+    zero_volume = (volumes == 0) & ~invalid
+    report.zero_volume = int(zero_volume.sum())
+    flags[zero_volume] |= FLAG_ZERO_VOLUME
+
+    # 尖刺：收盘价相对前一根的大幅跳动在下一根立即反向回归
+    if len(ts) >= 3:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            returns = np.diff(np.log(closes))
+        # 稳健标准差（MAD）只需估计量级，长序列等距抽样估计
+        sample = returns[::max(len(returns) // SCALE_SAMPLE, 1)]
+        sample = sample[np.isfinite(sample)]
+        if len(sample) >= 10:
+            median = np.median(sample)
+            sigma = 1.4826 * np.median(np.abs(sample - median))
+            if sigma > 0:
+                limit = spike_sigma * sigma
+                # 先找出所有大幅跳动（通常极少），再检查相邻两根是否一去一回
+                jumps = np.flatnonzero(np.abs(returns - median) > limit)
+                jumps = jumps[np.isin(jumps + 1, jumps)]
+                out, back = returns[jumps], returns[jumps + 1]
+                spike_rows = jumps[(out * back < 0) & (np.abs(out + back) < limit)] + 1
+                spike_rows = spike_rows[~(invalid[spike_rows - 1] | invalid[spike_rows + 1])]
+                report.spikes = len(spike_rows)
+                flags[spike_rows] |= FLAG_SPIKE
+                if repair and report.spikes:
+                    bad = closes[spike_rows].copy()
+                    fixed = 0.5 * (closes[spike_rows - 1] + closes[spike_rows + 1])
+                    closes[spike_rows] = fixed
+                    highs[spike_rows] = np.maximum(opens[spike_rows], fixed)
+                    lows[spike_rows] = np.minimum(opens[spike_rows], fixed)
+                    # 下一根以尖刺价开盘：开盘价改为修复后的收盘价，尖刺造成的影线收回实体
+                    following = spike_rows + 1
+                    opens[following] = fixed
+                    top = np.maximum(fixed, closes[following])
+                    bottom = np.minimum(fixed, closes[following])
+                    highs[following] = np.where(highs[following] >= bad, top, np.maximum(highs[following], top))
+                    lows[following] = np.where(lows[following] <= bad, bottom, np.minimum(lows[following], bottom))
+
+    # 缺口统计（基于修复后的时间轴）
+    steps = np.diff(ts)
+    positive = steps[steps > 0]
+    if report.bar_ms is None and len(positive):
+        report.bar_ms = int(np.median(positive))
+    if report.bar_ms:
+        missing = steps // report.bar_ms - 1
+        gap_rows = np.flatnonzero(missing > 0)
+        report.gaps = len(gap_rows)
+        if report.gaps:
+            report.missing_bars = int(missing[gap_rows].sum())
+            report.largest_gap_bars = int(missing[gap_rows].max())
+            flags[gap_rows + 1] |= FLAG_AFTER_GAP
+
+    ohlcv = columns.T if repair else ohlcv
+    if repair and report.invalid_prices:
+        valid = ~invalid
+        ts, ohlcv, flags = ts[valid], ohlcv[valid], flags[valid]
+
+    report.repaired = repair and bool(report.unsorted or report.duplicates or report.invalid_prices
+                                      or report.high_low_fixed or report.spikes)
+    report.flags = flags
+    return ts, ohlcv, report
+
+
+def check_ohlcv(df: pd.DataFrame, bar_ms: Optional[int] = None, repair: bool = True,
+                spike_sigma: float = 8.0) -> Tuple[pd.DataFrame, QualityReport]:
+    """
+    检查（并修复）OHLCV DataFrame
+
+    Args:
+        df: 以时间戳为索引的 OHLCV DataFrame
+        bar_ms: 周期（毫秒），为空时按时间间隔推断
+        repair: 是否修复
+        spike_sigma: 尖刺判定阈值
+
+    Returns:
+        (df, report)；数据无异常或不修复时返回原 DataFrame，
+        结果的 attrs["quality"] 为检查摘要
+    """
+    if df is None or df.empty:
+        return df, QualityReport(0, bar_ms)
+
+    ts = df.index.values.astype("datetime64[ms]").astype(np.int64)
+    ohlcv = df[OHLCV_COLUMNS].to_numpy(dtype=np.float64)
+    ts, ohlcv, report = check_arrays(ts, ohlcv, bar_ms, repair, spike_sigma)
+
+    if report.repaired:
+        index = pd.DatetimeIndex(pd.to_datetime(ts, unit="ms"), name=df.index.name or "timestamp")
+        attrs = dict(df.attrs)
+        df = pd.DataFrame(ohlcv, index=index, columns=OHLCV_COLUMNS)
+        df.attrs.update(attrs)
+    df.attrs["quality"] = report.summary()
+    return df, report
@@ -0,0 +1,136 @@
+"""
+特征缓存模块 - 同一份K线数据上的指标序列只计算一次
+
+EMASignal、MACDSignal 和 IndicatorCalculator 都要计算收盘价的 EMA(12)/EMA(26)，
+KDJ 与布林带也各自做 rolling 计算。FeatureCache 绑定一个 DataFrame，按 IndicatorPlan 的
+步骤键 (运算, 输入, 参数) 缓存派生序列：输入为列名（如 "close"）或另一个步骤的键（如 MACD 线），
+同一次分析中相同的键只计算一次，之后直接复用。指标由 app/indicator_plan.py 的 INDICATORS
+展开成步骤，与批量分析执行同一份定义，register_indicator 登记的指标也可以用 indicator() 计算。
+
+backend 选择底层实现："pandas"（PANDAS_OPS 的 rolling/ewm）或 "numpy"（OPS 的向量化内核），
+两者结果在浮点误差范围内一致，缓存键不区分实现。内核假定输入不含 NaN/inf，来源序列有缺失值时
+该步骤改用 pandas 计算（只有包含缺失值的窗口为 NaN，与 pandas 后端结果相同）。
+"""
+from typing import Callable, Dict, Hashable, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from app.indicator_plan import OPS, PANDAS_OPS, IndicatorPlan, Key, run_step
+
+
+# 来源：DataFrame 列名，或步骤的键
+Source = Union[str, Key]
+
+BACKENDS = ("pandas", "numpy")
+
+
+class FeatureCache:
+    """绑定单个 DataFrame 的指标序列缓存（每次分析新建一个）"""
+
+    def __init__(self, df: pd.DataFrame, backend: str = "pandas"):
+        if backend not in BACKENDS:
+            raise ValueError(f"不支持的指标实现: {backend}（可选 {'/'.join(BACKENDS)}）")
+        self.df = df
+        self.backend = backend
+        self._features: Dict[Hashable, pd.Series] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple, compute: Callable[[], pd.Series]) -> pd.Series:
+        """
+        按键取特征，未缓存时调用 compute() 计算并缓存
+
+        Args:
+            key: 步骤的键（列为 ("column", 列名)）
+            compute: 计算函数
+        """
+        if key in self._features:
+            self.hits += 1
+            return self._features[key]
+        self.misses += 1
+        value = compute()
+        self._features[key] = value
+        return value
+
+    def series(self, source: Source) -> pd.Series:
+        """来源序列：列名取 DataFrame 的列，元组按步骤的键计算"""
+        if isinstance(source, str):
+            return self.get(("column", source), lambda: self.df[source])
+        return self.step(source)
+
+    def step(self, key: Key) -> pd.Series:
+        """计算一个步骤（输入先按键取得或计算），结果与 DataFrame 同索引"""
+        def compute() -> pd.Series:
+            op, inputs, params = key
+            sources = [self.series(source) for source in inputs]
+            if self.backend == "numpy":
+                arrays = [series.to_numpy(dtype=np.float64) for series in sources]
+                return pd.Series(run_step(op, arrays, params), index=self.df.index)
+            return PANDAS_OPS.get(op, OPS[op])(*sources, *params)
+        return self.get(key, compute)
+
+    def indicator(self, name: str, **params) -> Dict[str, pd.Series]:
+        """
+        按 INDICATORS 中登记的构建函数计算一个指标
+
+        Args:
+            name: 指标名（如 "macd"）
+            params: 指标参数（与 settings.yaml 中的键相同）
+
+        Returns:
+            {列名: 序列}（列名与批量分析、IndicatorCalculator 相同，如 "MACD_hist"）
+        """
+        plan = IndicatorPlan()
+        plan.add(name, **params)
+        return {column: self.step(key) for column, key in plan.columns.items()}
+
+    def sma(self, source: Source, length: int) -> pd.Series:
+        """简单移动平均"""
+        return self.step(("sma", (source,), (length,)))
+
+    def std(self, source: Source, length: int) -> pd.Series:
+        """滚动样本标准差"""
+        return self.step(("std", (source,), (length,)))
+
+    def ema(self, source: Source, span: float = None, alpha: float = None) -> pd.Series:
+        """指数移动平均（adjust=False，按 span 或 alpha 指定）"""
+        return self.step(("ema", (source,), (alpha if alpha is not None else 2.0 / (span + 1.0),)))
+
+    def macd(self, fast: int = 12, slow: int = 26, signal: int = 9) -> Dict[str, pd.Series]:
+        """
+        MACD
+
+        Returns:
+            {"macd": MACD线, "signal": 信号线, "histogram": 柱状图}
+        """
+        columns = self.indicator("macd", fast=fast, slow=slow, signal=signal)
+        return {"macd": columns["MACD"], "signal": columns["MACD_signal"], "histogram": columns["MACD_hist"]}
+
+    def rsi(self, length: int = 14) -> pd.Series:
+        """RSI（涨跌幅的简单移动平均之比）"""
+        return self.indicator("rsi", period=length)["RSI"]
+
+    def bbands(self, length: int = 20, std: float = 2.0) -> Dict[str, pd.Series]:
+        """
+        布林带
+
+        Returns:
+            {"upper": 上轨, "middle": 中轨, "lower": 下轨}
+        """
+        columns = self.indicator("bollinger", period=length, std_dev=std)
+        return {"upper": columns["BB_upper"], "middle": columns["BB_middle"], "lower": columns["BB_lower"]}
+
+    def kdj(self, period: int = 9, k_period: int = 3, d_period: int = 3) -> Dict[str, pd.Series]:
+        """
+        KDJ（RSV 缺失时取 50，K/D 为 alpha=1/周期 的 EMA）
+
+        Returns:
+            {"k": K, "d": D, "j": J}
+        """
+        columns = self.indicator("kdj", period=period, k_period=k_period, d_period=d_period)
+        return {"k": columns["K"], "d": columns["D"], "j": columns["J"]}
+
+    def stats(self) -> Dict[str, int]:
+        """命中统计"""
+        return {"hits": self.hits, "misses": self.misses, "features": len(self._features)}
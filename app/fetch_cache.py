@@ -0,0 +1,101 @@
+"""
+K线缓存模块 - 进程内按K线收盘时间过期的获取缓存
+
+以 (交易对, 周期) 为键，缓存条目在当前K线收盘时过期（之前再请求得到的已收盘
+数据不会变化）。较小的 limit 直接从较大的缓存条目中切片；多个线程同时请求同一个键时
+只发出一次请求，其余线程等待其结果。
+"""
+import threading
+import time
+import pandas as pd
+from typing import Callable, Dict, Optional, Tuple
+
+from app.backfill import BAR_MILLISECONDS
+from app.resample import next_bar_close
+
+
+class _Entry:
+    """一个缓存条目（或正在进行中的请求）"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.df: Optional[pd.DataFrame] = None
+        self.error: Optional[BaseException] = None
+        self.expires_ms = 0
+        self.ready = threading.Event()
+
+
+class CandleCache:
+    """按K线收盘时间过期、支持请求合并的 K 线缓存"""
+
+    def __init__(self):
+        self._entries: Dict[Tuple[str, str], _Entry] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    @staticmethod
+    def cacheable(bar: str) -> bool:
+        """只有已知时长的周期才能计算收盘时间"""
+        return bar in BAR_MILLISECONDS or bar == "1M"
+
+    def get(self, inst_id: str, bar: str, limit: int,
+            loader: Callable[[int], pd.DataFrame]) -> pd.DataFrame:
+        """
+        获取最近 limit 根K线，未命中时调用 loader(limit) 并缓存结果
+
+        Args:
+            inst_id: OKX 交易对（AR-USDT）
+            bar: OKX 周期（4H）
+            limit: K线数量
+            loader: 实际获取函数（异常会传递给所有等待的调用方，且不缓存）
+        """
+        if not self.cacheable(bar):
+            return loader(limit)
+
+        key = (inst_id, bar)
+        now_ms = int(time.time() * 1000)
+        with self._lock:
+            entry = self._entries.get(key)
+            usable = entry is not None and entry.limit >= limit and (
+                not entry.ready.is_set() or (entry.error is None and now_ms < entry.expires_ms)
+            )
+            if usable:
+                if entry.ready.is_set():
+                    self.hits += 1
+                else:
+                    self.coalesced += 1
+            else:
+                entry = _Entry(limit)
+                self._entries[key] = entry
+                self.misses += 1
+        if usable:
+            entry.ready.wait()
+            if entry.error is not None:
+                raise entry.error
+            return entry.df.tail(limit)
+
+        try:
+            entry.df = loader(limit)
+            entry.expires_ms = next_bar_close(int(time.time() * 1000), bar)
+        except BaseException as e:
+            entry.error = e
+            with self._lock:
+                if self._entries.get(key) is entry:
+                    del self._entries[key]
+            raise
+        finally:
+            entry.ready.set()
+        return entry.df
+
+    def invalidate(self, inst_id: Optional[str] = None, bar: Optional[str] = None):
+        """清除缓存（不传参数时全部清除）"""
+        with self._lock:
+            for key in list(self._entries):
+                if (inst_id is None or key[0] == inst_id) and (bar is None or key[1] == bar):
+                    del self._entries[key]
+
+    def stats(self) -> Dict[str, int]:
+        """命中统计"""
+        return {"hits": self.hits, "misses": self.misses, "coalesced": self.coalesced}
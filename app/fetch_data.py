@@ -1,20 +1,103 @@
 """
 数据获取模块 - 从 OKX API 获取K线数据
 """
+import time
 import requests
+import numpy as np
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple, Union
+
+from app.backfill import BAR_MILLISECONDS, BackfillCheckpoint, plan_page_cursors
+from app.circuit_breaker import CircuitBreakers, CircuitOpenError
+from app.data_quality import QualityReport, check_ohlcv
+from app.candle_parser import Candles, candles_to_frame, merge_candles, parse_candles
+from app.fetch_cache import CandleCache
+from app.hedging import HedgedRequester
+from app.http_client import get_http_client
+from app.kline_store import KlineStore
+from app.rate_limit import get_rate_limiter
+from app.resample import bars_needed, can_derive, resample_ohlcv
+from app.synthetic import generate_ohlcv
 
 
 class OKXDataFetcher:
     """OKX 数据获取器"""
     
-    BASE_URL = "https://www.okx.com/api/v5/market/candles"
+    API_BASE = "https://www.okx.com/api/v5"
+    PAGE_SIZE = 100  # OKX 单次请求最多返回 100 条
+    DEFAULT_LIMIT = 500  # 未声明所需K线数量时的默认值
     
-    def __init__(self, symbol: str = None):
+    def __init__(self, symbol: str = None, config: Optional[dict] = None):
         # OKX 使用 AR-USDT 格式
         self.default_symbol = symbol or "AR/USDT"
+        self.config = config or {}
+        
+        # 共享连接池（keep-alive + 重试退避）
+        self.http = get_http_client(self.config.get("http"))
+        
+        api_base = self.config.get("exchange", {}).get("api_base") or self.API_BASE
+        self.candles_url = f"{api_base.rstrip('/')}/market/candles"
+        self.history_candles_url = f"{api_base.rstrip('/')}/market/history-candles"
+        
+        # 对冲请求：主地址响应慢于近期 p95 时同时请求备用地址
+        hedge_config = self.config.get("exchange", {}).get("hedge", {})
+        if hedge_config.get("enable") and hedge_config.get("mirror_base"):
+            self.hedger = HedgedRequester(
+                self.http, api_base, hedge_config["mirror_base"],
+                quantile=hedge_config.get("quantile", 0.95),
+                min_delay=hedge_config.get("min_delay", 0.1),
+                max_delay=hedge_config.get("max_delay", 3.0),
+                allow_hedge=self._hedge_budget
+            )
+        else:
+            self.hedger = None
+        
+        # 历史回补配置
+        backfill_config = self.config.get("data", {}).get("backfill", {})
+        self.backfill_workers = backfill_config.get("workers", 8)
+        self.checkpoint_dir = backfill_config.get("checkpoint_dir", "data/backfill")
+        
+        # 本地K线存储（只增量请求新K线）
+        store_config = self.config.get("data", {}).get("store", {})
+        if store_config.get("enable", True):
+            self.store = KlineStore(store_config.get("dir", "data/klines"))
+        else:
+            self.store = None
+        
+        # 进程内缓存：当前K线收盘前重复请求直接复用，并发的相同请求只发出一次
+        if self.config.get("data", {}).get("cache", True):
+            self.cache = CandleCache()
+        else:
+            self.cache = None
+        
+        # 熔断：某个交易对/接口连续失败后快速失败，改用本地已有的K线
+        breaker_config = self.config.get("data", {}).get("circuit_breaker", {})
+        self.breakers = CircuitBreakers(
+            breaker_config.get("failure_threshold", 3),
+            breaker_config.get("reset_timeout", 300)
+        )
+        self.endpoint_failure_threshold = breaker_config.get("endpoint_failure_threshold", 5)
+        # 最近一次成功获取的数据（熔断或请求失败时作为过期数据返回）
+        self._last_good: Dict[Tuple[str, str], pd.DataFrame] = {}
+        # 没有任何本地数据时是否生成模拟数据（仅用于离线演示）
+        self.synthetic_fallback = self.config.get("data", {}).get("synthetic_fallback", False)
+        
+        # 各 (交易对, 周期) 下游声明的所需K线数量
+        self.lookbacks: Dict[Tuple[str, str], int] = {}
+        
+        # 基础周期：多周期分析时只请求这一个周期，其余周期在本地合成
+        self.base_interval = self.config.get("data", {}).get("base_interval")
+        # 合成一个周期最多请求的基础周期K线数量（超过时该周期直接请求，如由日线合成 500 根周线需要约 3500 根）
+        self.max_base_bars = self.config.get("data", {}).get("max_base_bars", 1500)
+        
+        # 数据质量检查：计算指标前修复（或只标记）重复、乱序、高低价异常和尖刺，统计缺口
+        quality_config = self.config.get("data", {}).get("quality", {})
+        self.quality_check = quality_config.get("enable", True)
+        self.quality_repair = quality_config.get("repair", True)
+        self.spike_sigma = quality_config.get("spike_sigma", 8.0)
+        self.quality_reports: Dict[Tuple[str, str], QualityReport] = {}
     
     def _normalize_symbol(self, symbol: str) -> str:
         """标准化交易对格式（AR/USDT -> AR-USDT）"""
@@ -58,75 +141,381 @@ class OKXDataFetcher:
         }
         return interval_map.get(interval.lower(), "1D")
     
-    def fetch_klines(self, symbol: str, interval: str, limit: int = 500) -> pd.DataFrame:
+    def _request_candles(self, inst_id: str, bar: str, limit: int = 100,
+                         after: Optional[int] = None, history: bool = False) -> Candles:
+        """
+        请求一页K线数据
+        
+        Args:
+            inst_id: OKX 交易对（AR-USDT）
+            bar: OKX 周期（4H, 1D）
+            limit: 数量（最多 100）
+            after: 分页游标，返回早于该时间戳（毫秒）的数据
+            history: 是否使用 history-candles 接口（可获取更早的数据）
+            
+        Returns:
+            升序排列的 Candles（保留 confirm 收盘标记）
+        """
+        params = {
+            "instId": inst_id,
+            "bar": bar,
+            "limit": str(min(limit, self.PAGE_SIZE))
+        }
+        if after is not None:
+            params["after"] = str(after)
+        
+        url = self.history_candles_url if history else self.candles_url
+        endpoint = "market/history-candles" if history else "market/candles"
+        breakers = self._acquire_breakers(inst_id, endpoint)
+        
+        get_rate_limiter(endpoint).acquire()
+        try:
+            response = (self.hedger or self.http).get(url, params=params)
+            response.raise_for_status()
+        except requests.exceptions.RequestException:
+            for breaker in breakers:
+                breaker.record_failure()
+            raise
+        for breaker in breakers:
+            breaker.record_success()
+        
+        # OKX API 返回格式: {"code": "0", "msg": "", "data": [[...]]}
+        # 直接从响应字节解析为数组，不经过逐字段的 Python 对象
+        return parse_candles(response.content)
+    
+    def _hedge_budget(self, url: str) -> bool:
+        """对冲请求同样占用 OKX 按 IP 的限速配额，配额不足时不对冲"""
+        endpoint = "market/history-candles" if "history-candles" in url else "market/candles"
+        return get_rate_limiter(endpoint).try_acquire()
+    
+    def _acquire_breakers(self, inst_id: str, endpoint: str) -> list:
+        """
+        检查交易对级和接口级熔断器
+        
+        Raises:
+            CircuitOpenError: 任一熔断器处于打开状态
+        """
+        names = [f"{endpoint}:{inst_id}", endpoint]
+        breakers = [
+            self.breakers.get(names[0]),
+            self.breakers.get(names[1], self.endpoint_failure_threshold)
+        ]
+        for i, breaker in enumerate(breakers):
+            if not breaker.allow():
+                for allowed in breakers[:i]:
+                    allowed.cancel()
+                raise CircuitOpenError(f"{names[i]} 已熔断，{breaker.retry_in():.0f}s 后重试")
+        return breakers
+    
+    def declare_lookback(self, symbol: str, interval: str, bars: int):
+        """
+        声明某个 (交易对, 周期) 的下游（指标、信号检测器）所需的K线数量
+        
+        多个下游声明同一个键时取最大值；fetch_klines 不传 limit 时按此数量获取。
+        """
+        key = (self._normalize_symbol(symbol), self._convert_interval(interval))
+        self.lookbacks[key] = max(self.lookbacks.get(key, 0), bars)
+    
+    def required_bars(self, symbol: str, interval: str) -> int:
+        """某个 (交易对, 周期) 需要获取的最少K线数量"""
+        key = (self._normalize_symbol(symbol), self._convert_interval(interval))
+        return self.lookbacks.get(key, self.DEFAULT_LIMIT)
+    
+    def fetch_klines(self, symbol: str, interval: str, limit: Optional[int] = None) -> pd.DataFrame:
         """
         获取K线数据
         
         Args:
             interval: 时间周期 (1d, 1w, 1h等)
-            limit: 获取数量，默认500（OKX 最大支持 100）
+            limit: 获取数量（超过 100 时自动分页回补），默认为下游声明的所需数量
             
         Returns:
             DataFrame with columns: timestamp, open, high, low, close, volume
         """
-        # OKX API 限制单次最多 100 条
-        if limit > 100:
-            limit = 100
-        
         # 标准化交易对
         normalized_symbol = self._normalize_symbol(symbol)
         
         # 转换时间周期格式
         okx_interval = self._convert_interval(interval)
         
-        params = {
-            "instId": normalized_symbol,
-            "bar": okx_interval,
-            "limit": str(limit)
-        }
+        if limit is None:
+            limit = self.required_bars(symbol, interval)
+        
+        def load(count: int) -> pd.DataFrame:
+            df = self._fetch_from_okx(normalized_symbol, okx_interval, interval, count)
+            self._last_good[(normalized_symbol, okx_interval)] = df
+            return df
         
         try:
-            print(f"📡 正在从 OKX 获取 {normalized_symbol} {interval} 数据...")
-            response = requests.get(self.BASE_URL, params=params, timeout=15)
-            response.raise_for_status()
-            result = response.json()
-            
-            # OKX API 返回格式: {"code": "0", "msg": "", "data": [[...]]}
-            if result.get("code") != "0":
-                raise ValueError(f"OKX API 错误: {result.get('msg', 'Unknown error')}")
+            if self.cache is not None:
+                return self.cache.get(normalized_symbol, okx_interval, limit, load)
+            return load(limit)
             
-            data = result.get("data", [])
-            if not data:
-                raise ValueError(f"No data returned for {normalized_symbol} {interval}")
-            
-            # OKX 返回格式: [ts, o, h, l, c, vol, volCcy, volCcyQuote, confirm]
-            # 数据是倒序的（最新的在前），需要反转
-            data.reverse()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            # OKX 不可用时返回本地已有的K线（标记为过期），不再编造数据
+            print(f"⚠️  OKX API 访问失败: {e}")
+            stale = self._stale_data(normalized_symbol, okx_interval, limit)
+            if stale is not None:
+                print(f"🗄️  使用本地缓存的 {normalized_symbol} {interval} 数据"
+                      f"（截至 {stale.attrs['as_of']}，已过期）")
+                return stale
+            if self.synthetic_fallback:
+                print(f"📡 尝试使用备用数据源...")
+                return self._fetch_fallback_data(symbol, interval, limit)
+            raise ConnectionError(f"{normalized_symbol} {interval} 无可用数据: {e}") from e
+    
+    def validate(self, df: pd.DataFrame, symbol: str, interval: str) -> pd.DataFrame:
+        """
+        数据质量检查（在 fetch_klines 之后、计算指标之前调用）
+        
+        Args:
+            df: K线数据
+            symbol: 交易对
+            interval: 时间周期
             
-            # 转换为 DataFrame
-            df = pd.DataFrame(data, columns=[
-                "timestamp", "open", "high", "low", "close", "volume",
-                "volCcy", "volCcyQuote", "confirm"
-            ])
+        Returns:
+            修复后的 DataFrame（repair 关闭时为原数据），attrs["quality"] 为检查摘要
+        """
+        if not self.quality_check or df is None or df.empty:
+            return df
+        
+        key = (self._normalize_symbol(symbol), self._convert_interval(interval))
+        df, report = check_ohlcv(
+            df, BAR_MILLISECONDS.get(key[1]), repair=self.quality_repair, spike_sigma=self.spike_sigma
+        )
+        previous = self.quality_reports.get(key)
+        self.quality_reports[key] = report
+        # 只在问题首次出现或发生变化时提示，避免每根实时K线重复输出
+        if not report.clean and (previous is None or str(previous) != str(report)):
+            print(f"🧹 {key[0]} {interval} 数据质量: {report}")
+        return df
+    
+    def gap_stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        各交易对最近一次检查的缺口统计
+        
+        Returns:
+            {"AR-USDT 4H": {"gaps": 缺口数, "missing_bars": 缺失K线数, "largest_gap_bars": 最大缺口}}
+        """
+        return {
+            f"{inst_id} {bar}": {
+                "gaps": report.gaps,
+                "missing_bars": report.missing_bars,
+                "largest_gap_bars": report.largest_gap_bars,
+            }
+            for (inst_id, bar), report in self.quality_reports.items()
+        }
+    
+    def _stale_data(self, inst_id: str, bar: str, limit: int) -> Optional[pd.DataFrame]:
+        """
+        最近一次成功获取的数据，或本地存储中的已收盘K线
+        
+        Returns:
+            attrs 中带 stale=True 和 as_of（最后一根K线时间）的 DataFrame，没有数据时返回 None
+        """
+        df = self._last_good.get((inst_id, bar))
+        if (df is None or len(df) < limit) and self.store is not None:
+            stored = self.store.count(inst_id, bar)
+            if stored and (df is None or stored > len(df)):
+                df = self.store.frame(inst_id, bar, limit)
+        if df is None or df.empty:
+            return None
+        
+        df = df.tail(limit)
+        df.attrs["stale"] = True
+        df.attrs["as_of"] = df.index[-1]
+        return df
+    
+    def _fetch_from_okx(self, inst_id: str, bar: str, interval: str, limit: int) -> pd.DataFrame:
+        """从 OKX（经本地存储）获取最近 limit 根K线，失败时抛出异常"""
+        if self.store is not None:
+            return self._fetch_via_store(inst_id, bar, interval, limit)
+        
+        print(f"📡 正在从 OKX 获取 {inst_id} {interval} 数据...")
+        candles = self._fetch_candles(inst_id, bar, limit)
+        if not len(candles):
+            raise ValueError(f"No data returned for {inst_id} {interval}")
+        
+        df = candles_to_frame(candles)
+        
+        print(f"✅ 成功从 OKX 获取 {len(df)} 根K线数据")
+        return df
+    
+    def _fetch_candles(self, inst_id: str, bar: str, limit: int) -> Candles:
+        """获取最近 limit 根K线（升序），超过 100 条时分页回补"""
+        # OKX API 限制单次最多 100 条，超过时分页回补
+        if limit > self.PAGE_SIZE:
+            return self._fetch_history_candles(inst_id, bar, limit=limit)
+        return self._request_candles(inst_id, bar, limit)
+    
+    def _fetch_via_store(self, inst_id: str, bar: str, interval: str, limit: int) -> pd.DataFrame:
+        """
+        通过本地存储获取K线：只请求最后一根已存储的收盘K线之后的数据
+        
+        Returns:
+            最近 limit 根K线（已收盘部分为存储视图，末尾拼接未收盘K线）
+        """
+        last_ts = self.store.last_timestamp(inst_id, bar)
+        stored = self.store.count(inst_id, bar)
+        bar_ms = BAR_MILLISECONDS.get(bar)
+        
+        if last_ts is None or stored < limit - 1:
+            # 冷启动或存储不够长：按 limit 完整获取，并与已有存储合并
+            print(f"📡 正在从 OKX 获取 {inst_id} {interval} 数据（初始化本地存储）...")
+            candles = self._fetch_candles(inst_id, bar, limit)
+            if not len(candles):
+                raise ValueError(f"No data returned for {inst_id} {interval}")
+            closed = candles.select(candles.confirm)
+            self._merge_into_store(inst_id, bar, closed.ts, closed.ohlcv)
+        else:
+            # 增量更新：按时钟估算新增K线数量（含未收盘K线）
+            now_ms = int(time.time() * 1000)
+            missing = (now_ms - last_ts) // bar_ms if bar_ms else self.PAGE_SIZE
+            if missing < self.PAGE_SIZE:
+                candles = self._fetch_candles(inst_id, bar, max(int(missing), 1) + 1)
+            else:
+                candles = self._fetch_history_candles(inst_id, bar, start_ms=last_ts + (bar_ms or 1))
+            closed = candles.select(candles.confirm)
+            appended = self.store.append(inst_id, bar, closed.ts, closed.ohlcv)
+            print(f"📡 {inst_id} {interval} 增量更新 {appended} 根已收盘K线")
+        
+        # 未收盘K线不落盘，直接拼接在存储视图之后
+        last_ts = self.store.last_timestamp(inst_id, bar)
+        forming = candles.select(
+            ~candles.confirm & (candles.ts > (last_ts if last_ts is not None else -1))
+        )
+        df = self.store.frame(inst_id, bar, max(limit - len(forming), 0))
+        if len(forming):
+            df = pd.concat([df, candles_to_frame(forming)])
+        
+        print(f"✅ 成功获取 {len(df)} 根K线数据（本地存储 {self.store.count(inst_id, bar)} 根）")
+        return df
+    
+    def _merge_into_store(self, inst_id: str, bar: str, ts: np.ndarray, ohlcv: np.ndarray):
+        """将一段已收盘K线合并进存储（与已有数据不连续时直接替换）"""
+        last_ts = self.store.last_timestamp(inst_id, bar)
+        if last_ts is None or len(ts) == 0 or last_ts < ts[0]:
+            self.store.replace(inst_id, bar, ts, ohlcv)
+            return
+        
+        stored_ts, stored_ohlcv = self.store.arrays(inst_id, bar)
+        older = stored_ts < ts[0]
+        self.store.replace(
+            inst_id, bar,
+            np.concatenate([stored_ts[older], ts]),
+            np.concatenate([stored_ohlcv[older], ohlcv])
+        )
+    
+    def fetch_history(self, symbol: str, interval: str, limit: Optional[int] = None,
+                      start: Optional[Union[str, datetime]] = None,
+                      resume: bool = True) -> pd.DataFrame:
+        """
+        分页回补历史K线（突破单次 100 条的限制）
+        
+        先请求最新一页确定时间锚点，再按周期时长规划所有分页游标，
+        并发请求 history-candles 接口；已完成的分页写入断点文件，
+        中断后再次调用会跳过这些分页。启用本地存储时，回补的已收盘K线
+        合并进存储，之后的信号检测只增量请求新K线。
+        
+        Args:
+            symbol: 交易对
+            interval: 时间周期
+            limit: 需要的K线数量（与 start 二选一）
+            start: 回补起始时间（如 "2021-01-01"）
+            resume: 是否使用断点续传
             
-            # 转换数据类型（先转换为数值类型，再转换为时间戳）
-            df["timestamp"] = pd.to_numeric(df["timestamp"])
-            df["timestamp"] = pd.to_datetime(df["timestamp"], unit="ms")
-            for col in ["open", "high", "low", "close", "volume"]:
-                df[col] = df[col].astype(float)
+        Returns:
+            升序排列的 OHLCV DataFrame
+        """
+        normalized_symbol = self._normalize_symbol(symbol)
+        okx_interval = self._convert_interval(interval)
+        start_ms = int(pd.Timestamp(start).timestamp() * 1000) if start is not None else None
+        
+        print(f"📡 正在从 OKX 回补 {normalized_symbol} {interval} 历史数据...")
+        candles = self._fetch_history_candles(normalized_symbol, okx_interval, limit, start_ms, resume)
+        if not len(candles):
+            raise ValueError(f"No data returned for {normalized_symbol} {interval}")
+        
+        if self.store is not None:
+            closed = candles.select(candles.confirm)
+            self._merge_into_store(normalized_symbol, okx_interval, closed.ts, closed.ohlcv)
+        
+        df = candles_to_frame(candles)
+        print(f"✅ 成功从 OKX 回补 {len(df)} 根K线数据")
+        return df
+    
+    def _fetch_history_candles(self, inst_id: str, bar: str, limit: Optional[int] = None,
+                               start_ms: Optional[int] = None, resume: bool = True) -> Candles:
+        """分页回补（升序、按时间戳去重）"""
+        if limit is None and start_ms is None:
+            limit = self.PAGE_SIZE
+        
+        # 第 0 页：最新数据（包含未收盘K线）
+        first_page = self._request_candles(inst_id, bar, self.PAGE_SIZE)
+        if not len(first_page):
+            return first_page
+        
+        pages = [first_page]
+        bar_ms = BAR_MILLISECONDS.get(bar)
+        
+        if bar_ms is None:
+            # 变长周期（1M）无法预先规划，按游标顺序向前翻页
+            fetched = len(first_page)
+            cursor = int(first_page.ts[0])
+            while not self._history_satisfied(cursor, fetched, limit, start_ms):
+                page = self._request_candles(inst_id, bar, self.PAGE_SIZE,
+                                             after=cursor, history=True)
+                if not len(page):
+                    break
+                pages.append(page)
+                fetched += len(page)
+                cursor = int(page.ts[0])
+        else:
+            anchor_ms = int(first_page.ts[-1]) + bar_ms
+            cursors = plan_page_cursors(anchor_ms, bar_ms, self.PAGE_SIZE,
+                                        limit=limit, start_ms=start_ms)
+            checkpoint = BackfillCheckpoint(self.checkpoint_dir, inst_id,
+                                            bar, self.PAGE_SIZE) if resume else None
             
-            # 选择需要的列
-            df = df[["timestamp", "open", "high", "low", "close", "volume"]].copy()
-            df.set_index("timestamp", inplace=True)
+            pending = []
+            for cursor in cursors:
+                if checkpoint is not None and checkpoint.done(cursor):
+                    pages.append(checkpoint.get(cursor))
+                else:
+                    pending.append(cursor)
             
-            print(f"✅ 成功从 OKX 获取 {len(df)} 根K线数据")
-            return df
+            if pending:
+                print(f"📡 并发请求 {len(pending)} 页历史数据"
+                      f"（已完成 {len(cursors) - len(pending)} 页）...")
+                with ThreadPoolExecutor(max_workers=self.backfill_workers) as executor:
+                    futures = {
+                        executor.submit(self._request_candles, inst_id, bar,
+                                        self.PAGE_SIZE, cursor, True): cursor
+                        for cursor in pending
+                    }
+                    for future in as_completed(futures):
+                        page = future.result()
+                        pages.append(page)
+                        if checkpoint is not None:
+                            checkpoint.save(futures[future], page)
             
-        except (requests.exceptions.RequestException, ValueError) as e:
-            # 如果 OKX API 失败，尝试使用备用方法
-            print(f"⚠️  OKX API 访问失败: {e}")
-            print(f"📡 尝试使用备用数据源...")
-            return self._fetch_fallback_data(symbol, interval, limit)
+            if checkpoint is not None:
+                checkpoint.clear()
+        
+        # 第 0 页放在最后，与历史页重叠时以最新数据为准
+        candles = merge_candles(pages[1:] + pages[:1])
+        if start_ms is not None:
+            candles = candles.select(candles.ts >= start_ms)
+        if limit is not None:
+            candles = candles.tail(limit)
+        return candles
+    
+    def _history_satisfied(self, oldest_ts: int, fetched: int, limit: Optional[int],
+                           start_ms: Optional[int]) -> bool:
+        """判断顺序翻页是否已获取足够的数据"""
+        if start_ms is not None:
+            return oldest_ts <= start_ms
+        return fetched >= (limit or 0)
     
     def _fetch_fallback_data(self, symbol: str, interval: str, limit: int = 500) -> pd.DataFrame:
         """
@@ -136,26 +525,9 @@ class OKXDataFetcher:
             normalized_symbol = self._normalize_symbol(symbol)
             print(f"📡 使用备用数据源获取 {normalized_symbol} 数据...")
             
-            from datetime import datetime, timedelta
-            import numpy as np
-            
-            # 生成基于当前时间的模拟数据
-            end_date = datetime.now()
-            if interval == "1d" or interval == "1D":
-                start_date = end_date - timedelta(days=min(limit, 500))
-                freq = "D"
-            elif interval == "1w" or interval == "1W":
-                start_date = end_date - timedelta(weeks=min(limit, 100))
-                freq = "W"
-            else:
-                start_date = end_date - timedelta(days=min(limit, 500))
-                freq = "D"
-            
-            dates = pd.date_range(start=start_date, end=end_date, freq=freq)[-limit:]
-            
             # 获取当前价格作为基准（从 CoinGecko 获取）
             try:
-                cg_response = requests.get(
+                cg_response = self.http.get(
                     "https://api.coingecko.com/api/v3/simple/price",
                     params={"ids": "arweave", "vs_currencies": "usd"},
                     timeout=10
@@ -171,57 +543,74 @@ class OKXDataFetcher:
                 print(f"⚠️  无法获取实时价格，使用默认价格: ${current_price:.4f}")
             
             # 生成模拟价格数据（基于随机游走）
-            np.random.seed(42)
-            price_changes = np.random.normal(0, 0.02, len(dates))
-            prices = [current_price]
-            for change in price_changes[1:]:
-                prices.append(prices[-1] * (1 + change))
-            
-            # 创建 OHLCV 数据
-            data = []
-            for i, (date, close) in enumerate(zip(dates, prices)):
-                volatility = abs(np.random.normal(0, 0.01))
-                high = close * (1 + volatility * 1.5)
-                low = close * (1 - volatility * 1.5)
-                open_price = prices[i-1] if i > 0 else close
-                volume = np.random.uniform(1000000, 5000000)
-                
-                data.append({
-                    "timestamp": date,
-                    "open": open_price,
-                    "high": high,
-                    "low": low,
-                    "close": close,
-                    "volume": volume
-                })
-            
-            df = pd.DataFrame(data)
-            df.set_index("timestamp", inplace=True)
+            bar = self._convert_interval(interval)
+            bar = bar if bar in BAR_MILLISECONDS else "1D"
+            df = generate_ohlcv(limit, bar, start_price=current_price, seed=42)
             print(f"✅ 生成了 {len(df)} 根K线数据（基于当前价格 ${current_price:.4f}）")
             return df
             
         except Exception as e:
             raise ConnectionError(f"所有数据源都失败: {e}")
     
-    def fetch_multiple_intervals(self, intervals: List[str], limit: int = 500) -> Dict[str, pd.DataFrame]:
+    def fetch_multiple_intervals(self, symbol: str, intervals: List[str],
+                                 limit: int = 500) -> Dict[str, pd.DataFrame]:
         """
-        获取多个周期的数据
+        并发获取同一交易对多个周期的数据
         
         Args:
+            symbol: 交易对
             intervals: 时间周期列表
-            limit: 获取数量（OKX 单次最多 100）
+            limit: 获取数量
+            
+        Returns:
+            字典，key为周期，value为DataFrame（失败为None）
+        """
+        from app.async_fetcher import AsyncFetchEngine
+        
+        return AsyncFetchEngine(self).fetch_all_sync([symbol], intervals, limit)[symbol]
+    
+    def fetch_timeframes(self, symbol: str, intervals: List[str], limit: Optional[int] = None,
+                         base_interval: Optional[str] = None) -> Dict[str, pd.DataFrame]:
+        """
+        只请求一个基础周期，在本地合成其余周期（各周期数据来自同一份K线，互相一致）
+        
+        Args:
+            symbol: 交易对
+            intervals: 时间周期列表
+            limit: 每个周期的K线数量（默认为各周期声明的所需数量）
+            base_interval: 基础周期（默认取配置 data.base_interval，未配置时逐个周期请求）
             
         Returns:
             字典，key为周期，value为DataFrame
         """
-        result = {}
+        base_interval = base_interval or self.base_interval
+        limits = {
+            interval: limit if limit is not None else self.required_bars(symbol, interval)
+            for interval in intervals
+        }
+        frames: Dict[str, pd.DataFrame] = {}
+        
+        if base_interval:
+            base_bar = self._convert_interval(base_interval)
+            targets = {interval: self._convert_interval(interval) for interval in intervals}
+            derived = {
+                interval: bar for interval, bar in targets.items()
+                if can_derive(base_bar, bar) and (
+                    bar == base_bar or bars_needed(base_bar, bar, limits[interval]) <= self.max_base_bars
+                )
+            }
+            if derived:
+                needed = max(
+                    bars_needed(base_bar, bar, limits[interval]) for interval, bar in derived.items()
+                )
+                base_df = self.fetch_klines(symbol, base_interval, needed)
+                for interval, bar in derived.items():
+                    df = base_df if bar == base_bar else resample_ohlcv(base_df, bar)
+                    frames[interval] = df.tail(limits[interval])
+        
+        # 无法由基础周期合成的周期（比基础周期更小、边界不整除或所需基础K线过多）单独请求
         for interval in intervals:
-            try:
-                df = self.fetch_klines(interval, limit)
-                result[interval] = df
-            except Exception as e:
-                print(f"❌ 获取 {interval} 数据失败: {e}")
-                result[interval] = None
+            if interval not in frames:
+                frames[interval] = self.fetch_klines(symbol, interval, limits[interval])
         
-        return result
-
+        return {interval: frames[interval] for interval in intervals}
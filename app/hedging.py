@@ -0,0 +1,145 @@
+"""
+对冲请求模块 - 主地址响应过慢时向备用地址发出相同请求，取先返回的结果
+
+对冲延迟取主地址近期响应耗时的分位数（默认 p95），正常情况下只有约 5% 的请求
+会被对冲，尾部延迟被限制在"对冲延迟 + 备用地址耗时"以内，而不会让总请求量翻倍。
+"""
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Optional
+
+import numpy as np
+import requests
+
+from app.http_client import HttpClient, Timeout
+
+
+class HedgedRequester:
+    """带对冲的 GET 请求（接口与 HttpClient.get 相同）"""
+
+    def __init__(self, http: HttpClient, primary_base: str, mirror_base: str,
+                 quantile: float = 0.95, min_delay: float = 0.1, max_delay: float = 3.0,
+                 window: int = 200, max_workers: int = 32,
+                 allow_hedge: Optional[Callable[[str], bool]] = None):
+        """
+        Args:
+            http: 共享 HTTP 客户端
+            primary_base: 主地址（如 https://www.okx.com/api/v5）
+            mirror_base: 备用地址（如 https://aws.okx.com/api/v5）
+            quantile: 对冲延迟取主地址耗时的分位数
+            min_delay: 对冲延迟下限（秒）
+            max_delay: 对冲延迟上限（秒，样本不足时使用）
+            window: 统计耗时的最近请求数
+            max_workers: 同时在途的请求数
+            allow_hedge: 发出对冲请求前的检查（参数为请求地址，如限速配额），返回 False 时不对冲
+        """
+        self.http = http
+        self.primary_base = primary_base.rstrip("/")
+        self.mirror_base = mirror_base.rstrip("/")
+        self.quantile = quantile
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.allow_hedge = allow_hedge
+        self._latencies = deque(maxlen=window)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hedge")
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.latency_saved = 0.0
+
+    def delay(self) -> float:
+        """当前对冲延迟（秒）"""
+        with self._lock:
+            if len(self._latencies) < 20:
+                return self.max_delay
+            delay = float(np.quantile(self._latencies, self.quantile))
+        return min(max(delay, self.min_delay), self.max_delay)
+
+    def _timed_get(self, url: str, params: Optional[dict], timeout: Optional[Timeout],
+                   begun: Optional[threading.Event] = None) -> requests.Response:
+        if begun is not None:
+            begun.set()
+        started = time.perf_counter()
+        response = self.http.get(url, params=params, timeout=timeout)
+        response.elapsed_total = time.perf_counter() - started
+        return response
+
+    def get(self, url: str, params: Optional[dict] = None,
+            timeout: Optional[Timeout] = None) -> requests.Response:
+        """发送 GET 请求，主地址超过对冲延迟未返回时同时请求备用地址"""
+        with self._lock:
+            self.requests += 1
+        begun = threading.Event()
+        primary = self._executor.submit(self._timed_get, url, params, timeout, begun)
+        primary.add_done_callback(self._record_primary)
+
+        # 对冲延迟从主请求真正开始时计时：并发请求多时在线程池中排队的时间不算主地址耗时
+        begun.wait()
+        started = time.perf_counter()
+        done, _ = wait([primary], timeout=self.delay())
+        if done or not url.startswith(self.primary_base):
+            return primary.result()
+        if self.allow_hedge is not None and not self.allow_hedge(url):
+            return primary.result()
+
+        with self._lock:
+            self.hedged += 1
+        mirror_url = self.mirror_base + url[len(self.primary_base):]
+        mirror = self._executor.submit(self._timed_get, mirror_url, params, timeout)
+
+        pending = {primary, mirror}
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    response = future.result()
+                except requests.exceptions.RequestException as e:
+                    error = error or e
+                    continue
+                if response.status_code >= 400 and pending:
+                    continue  # 错误响应（4xx/429 限速/5xx）时等待另一个请求
+                if future is mirror:
+                    self._record_hedge_win(primary, time.perf_counter() - started)
+                return response
+        raise error
+
+    def _record_primary(self, future: Future):
+        """主地址请求完成时记录耗时（失败的请求不计入分位数）"""
+        if future.exception() is None:
+            with self._lock:
+                self._latencies.append(future.result().elapsed_total)
+
+    def _record_hedge_win(self, primary: Future, elapsed: float):
+        """备用地址先返回：主地址完成后把两者耗时之差计入节省的延迟"""
+        with self._lock:
+            self.hedge_wins += 1
+
+        def saved(future: Future):
+            if future.exception() is None:
+                with self._lock:
+                    self.latency_saved += max(future.result().elapsed_total - elapsed, 0.0)
+
+        primary.add_done_callback(saved)
+
+    def stats(self) -> Dict[str, float]:
+        """
+        对冲统计
+
+        Returns:
+            requests 请求数、hedged 对冲次数、hedge_rate 对冲率、hedge_wins 备用地址先返回次数、
+            latency_saved_ms 累计节省的延迟（毫秒）、delay_ms 当前对冲延迟（毫秒）
+        """
+        delay = self.delay()
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "hedged": self.hedged,
+                "hedge_rate": self.hedged / self.requests if self.requests else 0.0,
+                "hedge_wins": self.hedge_wins,
+                "latency_saved_ms": self.latency_saved * 1000,
+                "delay_ms": delay * 1000,
+            }
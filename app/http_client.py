@@ -0,0 +1,148 @@
+"""
+HTTP 传输层 - 所有出站请求共用的连接池会话
+
+- 连接池复用 TCP/TLS 连接（keep-alive），每个主机单独限制连接数
+- 连接超时与读取超时分开设置
+- 失败时按带抖动的指数退避自动重试（POST 只在连接失败时重试，避免重复推送）
+- 统计各主机的请求数与新建连接数，用于观察连接复用率
+"""
+import threading
+import warnings
+import requests
+from requests.adapters import HTTPAdapter
+from typing import Dict, Optional, Tuple, Union
+from urllib.parse import urlparse
+from urllib3.util.retry import Retry
+
+
+Timeout = Union[float, Tuple[float, float]]
+
+
+class HttpClient:
+    """共享 HTTP 客户端（基于 requests.Session 连接池）"""
+
+    def __init__(self, config: Optional[dict] = None):
+        config = config or {}
+        self.connect_timeout = config.get("connect_timeout", 3.05)
+        self.read_timeout = config.get("read_timeout", 15)
+        self.pool_maxsize = config.get("pool_maxsize", 10)
+        self.host_limits: Dict[str, int] = config.get("hosts", {})
+
+        self.retry = Retry(
+            total=config.get("retries", 3),
+            backoff_factor=config.get("backoff_factor", 0.5),
+            backoff_jitter=config.get("backoff_jitter", 0.3),
+            backoff_max=config.get("backoff_max", 10),
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset({"GET"}),
+            raise_on_status=False,
+        )
+
+        self.session = requests.Session()
+        self._adapters: Dict[str, HTTPAdapter] = {}
+        self._lock = threading.Lock()
+
+        default_adapter = self._make_adapter(self.pool_maxsize)
+        self.session.mount("https://", default_adapter)
+        self.session.mount("http://", default_adapter)
+        self._adapters["*"] = default_adapter
+
+    def _make_adapter(self, maxsize: int) -> HTTPAdapter:
+        """创建连接池适配器（pool_block 保证单主机连接数不超过上限）"""
+        return HTTPAdapter(
+            pool_connections=10,
+            pool_maxsize=maxsize,
+            pool_block=True,
+            max_retries=self.retry,
+        )
+
+    def _ensure_adapter(self, url: str):
+        """为配置了独立连接上限的主机挂载专用适配器"""
+        parsed = urlparse(url)
+        host = parsed.hostname or ""
+        if host not in self.host_limits or host in self._adapters:
+            return
+        with self._lock:
+            if host in self._adapters:
+                return
+            adapter = self._make_adapter(self.host_limits[host])
+            prefix = f"{parsed.scheme}://{parsed.netloc}"
+            self.session.mount(prefix, adapter)
+            self._adapters[host] = adapter
+
+    def _timeout(self, timeout: Optional[Timeout]) -> Tuple[float, float]:
+        """统一为 (连接超时, 读取超时)；只传一个数字时视为读取超时"""
+        if timeout is None:
+            return self.connect_timeout, self.read_timeout
+        if isinstance(timeout, tuple):
+            return timeout
+        return min(self.connect_timeout, timeout), timeout
+
+    def get(self, url: str, params: Optional[dict] = None,
+            timeout: Optional[Timeout] = None, **kwargs) -> requests.Response:
+        """发送 GET 请求"""
+        self._ensure_adapter(url)
+        return self.session.get(url, params=params, timeout=self._timeout(timeout), **kwargs)
+
+    def post(self, url: str, data: Optional[dict] = None,
+             timeout: Optional[Timeout] = None, **kwargs) -> requests.Response:
+        """发送 POST 请求"""
+        self._ensure_adapter(url)
+        return self.session.post(url, data=data, timeout=self._timeout(timeout), **kwargs)
+
+    def stats(self) -> Dict[str, Dict]:
+        """
+        连接复用统计
+
+        Returns:
+            {host: {"requests": 请求数, "connections": 新建连接数, "reuse_rate": 复用率}}
+        """
+        result = {}
+        for adapter in set(self._adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                entry = result.setdefault(pool.host, {"requests": 0, "connections": 0})
+                entry["requests"] += pool.num_requests
+                entry["connections"] += pool.num_connections
+
+        for entry in result.values():
+            requests_count = entry["requests"]
+            entry["reuse_rate"] = (
+                1 - entry["connections"] / requests_count if requests_count else 0.0
+            )
+        return result
+
+    def close(self):
+        """关闭会话，释放所有连接"""
+        self.session.close()
+
+
+_default_client: Optional[HttpClient] = None
+_default_config: Optional[dict] = None
+_default_lock = threading.Lock()
+
+
+def get_http_client(config: Optional[dict] = None) -> HttpClient:
+    """
+    获取进程内共享的 HTTP 客户端
+
+    第一次调用时按 config 创建，之后的调用返回同一个实例，
+    这样数据获取和通知推送共用同一组连接池。程序启动时应先按配置调用一次
+    （见 main_v2.py），之后不传 config 取得同一个实例；已创建后传入不同的 config 不会生效，并发出警告。
+    """
+    global _default_client, _default_config
+    if _default_client is None:
+        with _default_lock:
+            if _default_client is None:
+                _default_client = HttpClient(config)
+                _default_config = config
+    if config is not None and config != _default_config:
+        warnings.warn(
+            f"共享 HTTP 客户端已按 {_default_config} 创建，新的配置 {config} 未生效"
+            "（应在其他组件之前按配置调用 get_http_client）",
+            RuntimeWarning, stacklevel=2,
+        )
+    return _default_client
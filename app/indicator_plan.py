@@ -0,0 +1,256 @@
+"""
+指标执行计划 - 把配置中声明的指标编译成一份去重、按依赖排序的计算步骤
+
+INDICATORS 登记每种指标（settings.yaml 中 signals.indicators 下的名称）由哪些基础步骤组成，
+如 MACD = EMA(fast) - EMA(slow) 及其信号线。步骤以 (运算, 输入, 参数) 为键，输入为K线列名
+或另一个步骤的键（与 FeatureCache 的键约定相同）。相同的键只保留一个：EMA 检测器与 MACD
+共用的 EMA(12)/EMA(26)、MA20 与布林带中轨都只算一次。步骤总是在其输入之后加入，加入顺序
+即依赖顺序，run 按此顺序对整段K线逐步执行 OPS 中的向量化内核，每个步骤只遍历数据一次。
+单个交易对的分析（SignalManager.analyze / analyze_series、IndicatorCalculator）由 FeatureCache
+按同样的步骤键计算，两条路径共用 INDICATORS 中的定义。
+内核假定输入不含 NaN/inf（一个 NaN 会影响之后的所有值），输入有缺失值的步骤改用 PANDAS_OPS
+计算，结果与 pandas rolling/ewm 相同（只有包含缺失值的窗口为 NaN）。
+
+新增指标：用 register_indicator 登记构建函数，再在 settings.yaml 的 signals.indicators 中声明参数。
+"""
+import math
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from app import kernels
+from app.batch_indicators import rsi, rsv
+
+
+# 步骤的键：(运算, 输入, 参数)；输入为列名或其他步骤的键
+Key = Tuple
+Input = Union[str, Key]
+
+# 基础运算：func(*输入数组, *参数)，沿最后一维计算
+OPS: Dict[str, Callable[..., np.ndarray]] = {
+    "sma": kernels.sma,
+    "ema": kernels.ema,
+    "std": kernels.rolling_std,
+    "rsi": rsi,
+    "rsv": rsv,
+    "scale": lambda x, factor: x * factor,
+    "sum": lambda a, b: a + b,
+    "difference": lambda a, b: a - b,
+}
+
+# 各运算让结果比输入晚多少根K线才有效：窗口运算为窗口长度 - 1，RSI 多 1 根（涨跌幅），
+# EMA 的初值取第一个值，约 2 倍周期（span = 2/alpha - 1）后初值影响可忽略
+LAGS: Dict[str, Callable[..., int]] = {
+    "sma": lambda length: length - 1,
+    "std": lambda length: length - 1,
+    "rsv": lambda period: period - 1,
+    "rsi": lambda length: length,
+    "ema": lambda alpha: math.ceil(2 * (2 / alpha - 1)),
+}
+
+# 逐元素运算，NaN 不会扩散到其他位置，不需要检查输入
+ELEMENTWISE = ("scale", "sum", "difference")
+
+
+def _pandas_rsi(close, length: int):
+    delta = close.diff()
+    gain = delta.where(delta > 0, 0).rolling(window=length).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=length).mean()
+    return 100 - (100 / (1 + gain / loss))
+
+
+def _pandas_rsv(close, high, low, period: int):
+    lowest_low = low.rolling(window=period).min()
+    highest_high = high.rolling(window=period).max()
+    return ((close - lowest_low) / (highest_high - lowest_low) * 100).fillna(50)
+
+
+# 窗口/递推运算的 pandas 实现：输入为按时间索引的 Series，或 DataFrame（每列一个交易对）
+PANDAS_OPS: Dict[str, Callable[..., Union[pd.Series, pd.DataFrame]]] = {
+    "sma": lambda x, length: x.rolling(window=length).mean(),
+    "ema": lambda x, alpha: x.ewm(alpha=alpha, adjust=False).mean(),
+    "std": lambda x, length: x.rolling(window=length).std(),
+    "rsi": _pandas_rsi,
+    "rsv": _pandas_rsv,
+}
+
+
+def run_step(op: str, arrays: Sequence[np.ndarray], params: Tuple) -> np.ndarray:
+    """执行一个步骤：输入全为有限值时用 OPS 的内核，否则用 PANDAS_OPS"""
+    if op in ELEMENTWISE or all(np.isfinite(array).all() for array in arrays):
+        return OPS[op](*arrays, *params)
+    shape = np.shape(arrays[0])
+    frames = [pd.DataFrame(np.reshape(array, (-1, shape[-1])).T) for array in arrays]
+    result = PANDAS_OPS[op](*frames, *params)
+    return result.to_numpy(dtype=np.float64).T.reshape(shape)
+
+
+class IndicatorPlan:
+    """编译后的执行计划：按依赖顺序排列的去重步骤，以及各指标列对应的步骤"""
+
+    def __init__(self):
+        self.steps: Dict[Key, None] = {}
+        self.columns: Dict[str, Key] = {}
+
+    def step(self, op: str, inputs: Sequence[Input], *params) -> Key:
+        """
+        加入一个计算步骤（已有相同的键时直接复用）
+
+        Args:
+            op: OPS 中的运算
+            inputs: 输入（列名或已加入的步骤的键）
+            params: 运算参数
+
+        Returns:
+            步骤的键
+        """
+        key = (op, tuple(inputs), params)
+        if key not in self.steps:
+            missing = [source for source in inputs if not isinstance(source, str) and source not in self.steps]
+            if op not in OPS or missing:
+                raise ValueError(f"无效的计算步骤: {key}")
+            self.steps[key] = None
+        return key
+
+    def add(self, indicator: str, **params) -> List[str]:
+        """
+        按 INDICATORS 中的构建函数加入一个指标
+
+        Args:
+            indicator: 指标名（如 "macd"）
+            params: 指标参数（与 settings.yaml 中的键相同，缺省时取构建函数的默认值）
+
+        Returns:
+            该指标产生的列名
+        """
+        if indicator not in INDICATORS:
+            raise ValueError(f"未知的指标: {indicator}（可选 {', '.join(INDICATORS)}）")
+        try:
+            outputs = INDICATORS[indicator](self, **params)
+        except TypeError as e:
+            raise ValueError(f"指标 {indicator} 的参数有误: {e}") from e
+        for name, key in outputs.items():
+            # 同名列（如两组参数不同的 MACD）只能对应一个步骤
+            if self.columns.get(name, key) != key:
+                raise ValueError(f"指标列 {name} 的参数冲突")
+            self.columns[name] = key
+        return list(outputs)
+
+    def required(self, columns: Sequence[str]) -> List[Key]:
+        """计算这些列需要执行的步骤（按依赖顺序）"""
+        needed = set()
+        pending = [self.columns[name] for name in columns]
+        while pending:
+            key = pending.pop()
+            if key not in needed:
+                needed.add(key)
+                pending.extend(source for source in key[1] if not isinstance(source, str))
+        return [key for key in self.steps if key in needed]
+
+    def warmup_bars(self, columns: Optional[Sequence[str]] = None) -> int:
+        """
+        这些列（为空时全部列）的最新两根都有效所需的最少K线数量（多 1 根用于判断交叉）
+
+        串联的步骤延迟相加（如 MACD 信号线 = 慢线 EMA 的延迟 + 信号线 EMA 的延迟）。
+        """
+        lags: Dict[Key, int] = {}
+        for key in self.required(list(self.columns) if columns is None else columns):
+            op, inputs, params = key
+            before = max((lags[source] for source in inputs if not isinstance(source, str)), default=0)
+            lags[key] = before + (LAGS[op](*params) if op in LAGS else 0)
+        return max(lags.values(), default=0) + 2
+
+    def run(self, data: Dict[str, np.ndarray], columns: Optional[Sequence[str]] = None) -> Dict[str, np.ndarray]:
+        """
+        对整段K线执行计划
+
+        Args:
+            data: {"close": 数组, "high": ..., "low": ...}，(交易对, 时间) 矩阵或一维序列
+            columns: 只计算这些列及其依赖的步骤（为空时全部计算）
+
+        Returns:
+            {列名: 数组}，形状与输入相同
+        """
+        names = list(self.columns) if columns is None else list(columns)
+        unknown = [name for name in names if name not in self.columns]
+        if unknown:
+            raise ValueError(f"未知的指标: {', '.join(unknown)}（可选 {', '.join(self.columns)}）")
+
+        values: Dict[Key, np.ndarray] = {}
+        for key in self.required(names):
+            op, inputs, params = key
+            arrays = [data[source] if isinstance(source, str) else values[source] for source in inputs]
+            values[key] = run_step(op, arrays, params)
+        return {name: values[self.columns[name]] for name in names}
+
+
+def _ema(plan: IndicatorPlan, source: Input, span: float) -> Key:
+    return plan.step("ema", [source], 2.0 / (span + 1.0))
+
+
+def _ma(plan: IndicatorPlan, periods: Sequence[int] = (20, 60)) -> Dict[str, Key]:
+    return {f"MA{n}": plan.step("sma", ["close"], n) for n in periods}
+
+
+def _ema_pair(plan: IndicatorPlan, fast: int = 12, slow: int = 26) -> Dict[str, Key]:
+    return {f"EMA{n}": _ema(plan, "close", n) for n in (fast, slow)}
+
+
+def _macd(plan: IndicatorPlan, fast: int = 12, slow: int = 26, signal: int = 9) -> Dict[str, Key]:
+    line = plan.step("difference", [_ema(plan, "close", fast), _ema(plan, "close", slow)])
+    signal_line = _ema(plan, line, signal)
+    return {"MACD": line, "MACD_signal": signal_line, "MACD_hist": plan.step("difference", [line, signal_line])}
+
+
+def _rsi(plan: IndicatorPlan, period: int = 14) -> Dict[str, Key]:
+    return {"RSI": plan.step("rsi", ["close"], period)}
+
+
+def _kdj(plan: IndicatorPlan, period: int = 9, k_period: int = 3, d_period: int = 3) -> Dict[str, Key]:
+    k = plan.step("ema", [plan.step("rsv", ["close", "high", "low"], period)], 1 / k_period)
+    d = plan.step("ema", [k], 1 / d_period)
+    j = plan.step("difference", [plan.step("scale", [k], 3), plan.step("scale", [d], 2)])
+    return {"K": k, "D": d, "J": j}
+
+
+def _bollinger(plan: IndicatorPlan, period: int = 20, std_dev: float = 2.0) -> Dict[str, Key]:
+    middle = plan.step("sma", ["close"], period)
+    width = plan.step("scale", [plan.step("std", ["close"], period)], std_dev)
+    return {
+        "BB_upper": plan.step("sum", [middle, width]),
+        "BB_middle": middle,
+        "BB_lower": plan.step("difference", [middle, width]),
+    }
+
+
+# 指标登记表：名称 -> 构建函数 build(plan, **参数)，返回 {列名: 步骤的键}
+INDICATORS: Dict[str, Callable[..., Dict[str, Key]]] = {
+    "ma": _ma,
+    "ema": _ema_pair,
+    "macd": _macd,
+    "rsi": _rsi,
+    "kdj": _kdj,
+    "bollinger": _bollinger,
+}
+
+
+def register_indicator(name: str, build: Callable[..., Dict[str, Key]]):
+    """登记新指标（build 用 plan.step 组合基础运算，返回 {列名: 步骤的键}）"""
+    INDICATORS[name] = build
+
+
+def compile_plan(declarations: Dict[str, Optional[dict]]) -> IndicatorPlan:
+    """
+    把声明的指标编译成一份执行计划
+
+    Args:
+        declarations: {指标名: 参数}，即 settings.yaml 的 signals.indicators（参数为空时取默认值）
+
+    Returns:
+        IndicatorPlan
+    """
+    plan = IndicatorPlan()
+    for name, params in declarations.items():
+        plan.add(name, **(params or {}))
+    return plan
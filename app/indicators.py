@@ -3,91 +3,131 @@
 """
 import pandas as pd
 import numpy as np
-from typing import Dict, Optional, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
 
+from app.feature_cache import FeatureCache
+from app.indicator_plan import compile_plan
 
-class IndicatorCalculator:
-    """技术指标计算器"""
+
+# 默认的指标列（格式与 settings.yaml 的 signals.indicators 相同）：MA20/MA60、MACD(12,26,9)、RSI(14)、BOLL(20)
+DEFAULT_INDICATORS = {
+    "ma": {"periods": [20, 60]},
+    "macd": {"fast": 12, "slow": 26, "signal": 9},
+    "rsi": {"period": 14},
+    "bollinger": {"period": 20, "std_dev": 2.0},
+}
+
+# 精简模式下 signal_type 的类别（Categorical，每行只存 1 字节编码）
+SIGNAL_LABELS = ["", "买入", "卖出"]
+
+
+class IndicatorFrame(pd.DataFrame):
+    """
+    带惰性指标列的 DataFrame
     
-    def __init__(self):
-        pass
+    lazy 中声明的列在第一次被读取（df["RSI"]）时才计算并写入，之后与普通列相同；
+    "RSI" in df 对已声明未计算的列也返回 True。复制、筛选得到的 DataFrame 保留声明
+    （各自持有一份副本），计算结果按索引对齐。
+    """
     
-    def _sma(self, series: pd.Series, length: int) -> pd.Series:
-        """计算简单移动平均"""
-        return series.rolling(window=length).mean()
+    # lazy 是实例属性：不放进 _metadata（pandas 会把同一个 dict 引用传给派生的 DataFrame），
+    # 由 __finalize__ 复制
+    _internal_names = pd.DataFrame._internal_names + ["lazy"]
+    _internal_names_set = set(_internal_names)
     
-    def _ema(self, series: pd.Series, length: int) -> pd.Series:
-        """计算指数移动平均"""
-        return series.ewm(span=length, adjust=False).mean()
+    def __init__(self, *args, lazy: Optional[Dict[str, Callable[[], pd.Series]]] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lazy = dict(lazy or {})
     
-    def _macd(self, series: pd.Series, fast: int = 12, slow: int = 26, signal: int = 9) -> Dict[str, pd.Series]:
-        """计算MACD指标"""
-        ema_fast = self._ema(series, fast)
-        ema_slow = self._ema(series, slow)
-        macd_line = ema_fast - ema_slow
-        signal_line = self._ema(macd_line, signal)
-        histogram = macd_line - signal_line
-        return {
-            "MACD": macd_line,
-            "MACD_signal": signal_line,
-            "MACD_hist": histogram
-        }
+    @property
+    def _constructor(self):
+        return IndicatorFrame
     
-    def _rsi(self, series: pd.Series, length: int = 14) -> pd.Series:
-        """计算RSI指标"""
-        delta = series.diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=length).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=length).mean()
-        rs = gain / loss
-        rsi = 100 - (100 / (1 + rs))
-        return rsi
+    def __finalize__(self, other, method=None, **kwargs):
+        result = super().__finalize__(other, method=method, **kwargs)
+        if isinstance(other, IndicatorFrame):
+            result.lazy = dict(other.lazy)
+        return result
     
-    def _bbands(self, series: pd.Series, length: int = 20, std: float = 2.0) -> Dict[str, pd.Series]:
-        """计算布林带"""
-        middle = self._sma(series, length)
-        std_dev = series.rolling(window=length).std()
-        upper = middle + (std_dev * std)
-        lower = middle - (std_dev * std)
-        return {
-            "BB_upper": upper,
-            "BB_middle": middle,
-            "BB_lower": lower
-        }
+    def __getitem__(self, key):
+        for name in key if isinstance(key, list) else [key]:
+            if isinstance(name, str) and name in self.lazy and name not in self.columns:
+                self[name] = self.lazy[name]()
+        return super().__getitem__(key)
+    
+    def __contains__(self, key) -> bool:
+        return super().__contains__(key) or key in self.lazy
+    
+    def pending(self) -> List[str]:
+        """已声明但尚未计算的列"""
+        return [name for name in self.lazy if name not in self.columns]
+
+
+class IndicatorCalculator:
+    """技术指标计算器"""
+    
+    def __init__(self, backend: str = "pandas", lean: bool = False, lazy: bool = False,
+                 indicators: Optional[dict] = None):
+        """
+        Args:
+            backend: 指标实现，"pandas" 或 "numpy"（见 app/kernels.py）
+            lean: 精简模式——各阶段不再整表复制（浅拷贝后添加列，指标列直接引用特征缓存的结果），
+                signal 存为 int8、signal_type 存为 Categorical，不保留 MA_cross_up/MA_cross_down 辅助列
+            lazy: 指标列按需计算——calculate_indicators 返回 IndicatorFrame，检测器、图表、报告
+                第一次读取某列时才计算（如布林带无人读取就不计算）
+            indicators: 要添加的指标列 {指标名: 参数}（见 app/indicator_plan.py，可含 register_indicator
+                登记的指标），为空时取 DEFAULT_INDICATORS；detect_signals 需要 MA20/MA60/MACD_hist/RSI
+        """
+        self.backend = backend
+        self.lean = lean
+        self.lazy = lazy
+        self.plan = compile_plan(indicators or DEFAULT_INDICATORS)
     
-    def calculate_indicators(self, df: pd.DataFrame) -> pd.DataFrame:
+    def warmup_bars(self) -> int:
+        """
+        最新一根K线的指标有效所需的最少K线数量（按执行计划中各指标的周期计算）
+        
+        默认指标下 MACD 的 EMA 需要约 2 倍（慢线 + 信号线）周期收敛，为 72 根。
+        """
+        return self.plan.warmup_bars()
+    
+    def indicator_columns(self, features: FeatureCache) -> Dict[str, Callable[[], pd.Series]]:
+        """
+        各指标列的计算函数（按执行计划的步骤从特征缓存取结果，同一序列只计算一次）
+        
+        Args:
+            features: K线数据的特征缓存
+            
+        Returns:
+            {列名: 计算函数}
+        """
+        return {name: (lambda key=key: features.step(key)) for name, key in self.plan.columns.items()}
+    
+    def calculate_indicators(self, df: pd.DataFrame,
+                             features: Optional[FeatureCache] = None) -> pd.DataFrame:
         """
         计算所有技术指标
         
         Args:
             df: 包含 OHLCV 数据的 DataFrame
+            features: 同一份数据的特征缓存（与信号检测器共用时传入，为空时新建）
             
         Returns:
-            添加了技术指标的 DataFrame
+            添加了技术指标的 DataFrame（lazy 时为 IndicatorFrame，指标列读取时才计算）
         """
         if df is None or df.empty:
             return df
         
-        df = df.copy()
-        
-        # MA20, MA60
-        df["MA20"] = self._sma(df["close"], 20)
-        df["MA60"] = self._sma(df["close"], 60)
-        
-        # MACD (12, 26, 9)
-        macd_data = self._macd(df["close"], fast=12, slow=26, signal=9)
-        df["MACD"] = macd_data["MACD"]
-        df["MACD_signal"] = macd_data["MACD_signal"]
-        df["MACD_hist"] = macd_data["MACD_hist"]
+        features = features or FeatureCache(df, self.backend)
+        columns = self.indicator_columns(features)
+        # 浅拷贝只复制列的引用，添加指标列不影响调用方的 DataFrame
+        df = df.copy(deep=not self.lean)
         
-        # RSI(14)
-        df["RSI"] = self._rsi(df["close"], length=14)
-        
-        # BOLL(20)
-        boll_data = self._bbands(df["close"], length=20, std=2.0)
-        df["BB_upper"] = boll_data["BB_upper"]
-        df["BB_middle"] = boll_data["BB_middle"]
-        df["BB_lower"] = boll_data["BB_lower"]
+        if self.lazy:
+            return IndicatorFrame(df, lazy=columns)
         
+        for name, compute in columns.items():
+            df[name] = compute()
         return df
     
     def detect_signals(self, df: pd.DataFrame) -> pd.DataFrame:
@@ -113,6 +153,9 @@ class IndicatorCalculator:
         if df is None or df.empty:
             return df
         
+        if self.lean:
+            return self._detect_signals_lean(df)
+        
         df = df.copy()
         
         # 初始化信号列
@@ -146,6 +189,27 @@ class IndicatorCalculator:
         
         return df
     
+    def _detect_signals_lean(self, df: pd.DataFrame) -> pd.DataFrame:
+        """精简模式的 detect_signals：条件在 NumPy 数组上计算，只添加 signal / signal_type 两列"""
+        df = df.copy(deep=False)
+        ma20, ma60 = df["MA20"].to_numpy(), df["MA60"].to_numpy()
+        hist, rsi = df["MACD_hist"].to_numpy(), df["RSI"].to_numpy()
+        
+        # MA交叉（第一根没有上一根，不算交叉）
+        cross_up = np.zeros(len(df), dtype=bool)
+        cross_down = np.zeros(len(df), dtype=bool)
+        cross_up[1:] = (ma20[1:] > ma60[1:]) & (ma20[:-1] <= ma60[:-1])
+        cross_down[1:] = (ma20[1:] < ma60[1:]) & (ma20[:-1] >= ma60[:-1])
+        
+        # 编码：0 无信号，1 买入，2 卖出（对应 SIGNAL_LABELS）
+        codes = np.zeros(len(df), dtype=np.int8)
+        codes[cross_up & (hist > 0) & (rsi > 50)] = 1
+        codes[cross_down & (hist < 0) & (rsi < 60)] = 2
+        
+        df["signal"] = np.array([0, 1, -1], dtype=np.int8)[codes]
+        df["signal_type"] = pd.Categorical.from_codes(codes, SIGNAL_LABELS)
+        return df
+    
     def get_latest_signal(self, df: pd.DataFrame) -> Optional[Dict]:
         """
         获取最新信号
@@ -164,16 +228,10 @@ class IndicatorCalculator:
         if signals.empty:
             return None
         
-        latest = signals.iloc[-1]
-        
-        return {
-            "timestamp": latest.name,
-            "signal": latest["signal"],
-            "signal_type": latest["signal_type"],
-            "close": latest["close"],
-            "MA20": latest["MA20"],
-            "MA60": latest["MA60"],
-            "MACD_hist": latest["MACD_hist"],
-            "RSI": latest["RSI"]
+        # 逐列读取（惰性指标列在此时计算）
+        latest = {
+            name: signals[name].iloc[-1]
+            for name in ("signal", "signal_type", "close", "MA20", "MA60", "MACD_hist", "RSI")
         }
+        return {"timestamp": signals.index[-1], **latest}
 
@@ -0,0 +1,216 @@
+"""
+NumPy 指标内核 - 不经过 pandas rolling/ewm 的向量化实现
+
+与 pandas 结果在浮点误差范围内一致（包括前 length-1 个 NaN）。输入为不含 NaN 的 float64 数组，
+沿最后一维计算（二维数组 (交易对, 时间) 一次算完所有交易对）：
+
+- ema: EMA 是一阶线性递推 y[t] = w·y[t-1] + α·x[t]，分块展开为
+  y = (carry + α·cumsum(x·w^-k)) · w^k，块长取 w^-k 不超过 1e100，块间的进位在
+  w^块长（< 1e-100）量级以下，可忽略，因此所有块一次性计算；alpha 为数组（参数网格）时
+  块长由衰减最快的参数决定，其余参数的进位按块逐块递推
+- sma: 分块累加和（窗口和 = 起点块的后缀和 + 终点块的前缀和，先减去整体均值）
+- rolling_mean_var / rolling_std: 同样的分块方式，块内的前缀/后缀均值和离差平方和按 Welford 递推
+  （所有块同时推进，循环次数为窗口长度），窗口的统计量由两段按 Chan 公式合并。只涉及窗口内
+  相对窗口均值的离差，价格长期漂移（如从 1 涨到 1e5）时不会像 Σx² - (Σx)²/n 那样相消失去精度
+- rolling_min / rolling_max: van Herk/Gil-Werman 算法，按窗口长度分块求前缀/后缀极值，
+  每个窗口的极值为其起点所在块的后缀极值与终点所在块的前缀极值之较小（大）者，O(n)
+"""
+from typing import Tuple
+
+import numpy as np
+
+
+# 分块 EMA 中 w^-k 的上限（指数）
+_EMA_SCALE_EXP = 100 * np.log(10)
+# w^块长 低于此值时块间进位的影响低于浮点精度，不再逐块递推
+_EMA_CARRY_EPS = 1e-18
+
+
+def _head_nan(values: np.ndarray, length: int, n: int) -> np.ndarray:
+    """在最后一维前面补 length-1 个 NaN，得到与输入等长的结果"""
+    out = np.empty(values.shape[:-1] + (n,), dtype=np.float64)
+    head = min(length - 1, n)
+    out[..., :head] = np.nan
+    out[..., head:] = values
+    return out
+
+
+def _blocks(x: np.ndarray, length: int, fill: float) -> np.ndarray:
+    """最后一维按 length 分块（不足一块的部分用 fill 补齐），形状 (..., 块数, length)"""
+    n = x.shape[-1]
+    blocks = -(-n // length)
+    padded = np.full(x.shape[:-1] + (blocks * length,), fill, dtype=np.float64)
+    padded[..., :n] = x
+    return padded.reshape(x.shape[:-1] + (blocks, length))
+
+
+def ema(x: np.ndarray, alpha) -> np.ndarray:
+    """
+    指数移动平均（等同于 ewm(alpha=alpha, adjust=False).mean()）
+
+    Args:
+        x: float64 数组，沿最后一维计算（二维时每行一个交易对）
+        alpha: 平滑系数（span 对应 2 / (span + 1)）；为数组时与 x 除最后一维外的形状广播，
+            每个值一组参数一次算完：一维 x 配 (P,) 的 alpha 得到 (P, T) 的参数网格，
+            (P, T) 的 x 配 (P,) 的 alpha 则每行一组参数（见 app/param_grid.py）
+    """
+    values = np.asarray(x, dtype=np.float64)
+    alpha = np.asarray(alpha, dtype=np.float64)
+    n = values.shape[-1]
+    leading = np.broadcast_shapes(alpha.shape, values.shape[:-1])
+    shape = leading + (n,)
+    values = np.broadcast_to(values, shape)
+    out = np.empty(shape, dtype=np.float64)
+    if n == 0:
+        return out
+
+    alpha = np.broadcast_to(alpha, leading)[..., None]
+    # alpha >= 1 时结果就是原序列：先按 0.5 计算，最后替换
+    passthrough = alpha >= 1.0
+    alpha = np.where(passthrough, 0.5, alpha)
+    decay = 1.0 - alpha
+
+    # 相对首个值计算（EMA 对平移不变），常数序列的结果精确等于该常数，不会出现舍入噪声
+    base = values[..., :1]
+    x = values - base
+    out[..., 0] = base[..., 0]
+    rest = n - 1
+    if rest == 0:
+        return out
+    # 块长按衰减最快的参数取，保证所有参数的 w^-k 都不超过上限
+    block = int(min(rest, max(1, _EMA_SCALE_EXP // -np.log(decay.min()))))
+    padded = _blocks(x[..., 1:], block, 0.0)
+
+    # 块内：进位为 0 时的结果 e[k] = α·Σ w^(k-j)·x[j] = w^k · α·cumsum(x·w^-j)
+    powers = decay[..., None] ** -np.arange(1, block + 1, dtype=np.float64)
+    partial = np.cumsum(padded * powers, axis=-1)
+    partial *= alpha[..., None]
+
+    # 块间进位：上一块最后的值（第一块为 x[0]，相对值为 0）
+    carry = np.zeros(partial.shape[:-1], dtype=np.float64)
+    carry[..., 1:] = partial[..., :-1, -1] / powers[..., -1]
+    # 参数网格中衰减慢的参数 w^块长 不可忽略，进位需要逐块递推：c[b] = 块末值 + w^块长·c[b-1]
+    scale = (decay ** block)[..., 0]
+    if scale.max() > _EMA_CARRY_EPS:
+        for b in range(2, carry.shape[-1]):
+            carry[..., b] += scale * carry[..., b - 1]
+    partial += carry[..., None]
+    partial /= powers
+    out[..., 1:] = partial.reshape(shape[:-1] + (-1,))[..., :rest]
+    out[..., 1:] += base
+    if passthrough.any():
+        out = np.where(passthrough, values, out)
+    return out
+
+
+def _window_sums(x: np.ndarray, length: int) -> np.ndarray:
+    """
+    最后一维上所有长度为 length 的窗口之和（共 n-length+1 个）
+
+    按窗口长度分块做块内累加和：窗口和 = 起点所在块的后缀和 + 终点所在块的前缀和，
+    每个和最多 length 项，不会像整列 cumsum 那样随序列变长累积误差。
+    """
+    n = x.shape[-1]
+    padded = _blocks(x, length, 0.0)
+    flat = x.shape[:-1] + (-1,)
+    prefix = np.cumsum(padded, axis=-1).reshape(flat)
+    suffix = np.cumsum(padded[..., ::-1], axis=-1)[..., ::-1].reshape(flat)
+    sums = suffix[..., :n - length + 1] + prefix[..., length - 1:n]
+    # 起点恰好在块首时窗口就是整块，后缀和已是窗口和
+    aligned = slice(0, n - length + 1, length)
+    sums[..., aligned] = suffix[..., aligned]
+    return sums
+
+
+def sma(x: np.ndarray, length: int) -> np.ndarray:
+    """简单移动平均（等同于 rolling(length).mean()，沿最后一维）"""
+    x = np.asarray(x, dtype=np.float64)
+    n = x.shape[-1]
+    if n < length:
+        return np.full(x.shape, np.nan)
+    shift = x.mean(axis=-1, keepdims=True)
+    window = _window_sums(x - shift, length)
+    window /= length
+    window += shift
+    return _head_nan(window, length, n)
+
+
+def _welford(blocks: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """块内前缀的均值与离差平方和（Welford 递推，沿最后一维，所有块同时推进）"""
+    columns = np.ascontiguousarray(np.moveaxis(blocks, -1, 0))
+    means = np.empty_like(columns)
+    m2s = np.empty_like(columns)
+    mean = np.zeros(blocks.shape[:-1])
+    m2 = np.zeros(blocks.shape[:-1])
+    delta = np.empty_like(mean)
+    for k, x in enumerate(columns):
+        np.subtract(x, mean, out=delta)
+        mean += delta / (k + 1)
+        means[k] = mean
+        m2 += delta * (x - mean)
+        m2s[k] = m2
+    return np.moveaxis(means, 0, -1), np.moveaxis(m2s, 0, -1)
+
+
+def rolling_mean_var(x: np.ndarray, length: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    滚动均值与样本方差（等同于 rolling(length).mean() / .var()，沿最后一维）
+
+    起点在块 a、偏移 o 的窗口 = 块 a 从 o 起的后缀（length-o 个）+ 块 a+1 的前 o 个，
+    两段的 (个数, 均值, 离差平方和) 按 Chan 公式合并：M2 = M2a + M2b + δ²·na·nb/length，
+    δ 为两段均值之差。
+    """
+    x = np.asarray(x, dtype=np.float64)
+    n = x.shape[-1]
+    if n < length or length < 2:
+        return np.full(x.shape, np.nan), np.full(x.shape, np.nan)
+    padded = _blocks(x, length, 0.0)
+    prefix_mean, prefix_m2 = _welford(padded)
+    suffix_mean, suffix_m2 = (a[..., ::-1] for a in _welford(padded[..., ::-1]))
+
+    # 偏移 o 的窗口取下一块前 o 个（o = 0 时为空，窗口就是整块）
+    next_mean = np.zeros_like(suffix_mean)
+    next_m2 = np.zeros_like(suffix_m2)
+    next_mean[..., :-1, 1:] = prefix_mean[..., 1:, :-1]
+    next_m2[..., :-1, 1:] = prefix_m2[..., 1:, :-1]
+    tail = np.arange(length)
+    delta = next_mean - suffix_mean
+    delta[..., 0] = 0.0
+    mean = suffix_mean + delta * (tail / length)
+    m2 = suffix_m2 + next_m2 + delta * delta * ((length - tail) * tail / length)
+    np.maximum(m2, 0.0, out=m2)
+    m2 /= length - 1
+
+    count = n - length + 1
+    flat = x.shape[:-1] + (-1,)
+    return (_head_nan(mean.reshape(flat)[..., :count], length, n),
+            _head_nan(m2.reshape(flat)[..., :count], length, n))
+
+
+def rolling_std(x: np.ndarray, length: int) -> np.ndarray:
+    """滚动样本标准差（等同于 rolling(length).std()，沿最后一维）"""
+    return np.sqrt(rolling_mean_var(x, length)[1])
+
+
+def _rolling_extreme(x: np.ndarray, length: int, op: np.ufunc, fill: float) -> np.ndarray:
+    x = np.asarray(x, dtype=np.float64)
+    n = x.shape[-1]
+    if n < length:
+        return np.full(x.shape, np.nan)
+    padded = _blocks(x, length, fill)
+    flat = x.shape[:-1] + (-1,)
+    prefix = op.accumulate(padded, axis=-1).reshape(flat)
+    suffix = op.accumulate(padded[..., ::-1], axis=-1)[..., ::-1].reshape(flat)
+    # 窗口 [i-length+1, i]：起点所在块的后缀极值 与 终点所在块的前缀极值
+    window = op(suffix[..., :n - length + 1], prefix[..., length - 1:n])
+    return _head_nan(window, length, n)
+
+
+def rolling_min(x: np.ndarray, length: int) -> np.ndarray:
+    """滚动最小值（等同于 rolling(length).min()，沿最后一维）"""
+    return _rolling_extreme(x, length, np.minimum, np.inf)
+
+
+def rolling_max(x: np.ndarray, length: int) -> np.ndarray:
+    """滚动最大值（等同于 rolling(length).max()，沿最后一维）"""
+    return _rolling_extreme(x, length, np.maximum, -np.inf)
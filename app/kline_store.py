@@ -0,0 +1,128 @@
+"""
+本地K线存储模块 - 按 (交易对, 周期) 保存已收盘K线
+
+每个 (交易对, 周期) 对应一个目录，包含两个只追加的二进制文件：
+- ts.i8:     int64 开盘时间戳（毫秒）
+- ohlcv.f8:  float64 行优先矩阵，每行 open, high, low, close, volume
+
+读取时通过 numpy.memmap 映射文件，返回的 DataFrame 直接引用映射内存，
+不需要反序列化，也不会把整段历史复制进内存。
+"""
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+
+OHLCV_COLUMNS = ["open", "high", "low", "close", "volume"]
+
+
+class KlineStore:
+    """本地列式K线存储（只保存已收盘K线）"""
+
+    def __init__(self, root: str = "data/klines"):
+        self.root = Path(root)
+
+    def _paths(self, inst_id: str, bar: str) -> Tuple[Path, Path]:
+        """返回时间戳文件和 OHLCV 文件路径"""
+        directory = self.root / f"{inst_id}_{bar}"
+        return directory / "ts.i8", directory / "ohlcv.f8"
+
+    def arrays(self, inst_id: str, bar: str) -> Tuple[np.ndarray, np.ndarray]:
+        """映射存储文件，返回 (时间戳, OHLCV) 只读数组（不复制数据）"""
+        ts_path, ohlcv_path = self._paths(inst_id, bar)
+        if not ts_path.exists() or not ohlcv_path.exists():
+            return np.empty(0, dtype=np.int64), np.empty((0, 5), dtype=np.float64)
+
+        # 写入中断时两个文件长度可能不一致，以较短的为准
+        count = min(ts_path.stat().st_size // 8, ohlcv_path.stat().st_size // 40)
+        if count == 0:
+            return np.empty(0, dtype=np.int64), np.empty((0, 5), dtype=np.float64)
+
+        ts = np.memmap(ts_path, dtype=np.int64, mode="r", shape=(count,))
+        ohlcv = np.memmap(ohlcv_path, dtype=np.float64, mode="r", shape=(count, 5))
+        return ts, ohlcv
+
+    def count(self, inst_id: str, bar: str) -> int:
+        """已存储的K线数量"""
+        return len(self.arrays(inst_id, bar)[0])
+
+    def last_timestamp(self, inst_id: str, bar: str) -> Optional[int]:
+        """最后一根已存储K线的开盘时间（毫秒），没有数据时返回 None"""
+        ts, _ = self.arrays(inst_id, bar)
+        return int(ts[-1]) if len(ts) else None
+
+    def append(self, inst_id: str, bar: str, ts: np.ndarray, ohlcv: np.ndarray) -> int:
+        """
+        追加已收盘K线（只保留比已存储数据更新的部分）
+
+        Args:
+            inst_id: OKX 交易对
+            bar: OKX 周期
+            ts: 升序 int64 时间戳（毫秒）
+            ohlcv: 对应的 (n, 5) float64 数组
+
+        Returns:
+            实际追加的K线数量
+        """
+        ts = np.asarray(ts, dtype=np.int64)
+        ohlcv = np.ascontiguousarray(ohlcv, dtype=np.float64).reshape(-1, 5)
+
+        last = self.last_timestamp(inst_id, bar)
+        if last is not None:
+            newer = ts > last
+            ts, ohlcv = ts[newer], ohlcv[newer]
+        if len(ts) == 0:
+            return 0
+
+        ts_path, ohlcv_path = self._paths(inst_id, bar)
+        ts_path.parent.mkdir(parents=True, exist_ok=True)
+        self._truncate_to_consistent(ts_path, ohlcv_path)
+        with open(ohlcv_path, "ab") as f:
+            f.write(ohlcv.tobytes())
+        with open(ts_path, "ab") as f:
+            f.write(ts.tobytes())
+        return len(ts)
+
+    def replace(self, inst_id: str, bar: str, ts: np.ndarray, ohlcv: np.ndarray):
+        """用新数据整体替换存储（需要向更早的历史扩展时使用）"""
+        ts_path, ohlcv_path = self._paths(inst_id, bar)
+        ts_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_ts = ts_path.with_suffix(".tmp")
+        tmp_ohlcv = ohlcv_path.with_suffix(".tmp")
+        np.asarray(ts, dtype=np.int64).tofile(tmp_ts)
+        np.ascontiguousarray(ohlcv, dtype=np.float64).tofile(tmp_ohlcv)
+        tmp_ohlcv.replace(ohlcv_path)
+        tmp_ts.replace(ts_path)
+
+    def _truncate_to_consistent(self, ts_path: Path, ohlcv_path: Path):
+        """截断上次中断写入留下的多余字节，保证两个文件按行对齐"""
+        if not ts_path.exists() or not ohlcv_path.exists():
+            for path in (ts_path, ohlcv_path):
+                if path.exists():
+                    path.unlink()
+            return
+        count = min(ts_path.stat().st_size // 8, ohlcv_path.stat().st_size // 40)
+        for path, row_size in ((ts_path, 8), (ohlcv_path, 40)):
+            if path.stat().st_size != count * row_size:
+                with open(path, "r+b") as f:
+                    f.truncate(count * row_size)
+
+    def frame(self, inst_id: str, bar: str, limit: Optional[int] = None) -> pd.DataFrame:
+        """
+        返回存储数据的 DataFrame 视图
+
+        Args:
+            limit: 只返回最近 limit 根K线
+
+        Returns:
+            OHLCV DataFrame（数值列直接引用 memmap，只读）
+        """
+        ts, ohlcv = self.arrays(inst_id, bar)
+        if limit is not None:
+            # 切片起点不能用 -limit：limit 为 0 时 ts[-0:] 是整个存储
+            start = max(len(ts) - limit, 0)
+            ts, ohlcv = ts[start:], ohlcv[start:]
+
+        index = pd.DatetimeIndex(pd.to_datetime(np.asarray(ts), unit="ms"), name="timestamp")
+        return pd.DataFrame(ohlcv, index=index, columns=OHLCV_COLUMNS, copy=False)
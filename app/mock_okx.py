@@ -0,0 +1,384 @@
+"""
+本地 OKX 替身服务 - 离线测试用
+
+MockOKXWebSocketServer 模拟 OKX 业务 WebSocket：响应 subscribe/ping，
+并把调用方推入的K线按订阅关系广播出去，行为与真实的 candle 频道一致。
+
+MockOKXHTTPServer 模拟 OKX REST 行情接口（/market/candles、/market/history-candles），
+返回录制的响应或确定性的模拟K线，并可注入延迟、错误和限流拒绝，用于离线压测。
+将配置中的 exchange.api_base 指向 server.api_base 即可让获取器改用替身服务。
+
+单独启动: python3 -m app.mock_okx --port 8800 --latency 0.05 --error-rate 0.01
+"""
+import asyncio
+import hashlib
+import json
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qs, urlencode, urlparse
+
+from websockets.asyncio.server import serve
+
+from app.backfill import BAR_MILLISECONDS
+from app.rate_limit import OKX_RATE_LIMITS, TokenBucket
+from app.synthetic import synthetic_arrays
+
+
+class MockOKXWebSocketServer:
+    """OKX K线频道的本地替身"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.host = host
+        self.port = port
+        self.server = None
+        # (channel, instId) -> 已订阅的连接
+        self.subscribers: Dict[Tuple[str, str], Set] = {}
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}"
+
+    async def start(self):
+        """启动服务（port=0 时自动分配端口）"""
+        self.server = await serve(self._handler, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        """关闭服务及所有连接"""
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    async def _handler(self, websocket):
+        try:
+            async for raw in websocket:
+                if raw == "ping":
+                    await websocket.send("pong")
+                    continue
+                message = json.loads(raw)
+                if message.get("op") != "subscribe":
+                    await websocket.send(json.dumps({
+                        "event": "error", "code": "60012", "msg": f"Invalid request: {raw}"
+                    }))
+                    continue
+                for arg in message.get("args", []):
+                    key = (arg["channel"], arg["instId"])
+                    self.subscribers.setdefault(key, set()).add(websocket)
+                    await websocket.send(json.dumps({"event": "subscribe", "arg": arg}))
+        finally:
+            for connections in self.subscribers.values():
+                connections.discard(websocket)
+
+    async def wait_for_subscribers(self, count: int = 1, timeout: float = 5.0):
+        """等待指定数量的频道被订阅"""
+        async def _wait():
+            while sum(1 for c in self.subscribers.values() if c) < count:
+                await asyncio.sleep(0.01)
+        await asyncio.wait_for(_wait(), timeout)
+
+    async def push_candle(self, channel: str, inst_id: str, row: List[str]) -> int:
+        """
+        向订阅者推送一条K线
+
+        Args:
+            channel: 频道名（如 "candle4H"）
+            inst_id: 交易对（如 "AR-USDT"）
+            row: [ts, o, h, l, c, vol, volCcy, volCcyQuote, confirm]
+
+        Returns:
+            收到推送的连接数
+        """
+        message = json.dumps({
+            "arg": {"channel": channel, "instId": inst_id},
+            "data": [row]
+        })
+        connections = list(self.subscribers.get((channel, inst_id), ()))
+        for websocket in connections:
+            await websocket.send(message)
+        return len(connections)
+
+    async def broadcast(self, raw: str) -> int:
+        """向所有已订阅的连接发送一条原始消息（如错误事件），返回连接数"""
+        connections = set().union(*self.subscribers.values()) if self.subscribers else set()
+        for websocket in connections:
+            await websocket.send(raw)
+        return len(connections)
+
+    async def replay(self, channel: str, inst_id: str, rows: List[List[str]],
+                     updates_per_bar: int = 3, delay: float = 0.0):
+        """
+        按真实节奏回放K线：每根K线先推送若干次未收盘更新，最后推送收盘
+
+        Args:
+            rows: 升序的已收盘K线（confirm 字段会被覆盖）
+            updates_per_bar: 每根K线收盘前的更新次数
+            delay: 两次推送之间的间隔（秒）
+        """
+        for row in rows:
+            for _ in range(updates_per_bar):
+                await self.push_candle(channel, inst_id, list(row[:8]) + ["0"])
+                if delay:
+                    await asyncio.sleep(delay)
+            await self.push_candle(channel, inst_id, list(row[:8]) + ["1"])
+            if delay:
+                await asyncio.sleep(delay)
+
+
+class MockOKXHTTPServer:
+    """
+    OKX REST K线接口的本地替身
+
+    数据来源（按顺序）：录制目录中已有的响应 -> 录制模式下请求上游并保存 -> 模拟K线。
+    模拟K线按 (instId, bar) 确定性生成，同一交易对每次启动得到相同的数据。
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0,
+                 jitter: float = 0.0, slow_rate: float = 0.0, slow_latency: float = 1.0,
+                 error_rate: float = 0.0, rate_limited: bool = False,
+                 recordings_dir: Optional[str] = None, upstream: Optional[str] = None,
+                 history_bars: int = 1500, seed: int = 0):
+        """
+        Args:
+            latency: 每个请求的固定延迟（秒）
+            jitter: 额外的随机延迟上限（秒）
+            slow_rate: 慢请求（长尾）的概率
+            slow_latency: 慢请求的额外延迟（秒）
+            error_rate: 返回 HTTP 500 的概率
+            rate_limited: 是否按 OKX 接口限速拒绝超额请求（HTTP 429）
+            recordings_dir: 录制响应的目录
+            upstream: 录制模式的上游地址（如 https://www.okx.com/api/v5）
+            history_bars: 每个 (交易对, 周期) 模拟的K线数量
+            seed: 模拟数据和错误注入的随机种子
+        """
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.error_rate = error_rate
+        self.recordings_dir = Path(recordings_dir) if recordings_dir else None
+        self.upstream = upstream.rstrip("/") if upstream else None
+        self.history_bars = history_bars
+        self.seed = seed
+        self.random = random.Random(seed)
+        self.buckets: Dict[str, TokenBucket] = {}
+        if rate_limited:
+            self.buckets = {
+                endpoint: TokenBucket(capacity, period)
+                for endpoint, (capacity, period) in OKX_RATE_LIMITS.items()
+            }
+        self.stats = {"requests": 0, "errors": 0, "rate_limited": 0, "replayed": 0, "recorded": 0}
+        # (instId, bar) -> (升序时间戳, 预先序列化的行)
+        self._series: Dict[Tuple[str, str], Tuple[List[int], List[str]]] = {}
+        self._lock = threading.Lock()
+        self.server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def api_base(self) -> str:
+        """填入 exchange.api_base 的地址"""
+        return f"http://{self.host}:{self.port}/api/v5"
+
+    def start(self) -> "MockOKXHTTPServer":
+        """在后台线程中启动服务（port=0 时自动分配端口）"""
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive，与真实接口一致
+            disable_nagle_algorithm = True  # 响应头和响应体分两次写出，避免 Nagle 延迟
+
+            def do_GET(self):
+                status, body = mock.handle(self.path)
+                try:
+                    self.send_response(status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    self.close_connection = True  # 客户端已超时断开
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """关闭服务"""
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def handle(self, path: str) -> Tuple[int, bytes]:
+        """
+        处理一个 GET 请求
+
+        Returns:
+            (HTTP 状态码, 响应体)
+        """
+        url = urlparse(path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        endpoint = url.path.split("/api/v5/", 1)[-1]
+
+        with self._lock:
+            self.stats["requests"] += 1
+            fail = self.error_rate and self.random.random() < self.error_rate
+            delay = self.latency + (self.random.uniform(0, self.jitter) if self.jitter else 0.0)
+            if self.slow_rate and self.random.random() < self.slow_rate:
+                delay += self.slow_latency
+        if delay:
+            time.sleep(delay)
+
+        if endpoint not in OKX_RATE_LIMITS:
+            return 404, self._error("51000", f"Unknown endpoint: {url.path}")
+        bucket = self.buckets.get(endpoint)
+        if bucket is not None and not bucket.try_acquire():
+            with self._lock:
+                self.stats["rate_limited"] += 1
+            return 429, self._error("50011", "Too Many Requests")
+        if fail:
+            with self._lock:
+                self.stats["errors"] += 1
+            return 500, self._error("50001", "Service temporarily unavailable")
+        if "instId" not in params:
+            return 400, self._error("51000", "Parameter instId error")
+
+        recorded = self._recorded(endpoint, params)
+        if recorded is not None:
+            return 200, recorded
+        return 200, self._synthetic(params)
+
+    @staticmethod
+    def _error(code: str, msg: str) -> bytes:
+        return json.dumps({"code": code, "msg": msg, "data": []}).encode()
+
+    def _recording_path(self, endpoint: str, params: Dict[str, str]) -> Path:
+        query = urlencode(sorted(params.items()))
+        digest = hashlib.sha1(f"{endpoint}?{query}".encode()).hexdigest()[:16]
+        return self.recordings_dir / f"{params['instId']}_{params.get('bar', '1m')}_{digest}.json"
+
+    def _recorded(self, endpoint: str, params: Dict[str, str]) -> Optional[bytes]:
+        """读取录制的响应；录制模式下未命中时请求上游并保存"""
+        if self.recordings_dir is None:
+            return None
+        path = self._recording_path(endpoint, params)
+        if path.exists():
+            with self._lock:
+                self.stats["replayed"] += 1
+            return path.read_bytes()
+        if self.upstream is None:
+            return None
+
+        from app.http_client import get_http_client
+
+        response = get_http_client().get(f"{self.upstream}/{endpoint}", params=params)
+        if response.status_code != 200:
+            return None
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(response.content)
+        with self._lock:
+            self.stats["recorded"] += 1
+        return response.content
+
+    def _series_for(self, inst_id: str, bar: str) -> Tuple[List[int], List[str]]:
+        """某个 (交易对, 周期) 的模拟K线（首次请求时生成）"""
+        key = (inst_id, bar)
+        with self._lock:
+            series = self._series.get(key)
+        if series is not None:
+            return series
+
+        interval = bar if bar in BAR_MILLISECONDS else "1D"
+        ts, ohlcv = synthetic_arrays(
+            self.history_bars, interval, start_price=1.0 + zlib.crc32(inst_id.encode()) % 1000,
+            regimes=(0.5, 1.0, 2.0), jump_intensity=0.1,
+            seed=zlib.crc32(f"{self.seed}:{inst_id}:{bar}".encode())
+        )
+        rows = [
+            '["%d","%.8g","%.8g","%.8g","%.8g","%.8g","0","0","%s"]'
+            % (t, o, h, l, c, v, "0" if i == len(ts) - 1 else "1")
+            for i, (t, (o, h, l, c, v)) in enumerate(zip(ts.tolist(), ohlcv[0].tolist()))
+        ]
+        series = (ts.tolist(), rows)
+        with self._lock:
+            self._series.setdefault(key, series)
+        return series
+
+    def _synthetic(self, params: Dict[str, str]) -> bytes:
+        """按 OKX 分页语义返回模拟K线（倒序，after 为不含的上界）"""
+        ts, rows = self._series_for(params["instId"], params.get("bar", "1m"))
+        limit = min(int(params.get("limit", 100)), 100)
+        end = len(ts)
+        if "after" in params:
+            after = int(params["after"])
+            # ts 升序，找到第一个 >= after 的位置
+            lo, hi = 0, len(ts)
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if ts[mid] < after:
+                    lo = mid + 1
+                else:
+                    hi = mid
+            end = lo
+        page = rows[max(end - limit, 0):end][::-1]
+        return ('{"code":"0","msg":"","data":[' + ",".join(page) + "]}").encode()
+
+
+def main():
+    """命令行启动 HTTP 替身服务"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="本地 OKX REST 替身服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8800)
+    parser.add_argument("--latency", type=float, default=0.0, help="固定延迟（秒）")
+    parser.add_argument("--jitter", type=float, default=0.0, help="随机延迟上限（秒）")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="慢请求概率")
+    parser.add_argument("--slow-latency", type=float, default=1.0, help="慢请求额外延迟（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="HTTP 500 概率")
+    parser.add_argument("--rate-limited", action="store_true", help="按 OKX 限速返回 429")
+    parser.add_argument("--recordings", help="录制响应目录")
+    parser.add_argument("--record-from", help="录制模式：上游地址（如 https://www.okx.com/api/v5）")
+    args = parser.parse_args()
+
+    server = MockOKXHTTPServer(
+        args.host, args.port, latency=args.latency, jitter=args.jitter,
+        slow_rate=args.slow_rate, slow_latency=args.slow_latency,
+        error_rate=args.error_rate, rate_limited=args.rate_limited,
+        recordings_dir=args.recordings, upstream=args.record_from
+    ).start()
+    print(f"🧪 OKX 替身服务已启动，exchange.api_base 设为: {server.api_base}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,11 @@
 """
 通知推送模块 - 支持 Server酱
 """
-import requests
 from typing import Optional
 from datetime import datetime
 
+from app.http_client import get_http_client
+
 
 class Notifier:
     """通知推送器"""
@@ -36,7 +37,7 @@ class Notifier:
         }
         
         try:
-            response = requests.post(url, data=data, timeout=10)
+            response = get_http_client().post(url, data=data, timeout=10)
             response.raise_for_status()
             result = response.json()
             
@@ -0,0 +1,184 @@
+"""
+OKX WebSocket 实时K线模块 - 订阅K线频道，K线收盘时立即触发信号检测
+"""
+import asyncio
+import json
+import pandas as pd
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from websockets.asyncio.client import connect
+from websockets.exceptions import ConnectionClosed
+
+from app.backfill import BAR_MILLISECONDS
+from app.candle_buffer import BarEvent, CandleBuffer
+
+
+OKX_WS_URL = "wss://ws.okx.com:8443/ws/v5/business"
+
+# 收盘回调: (交易对, 周期, 最新K线 DataFrame)
+BarCloseCallback = Callable[[str, str, pd.DataFrame], Optional[Awaitable[None]]]
+# 更新回调: (交易对, 周期, K线事件)，每条推送都会触发（包括未收盘K线的原地更新）
+BarUpdateCallback = Callable[[str, str, BarEvent], None]
+
+
+class OKXCandleStream:
+    """
+    OKX K线推送订阅器
+
+    为每个 (交易对, 周期) 维护一个内存缓冲区，收到 confirm=1 的推送时
+    （K线刚收盘）调用回调，而不是等待定时轮询。断线后自动重连并重新订阅。
+    协程回调作为独立任务运行，不阻塞后续推送的接收；单条消息或回调出错只记录，不中断订阅。
+    """
+
+    def __init__(self, symbols: List[str], intervals: List[str], on_bar_close: BarCloseCallback,
+                 url: str = OKX_WS_URL, max_bars: int = 500, fetcher=None,
+                 ping_interval: float = 25.0, on_bar_update: Optional[BarUpdateCallback] = None):
+        """
+        Args:
+            symbols: 交易对列表（AR/USDT 或 AR-USDT）
+            intervals: 周期列表（4h, 1d）
+            on_bar_close: K线收盘回调（可以是协程函数）
+            url: WebSocket 地址
+            max_bars: 每个缓冲区保留的K线数量
+            fetcher: OKXDataFetcher，用于订阅前预热历史K线
+            ping_interval: 心跳间隔（OKX 30 秒无消息会断开连接）
+            on_bar_update: K线更新回调（同步调用，用于增量更新指标）
+        """
+        self.url = url
+        self.on_bar_close = on_bar_close
+        self.max_bars = max_bars
+        self.fetcher = fetcher
+        self.ping_interval = ping_interval
+        self.stopped = asyncio.Event()
+        self.tasks: Set[asyncio.Task] = set()  # 进行中的收盘回调
+
+        # (instId, OKX 周期) -> (原始交易对, 原始周期)
+        self.channels: Dict[Tuple[str, str], Tuple[str, str]] = {}
+        self.buffers: Dict[Tuple[str, str], CandleBuffer] = {}
+        for symbol in symbols:
+            for interval in intervals:
+                inst_id = self._normalize_symbol(symbol)
+                bar = self._convert_interval(interval)
+                self.channels[(inst_id, bar)] = (symbol, interval)
+                buffer = CandleBuffer(max_bars)
+                if on_bar_update is not None:
+                    buffer.subscribe(
+                        lambda event, s=symbol, i=interval: on_bar_update(s, i, event)
+                    )
+                self.buffers[(inst_id, bar)] = buffer
+
+    def _normalize_symbol(self, symbol: str) -> str:
+        if self.fetcher is not None:
+            return self.fetcher._normalize_symbol(symbol)
+        return symbol.replace("/", "-")
+
+    def _convert_interval(self, interval: str) -> str:
+        if self.fetcher is not None:
+            return self.fetcher._convert_interval(interval)
+        return interval.upper() if interval[-1] in "hdw" else interval
+
+    def warm_up(self):
+        """订阅前用 REST 接口填充缓冲区，收盘时即有完整的指标窗口"""
+        if self.fetcher is None:
+            return
+        for (inst_id, bar), (symbol, interval) in self.channels.items():
+            try:
+                df = self.fetcher.fetch_klines(symbol, interval, self.max_bars)
+            except ConnectionError as e:
+                print(f"⚠️  {symbol} {interval} 预热失败，等待推送填充: {e}")
+                continue
+            if df is not None and not df.empty:
+                self.buffers[(inst_id, bar)].seed(df, BAR_MILLISECONDS.get(bar))
+
+    def _subscribe_message(self) -> str:
+        return json.dumps({
+            "op": "subscribe",
+            "args": [
+                {"channel": f"candle{bar}", "instId": inst_id}
+                for inst_id, bar in self.channels
+            ]
+        })
+
+    async def _handle_message(self, raw: str):
+        """处理一条推送消息"""
+        if raw == "pong":
+            return
+        message = json.loads(raw)
+        if message.get("event") == "error":
+            # 订阅失败（如交易对不存在）只影响对应频道，其余频道照常接收
+            print(f"⚠️  OKX WebSocket 错误: {message.get('code')} {message.get('msg')}")
+            return
+
+        arg = message.get("arg", {})
+        channel = arg.get("channel", "")
+        if not channel.startswith("candle") or "data" not in message:
+            return
+
+        key = (arg.get("instId"), channel[len("candle"):])
+        buffer = self.buffers.get(key)
+        if buffer is None:
+            return
+
+        for row in message["data"]:
+            closed = buffer.update(int(row[0]), [float(v) for v in row[1:6]], row[8] == "1")
+            if closed:
+                symbol, interval = self.channels[key]
+                result = self.on_bar_close(symbol, interval, buffer.frame())
+                if asyncio.iscoroutine(result):
+                    # 在独立任务中运行，其他交易对的推送不必等待本次信号检测完成
+                    task = asyncio.create_task(result)
+                    self.tasks.add(task)
+                    task.add_done_callback(self._callback_done)
+
+    def _callback_done(self, task: asyncio.Task):
+        self.tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"⚠️  K线收盘回调出错: {task.exception()!r}")
+
+    async def _heartbeat(self, websocket):
+        while True:
+            await asyncio.sleep(self.ping_interval)
+            await websocket.send("ping")
+
+    async def run(self, reconnect_delay: float = 1.0, max_reconnect_delay: float = 30.0):
+        """连接并持续接收推送，直到调用 stop()"""
+        delay = reconnect_delay
+        while not self.stopped.is_set():
+            try:
+                async with connect(self.url, ping_interval=None) as websocket:
+                    await websocket.send(self._subscribe_message())
+                    print(f"📶 已订阅 {len(self.channels)} 个K线频道: {self.url}")
+                    delay = reconnect_delay
+                    heartbeat = asyncio.create_task(self._heartbeat(websocket))
+                    stop_wait = asyncio.create_task(self.stopped.wait())
+                    try:
+                        while not self.stopped.is_set():
+                            receive = asyncio.create_task(websocket.recv())
+                            done, _ = await asyncio.wait(
+                                {receive, stop_wait}, return_when=asyncio.FIRST_COMPLETED
+                            )
+                            if receive not in done:
+                                receive.cancel()
+                                break
+                            raw = receive.result()  # 连接断开时在此抛出，交给外层重连
+                            try:
+                                await self._handle_message(raw)
+                            except Exception as e:
+                                # 无法解析的消息、同步回调的异常：记录后继续接收
+                                print(f"⚠️  推送消息处理失败: {e!r}")
+                    finally:
+                        heartbeat.cancel()
+                        stop_wait.cancel()
+            except (ConnectionClosed, OSError) as e:
+                if self.stopped.is_set():
+                    break
+                print(f"⚠️  WebSocket 连接断开: {e}，{delay:.0f}s 后重连")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, max_reconnect_delay)
+        # 停止时等待已开始的收盘回调完成
+        if self.tasks:
+            await asyncio.gather(*self.tasks, return_exceptions=True)
+
+    def stop(self):
+        """停止订阅"""
+        self.stopped.set()
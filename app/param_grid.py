@@ -0,0 +1,157 @@
+"""
+参数网格模块 - 一条价格序列上一次计算整组指标参数（调参用）
+
+调整 settings.yaml 中 signals.indicators 的 EMA/MACD/KDJ 周期时，不必每组参数重跑一遍流程：
+这里对整组参数一次广播计算，得到 (参数组, 时间) 矩阵。各组的 EMA 由 kernels.ema 按 alpha 数组
+一次算完，KDJ 的滚动极值按不同的 RSV 周期各算一次。
+
+cross_signals 逐元素判断交叉（与各检测器的交叉条件相同），快慢线矩阵按 [:, None] / [None]
+广播即得到 (快线参数, 慢线参数, 时间) 的信号网格；sweep_ema_cross 在此基础上统计每组参数的
+交易次数和收益。
+"""
+from typing import Dict, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app import kernels
+from app.batch_indicators import rsv
+
+
+def ema_grid(close: np.ndarray, spans: Sequence[int]) -> np.ndarray:
+    """
+    多个周期的 EMA
+
+    Args:
+        close: 一维价格序列
+        spans: 周期列表
+
+    Returns:
+        (周期数, 时间) 矩阵
+    """
+    spans = np.asarray(spans, dtype=np.float64)
+    return kernels.ema(close, 2.0 / (spans + 1.0))
+
+
+def macd_grid(close: np.ndarray, params: Sequence[Tuple[int, int, int]]) -> Dict[str, np.ndarray]:
+    """
+    多组参数的 MACD（快慢线 EMA 按周期去重后只算一次）
+
+    Args:
+        close: 一维价格序列
+        params: [(fast, slow, signal), ...]
+
+    Returns:
+        {"macd": 矩阵, "signal": 矩阵, "histogram": 矩阵}，形状 (参数组数, 时间)
+    """
+    params = np.asarray(params, dtype=np.int64).reshape(-1, 3)
+    spans, index = np.unique(params[:, :2], return_inverse=True)
+    index = index.reshape(-1, 2)
+    emas = ema_grid(close, spans)
+    line = emas[index[:, 0]] - emas[index[:, 1]]
+    signal_line = kernels.ema(line, 2.0 / (params[:, 2] + 1.0))
+    return {"macd": line, "signal": signal_line, "histogram": line - signal_line}
+
+
+def kdj_grid(close: np.ndarray, high: np.ndarray, low: np.ndarray,
+             params: Sequence[Tuple[int, int, int]]) -> Dict[str, np.ndarray]:
+    """
+    多组参数的 KDJ（RSV 按周期去重后只算一次）
+
+    Args:
+        close, high, low: 一维价格序列
+        params: [(period, k_period, d_period), ...]
+
+    Returns:
+        {"k": 矩阵, "d": 矩阵, "j": 矩阵}，形状 (参数组数, 时间)
+    """
+    params = np.asarray(params, dtype=np.int64).reshape(-1, 3)
+    periods, index = np.unique(params[:, 0], return_inverse=True)
+    rsvs = np.array([rsv(close, high, low, int(period)) for period in periods])
+    k = kernels.ema(rsvs[index.ravel()], 1.0 / params[:, 1])
+    d = kernels.ema(k, 1.0 / params[:, 2])
+    return {"k": k, "d": d, "j": 3 * k - 2 * d}
+
+
+def cross_signals(fast: np.ndarray, slow) -> np.ndarray:
+    """
+    逐根K线的交叉信号（逐元素广播，最后一维为时间）
+
+    上穿：fast > slow 且上一根 fast <= slow；下穿：fast < slow 且上一根 fast >= slow，
+    与 EMASignal / MACDSignal（slow 取 0）/ KDJSignal 的判断相同。
+
+    Args:
+        fast, slow: 可广播的数组，如 fast[:, None] 与 slow[None] 得到两两组合的网格
+
+    Returns:
+        int8 数组：1 上穿，-1 下穿，0 无（第一根为 0）
+    """
+    fast, slow = np.broadcast_arrays(fast, slow)
+    above = fast > slow
+    below = fast < slow
+    out = np.zeros(fast.shape, dtype=np.int8)
+    out[..., 1:] = (above[..., 1:] & ~above[..., :-1]).view(np.int8)
+    out[..., 1:] -= (below[..., 1:] & ~below[..., :-1]).view(np.int8)
+    return out
+
+
+def sweep_ema_cross(close: np.ndarray, fast_periods: Sequence[int],
+                    slow_periods: Sequence[int]) -> pd.DataFrame:
+    """
+    EMA 快慢线交叉的参数扫描
+
+    每组 (fast, slow)（fast < slow）按回测的规则交易：上穿买入、下穿卖出（只做多），
+    慢线周期之前的K线不产生信号。快线逐行与所有慢线广播计算交叉（内存占用为 慢线数 × 时间），
+    之后只在有信号的K线上统计开平仓。
+
+    Args:
+        close: 一维收盘价
+        fast_periods: 快线周期列表
+        slow_periods: 慢线周期列表
+
+    Returns:
+        DataFrame（fast, slow, trades 开仓次数, exposure 持仓时间占比, total_return 累计收益 %），
+        按 total_return 降序
+    """
+    close = np.asarray(close, dtype=np.float64)
+    fast_periods = np.asarray(fast_periods, dtype=np.int64)
+    slow_periods = np.asarray(slow_periods, dtype=np.int64)
+    fast_lines = ema_grid(close, fast_periods)
+    slow_lines = ema_grid(close, slow_periods)
+    log_close = np.log(close)
+    last_bar = len(close) - 1
+
+    rows = []
+    for fast, line in zip(fast_periods, fast_lines):
+        # 只处理有信号的K线（按慢线、时间排序），慢线周期之前的信号忽略
+        grid = cross_signals(line[None, :], slow_lines)
+        slow_index, bars = np.divmod(np.flatnonzero(grid != 0), grid.shape[-1])
+        warm = bars >= slow_periods[slow_index]
+        slow_index, bars = slow_index[warm], bars[warm]
+        signals = grid[slow_index, bars]
+
+        # 持仓中的买入、空仓时的卖出不改变状态：只保留与上一个信号方向不同的信号，
+        # 每个慢线的第一个信号视为接在卖出之后，此后买卖严格交替
+        previous = np.empty_like(signals)
+        previous[:1] = -1
+        previous[1:] = signals[:-1]
+        previous[1:][slow_index[1:] != slow_index[:-1]] = -1
+        changed = signals != previous
+        slow_index, bars, signals = slow_index[changed], bars[changed], signals[changed]
+
+        # 买入后的下一个信号（同一慢线）为卖出，没有则持有到最后一根
+        entries = np.flatnonzero(signals == 1)
+        following = np.minimum(entries + 1, max(len(signals) - 1, 0))
+        closed = (entries + 1 < len(signals)) & (slow_index[following] == slow_index[entries])
+        exits = np.where(closed, bars[following], last_bar)
+        owner = slow_index[entries]
+        count = len(slow_periods)
+        trades = np.bincount(owner, minlength=count)
+        held = np.bincount(owner, exits - bars[entries], minlength=count)
+        total = np.expm1(np.bincount(owner, log_close[exits] - log_close[bars[entries]], minlength=count)) * 100
+        for slow, n, bars_held, ret in zip(slow_periods, trades, held, total):
+            if fast < slow:
+                rows.append((int(fast), int(slow), int(n), float(bars_held / len(close)), float(ret)))
+
+    result = pd.DataFrame(rows, columns=["fast", "slow", "trades", "exposure", "total_return"])
+    return result.sort_values("total_return", ascending=False, ignore_index=True)
@@ -0,0 +1,87 @@
+"""
+限流模块 - 按 OKX 各接口的频率限制分配请求配额
+"""
+import threading
+import time
+from typing import Dict, Tuple
+
+
+# OKX 公共行情接口限速（按 IP）：(请求数, 时间窗口秒)
+OKX_RATE_LIMITS: Dict[str, Tuple[int, float]] = {
+    "market/candles": (40, 2.0),
+    "market/history-candles": (20, 2.0),
+}
+
+
+class TokenBucket:
+    """线程安全的令牌桶"""
+
+    def __init__(self, capacity: int, period: float):
+        """
+        Args:
+            capacity: 桶容量（时间窗口内允许的请求数）
+            period: 时间窗口（秒）
+        """
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, tokens: int = 1) -> bool:
+        """取出令牌，配额不足时立即返回 False"""
+        with self._lock:
+            self._refill()
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return True
+            return False
+
+    def acquire(self, tokens: int = 1):
+        """取出令牌，配额不足时阻塞等待"""
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait = (tokens - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+_buckets: Dict[str, TokenBucket] = {}
+_buckets_lock = threading.Lock()
+
+
+def get_rate_limiter(endpoint: str) -> TokenBucket:
+    """
+    获取某个接口的共享令牌桶
+
+    OKX 按 IP 限速，同一进程内所有获取器共用同一个桶。
+
+    Args:
+        endpoint: 接口路径（如 "market/candles"）
+    """
+    with _buckets_lock:
+        if endpoint not in _buckets:
+            capacity, period = OKX_RATE_LIMITS.get(endpoint, (20, 2.0))
+            _buckets[endpoint] = TokenBucket(capacity, period)
+        return _buckets[endpoint]
+
+
+def set_rate_limit(endpoint: str, capacity: int, period: float = 2.0):
+    """
+    替换某个接口的共享令牌桶（连接本地替身服务压测时放宽客户端限速）
+
+    Args:
+        endpoint: 接口路径（如 "market/candles"）
+        capacity: 时间窗口内允许的请求数
+        period: 时间窗口（秒）
+    """
+    with _buckets_lock:
+        _buckets[endpoint] = TokenBucket(capacity, period)
@@ -0,0 +1,105 @@
+"""
+周期合成模块 - 由一个基础周期的K线在本地合成更高周期
+
+K线边界与 OKX 保持一致：OKX 默认周期（非 utc 后缀）按香港时间（UTC+8）开盘，
+日线从 UTC 16:00 开始，周线从香港时间周一 00:00 开始，月线从香港时间每月 1 日开始。
+对 1H/2H/4H 而言，UTC+8 与 UTC 对齐方式相同。
+"""
+import numpy as np
+import pandas as pd
+
+from app.backfill import BAR_MILLISECONDS
+from app.kline_store import OHLCV_COLUMNS
+
+
+HK_OFFSET_MS = 8 * 3_600_000
+WEEK_OFFSET_MS = 3 * 86_400_000  # 1970-01-01 是周四，平移 3 天使周线从周一开始
+
+
+def bucket_starts(ts: np.ndarray, bar: str) -> np.ndarray:
+    """
+    计算每个时间戳所属目标周期K线的开盘时间
+
+    Args:
+        ts: int64 毫秒时间戳（UTC）
+        bar: OKX 目标周期（4H, 1D, 1W, 1M）
+
+    Returns:
+        int64 毫秒时间戳（UTC）
+    """
+    if bar == "1M":
+        local = (ts + HK_OFFSET_MS).astype("datetime64[ms]").astype("datetime64[M]")
+        return local.astype("datetime64[ms]").astype(np.int64) - HK_OFFSET_MS
+
+    period = BAR_MILLISECONDS[bar]
+    offset = HK_OFFSET_MS + (WEEK_OFFSET_MS if bar == "1W" else 0)
+    return (ts + offset) // period * period - offset
+
+
+def can_derive(base_bar: str, target_bar: str) -> bool:
+    """目标周期能否由基础周期合成（目标周期必须是基础周期的整数倍）"""
+    base_ms = BAR_MILLISECONDS.get(base_bar)
+    if base_ms is None:
+        return False
+    if target_bar == "1M":
+        return BAR_MILLISECONDS["1D"] % base_ms == 0
+    target_ms = BAR_MILLISECONDS.get(target_bar)
+    # 两者使用相同的时区偏移，整数倍即可保证基础K线不会跨越目标K线边界
+    return target_ms is not None and target_ms % base_ms == 0
+
+
+def bars_needed(base_bar: str, target_bar: str, limit: int) -> int:
+    """合成 limit 根目标周期K线大约需要的基础周期K线数量（含一根不完整的首根）"""
+    base_ms = BAR_MILLISECONDS[base_bar]
+    target_ms = BAR_MILLISECONDS.get(target_bar, 31 * BAR_MILLISECONDS["1D"])
+    ratio = target_ms // base_ms
+    return limit if ratio == 1 else (limit + 1) * ratio
+
+
+def resample_ohlcv(df: pd.DataFrame, target_bar: str) -> pd.DataFrame:
+    """
+    将基础周期的 OHLCV 合成为目标周期
+
+    首根目标K线如果缺少开头的基础K线（数据起点落在周期中间），会被丢弃；
+    最后一根可能尚未收盘，与交易所返回的未收盘K线含义相同。
+
+    Args:
+        df: 升序的基础周期 OHLCV DataFrame（索引为 UTC 时间）
+        target_bar: OKX 目标周期
+
+    Returns:
+        目标周期 OHLCV DataFrame
+    """
+    if df is None or df.empty:
+        return df
+
+    ts = df.index.values.astype("datetime64[ms]").astype(np.int64)
+    ohlcv = df[OHLCV_COLUMNS].to_numpy(dtype=np.float64)
+
+    starts = bucket_starts(ts, target_bar)
+    first = np.flatnonzero(np.r_[True, starts[1:] != starts[:-1]])
+    last = np.r_[first[1:] - 1, len(ts) - 1]
+
+    result = np.empty((len(first), 5), dtype=np.float64)
+    result[:, 0] = ohlcv[first, 0]
+    result[:, 1] = np.maximum.reduceat(ohlcv[:, 1], first)
+    result[:, 2] = np.minimum.reduceat(ohlcv[:, 2], first)
+    result[:, 3] = ohlcv[last, 3]
+    result[:, 4] = np.add.reduceat(ohlcv[:, 4], first)
+    bar_ts = starts[first]
+
+    # 数据起点不在周期开头时，首根K线不完整
+    if len(bar_ts) and ts[0] != bar_ts[0]:
+        result, bar_ts = result[1:], bar_ts[1:]
+
+    index = pd.DatetimeIndex(pd.to_datetime(bar_ts, unit="ms"), name="timestamp")
+    return pd.DataFrame(result, index=index, columns=OHLCV_COLUMNS)
+
+
+def next_bar_close(now_ms: int, bar: str) -> int:
+    """当前未收盘K线的收盘时间（即下一根K线的开盘时间，毫秒）"""
+    start = int(bucket_starts(np.array([now_ms], dtype=np.int64), bar)[0])
+    if bar == "1M":
+        local = np.datetime64(start + HK_OFFSET_MS, "ms").astype("datetime64[M]") + 1
+        return int(local.astype("datetime64[ms]").astype(np.int64)) - HK_OFFSET_MS
+    return start + BAR_MILLISECONDS[bar]
@@ -0,0 +1,472 @@
+"""
+增量指标模块 - 每根新K线以常数时间更新 SMA、EMA、MACD、RSI、布林带（RollingStats）和 KDJ
+
+批量计算（IndicatorCalculator、signals/ 下的检测器）每次都对整段历史重新计算 rolling/ewm，
+而实时模式只需要最新一根的值。这里的每个指标只保存计算下一根所需的状态：
+
+- update(x): 写入一根已收盘K线并返回最新值
+- peek(x): 返回未收盘K线按当前价格计算的值，不修改状态（未收盘K线原地更新时使用）
+- snapshot() / restore(state): 导出/恢复状态（普通 dict/list，可直接 JSON 序列化）
+
+输出与批量计算在浮点误差范围内一致（包括预热期的 NaN 和 KDJ 的 RSV 缺失值按 50 处理）。
+"""
+import math
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.candle_buffer import BarEvent
+
+
+NAN = float("nan")
+
+
+class StreamingSMA:
+    """简单移动平均（等同于 rolling(length).mean()）"""
+
+    def __init__(self, length: int):
+        self.length = length
+        self.window = [0.0] * length  # 环形缓冲区
+        self.pos = 0
+        self.count = 0
+        self.total = 0.0
+
+    def update(self, x: float) -> float:
+        if self.count == self.length:
+            self.total -= self.window[self.pos]
+        else:
+            self.count += 1
+        self.window[self.pos] = x
+        self.total += x
+        self.pos = (self.pos + 1) % self.length
+        if self.pos == 0:
+            # 每写满一轮精确重算一次，消除加减累积的舍入误差（均摊仍为 O(1)）
+            self.total = math.fsum(self.window[:self.count])
+        return self.value
+
+    def peek(self, x: float) -> float:
+        if self.count < self.length - 1:
+            return NAN
+        evicted = self.window[self.pos] if self.count == self.length else 0.0
+        return (self.total - evicted + x) / self.length
+
+    @property
+    def value(self) -> float:
+        return self.total / self.length if self.count == self.length else NAN
+
+    def snapshot(self) -> Dict:
+        return {"window": list(self.window), "pos": self.pos, "count": self.count, "total": self.total}
+
+    def restore(self, state: Dict):
+        self.window = list(state["window"])
+        self.pos = state["pos"]
+        self.count = state["count"]
+        self.total = state["total"]
+
+
+class StreamingEMA:
+    """指数移动平均（等同于 ewm(span=span, adjust=False).mean()，或直接指定 alpha）"""
+
+    def __init__(self, span: Optional[float] = None, alpha: Optional[float] = None):
+        self.alpha = alpha if alpha is not None else 2.0 / (span + 1.0)
+        self.value = NAN
+
+    def _next(self, x: float) -> float:
+        if self.value != self.value:  # 第一根K线：初值为该值
+            return x
+        return (1.0 - self.alpha) * self.value + self.alpha * x
+
+    def update(self, x: float) -> float:
+        self.value = self._next(x)
+        return self.value
+
+    def peek(self, x: float) -> float:
+        return self._next(x)
+
+    def snapshot(self) -> Dict:
+        return {"value": self.value}
+
+    def restore(self, state: Dict):
+        self.value = state["value"]
+
+
+class StreamingMACD:
+    """MACD（快慢 EMA 之差及其信号线）"""
+
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9):
+        self.fast = StreamingEMA(fast)
+        self.slow = StreamingEMA(slow)
+        self.signal = StreamingEMA(signal)
+
+    def update(self, x: float) -> Tuple[float, float, float]:
+        macd = self.fast.update(x) - self.slow.update(x)
+        signal = self.signal.update(macd)
+        return macd, signal, macd - signal
+
+    def peek(self, x: float) -> Tuple[float, float, float]:
+        macd = self.fast.peek(x) - self.slow.peek(x)
+        signal = self.signal.peek(macd)
+        return macd, signal, macd - signal
+
+    def snapshot(self) -> Dict:
+        return {"fast": self.fast.snapshot(), "slow": self.slow.snapshot(), "signal": self.signal.snapshot()}
+
+    def restore(self, state: Dict):
+        self.fast.restore(state["fast"])
+        self.slow.restore(state["slow"])
+        self.signal.restore(state["signal"])
+
+
+class StreamingRSI:
+    """RSI（涨跌幅的简单移动平均之比，与 IndicatorCalculator._rsi 相同）"""
+
+    def __init__(self, length: int = 14):
+        self.gains = StreamingSMA(length)
+        self.losses = StreamingSMA(length)
+        self.prev_close: Optional[float] = None
+
+    def _moves(self, x: float) -> Tuple[float, float]:
+        # 第一根没有涨跌（批量计算中 diff 为 NaN，where 之后为 0）
+        delta = x - self.prev_close if self.prev_close is not None else 0.0
+        return (delta if delta > 0 else 0.0), (-delta if delta < 0 else 0.0)
+
+    @staticmethod
+    def _rsi(gain: float, loss: float) -> float:
+        if gain != gain or loss != loss:
+            return NAN
+        if loss == 0:
+            return 100.0 if gain > 0 else NAN
+        return 100.0 - 100.0 / (1.0 + gain / loss)
+
+    def update(self, x: float) -> float:
+        gain, loss = self._moves(x)
+        self.prev_close = x
+        return self._rsi(self.gains.update(gain), self.losses.update(loss))
+
+    def peek(self, x: float) -> float:
+        gain, loss = self._moves(x)
+        return self._rsi(self.gains.peek(gain), self.losses.peek(loss))
+
+    def snapshot(self) -> Dict:
+        return {"gains": self.gains.snapshot(), "losses": self.losses.snapshot(), "prev_close": self.prev_close}
+
+    def restore(self, state: Dict):
+        self.gains.restore(state["gains"])
+        self.losses.restore(state["losses"])
+        self.prev_close = state["prev_close"]
+
+
+class RollingStats:
+    """
+    滚动均值与样本方差（Welford 递推，窗口满后每个新值替换最旧的值）
+
+    只保存窗口均值和离差平方和 M2，更新量都是相对窗口均值的小量，价格长期漂移时
+    不会像 Σx² - (Σx)²/n 那样相消失去精度。替换一个值：
+    mean' = mean + (x - old) / n，M2' = M2 + (x - old)·(x - mean' + old - mean)。
+    """
+
+    def __init__(self, length: int):
+        self.length = length
+        self.window = [0.0] * length
+        self.pos = 0
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def _next(self, x: float) -> Tuple[float, float]:
+        """写入 x 之后的 (均值, M2)"""
+        if self.count == self.length:
+            old = self.window[self.pos]
+            delta = x - old
+            mean = self.mean + delta / self.length
+            return mean, self.m2 + delta * (x - mean + old - self.mean)
+        delta = x - self.mean
+        mean = self.mean + delta / (self.count + 1)
+        return mean, self.m2 + delta * (x - mean)
+
+    def update(self, x: float) -> Tuple[float, float]:
+        """写入一个值，返回 (均值, 样本方差)"""
+        self.mean, self.m2 = self._next(x)
+        self.count = min(self.count + 1, self.length)
+        self.window[self.pos] = x
+        self.pos = (self.pos + 1) % self.length
+        if self.pos == 0:
+            # 每写满一轮按窗口重新计算（两遍法，均摊仍为 O(1)）：递推的舍入误差与 M2 同量级，
+            # 价格从高位回落后不会带到之后方差小得多的窗口
+            values = self.window[:self.count]
+            self.mean = math.fsum(values) / self.count
+            self.m2 = math.fsum((v - self.mean) ** 2 for v in values)
+        return self.value
+
+    def peek(self, x: float) -> Tuple[float, float]:
+        """写入 x 后的 (均值, 样本方差)，不修改状态"""
+        if self.count < self.length - 1:
+            return NAN, NAN
+        mean, m2 = self._next(x)
+        return mean, max(m2, 0.0) / (self.length - 1)
+
+    @property
+    def value(self) -> Tuple[float, float]:
+        if self.count < self.length:
+            return NAN, NAN
+        return self.mean, max(self.m2, 0.0) / (self.length - 1)
+
+    def snapshot(self) -> Dict:
+        return {"window": list(self.window), "pos": self.pos, "count": self.count, "mean": self.mean, "m2": self.m2}
+
+    def restore(self, state: Dict):
+        self.window = list(state["window"])
+        self.pos = state["pos"]
+        self.count = state["count"]
+        self.mean = state["mean"]
+        self.m2 = state["m2"]
+
+
+class StreamingBollinger:
+    """布林带（rolling(length).mean() ± k × rolling(length).std()，样本标准差）"""
+
+    def __init__(self, length: int = 20, k: float = 2.0):
+        self.length = length
+        self.k = k
+        self.stats = RollingStats(length)
+
+    def _bands(self, mean: float, var: float) -> Tuple[float, float, float]:
+        width = self.k * math.sqrt(var)
+        return mean + width, mean, mean - width
+
+    def update(self, x: float) -> Tuple[float, float, float]:
+        return self._bands(*self.stats.update(x))
+
+    def peek(self, x: float) -> Tuple[float, float, float]:
+        return self._bands(*self.stats.peek(x))
+
+    @property
+    def value(self) -> Tuple[float, float, float]:
+        return self._bands(*self.stats.value)
+
+    def snapshot(self) -> Dict:
+        return self.stats.snapshot()
+
+    def restore(self, state: Dict):
+        self.stats.restore(state)
+
+
+class StreamingExtreme:
+    """滚动最小/最大值（单调队列，每根K线均摊 O(1)）"""
+
+    def __init__(self, length: int, mode: str = "min"):
+        self.length = length
+        self.is_min = mode == "min"
+        self.queue: deque = deque()  # (序号, 值)，值单调
+        self.seen = 0
+
+    def _dominates(self, a: float, b: float) -> bool:
+        return a <= b if self.is_min else a >= b
+
+    def update(self, x: float) -> float:
+        while self.queue and not self._dominates(self.queue[-1][1], x):
+            self.queue.pop()
+        # 相等时保留新值（同样的极值，离开窗口更晚）
+        if self.queue and self.queue[-1][1] == x:
+            self.queue.pop()
+        self.queue.append((self.seen, x))
+        self.seen += 1
+        if self.queue[0][0] <= self.seen - 1 - self.length:
+            self.queue.popleft()
+        return self.value
+
+    def peek(self, x: float) -> float:
+        if self.seen + 1 < self.length:
+            return NAN
+        # 新K线加入后最旧的一根离开窗口；队首若恰好是它，改用下一个
+        start = self.seen + 1 - self.length
+        for index, value in self.queue:
+            if index >= start:
+                return min(value, x) if self.is_min else max(value, x)
+        return x
+
+    @property
+    def value(self) -> float:
+        return self.queue[0][1] if self.seen >= self.length else NAN
+
+    def snapshot(self) -> Dict:
+        return {"queue": [list(item) for item in self.queue], "seen": self.seen}
+
+    def restore(self, state: Dict):
+        self.queue = deque(tuple(item) for item in state["queue"])
+        self.seen = state["seen"]
+
+
+class StreamingKDJ:
+    """KDJ（与 KDJSignal.calculate_kdj 相同：RSV 缺失时取 50，K/D 为 alpha=1/周期 的 EMA）"""
+
+    def __init__(self, period: int = 9, k_period: int = 3, d_period: int = 3):
+        self.lowest = StreamingExtreme(period, "min")
+        self.highest = StreamingExtreme(period, "max")
+        self.k = StreamingEMA(alpha=1.0 / k_period)
+        self.d = StreamingEMA(alpha=1.0 / d_period)
+
+    @staticmethod
+    def _rsv(close: float, lowest: float, highest: float) -> float:
+        span = highest - lowest
+        diff = close - lowest
+        if span != span or diff != diff:
+            return 50.0
+        if span == 0:
+            # 与 NumPy 除法一致：0/0 为 NaN（按 50 处理），非零/0 为 ±inf
+            return 50.0 if diff == 0 else math.copysign(math.inf, diff)
+        return diff / span * 100
+
+    def update(self, high: float, low: float, close: float) -> Tuple[float, float, float]:
+        rsv = self._rsv(close, self.lowest.update(low), self.highest.update(high))
+        k = self.k.update(rsv)
+        d = self.d.update(k)
+        return k, d, 3 * k - 2 * d
+
+    def peek(self, high: float, low: float, close: float) -> Tuple[float, float, float]:
+        rsv = self._rsv(close, self.lowest.peek(low), self.highest.peek(high))
+        k = self.k.peek(rsv)
+        d = self.d.peek(k)
+        return k, d, 3 * k - 2 * d
+
+    def snapshot(self) -> Dict:
+        return {
+            "lowest": self.lowest.snapshot(), "highest": self.highest.snapshot(),
+            "k": self.k.snapshot(), "d": self.d.snapshot(),
+        }
+
+    def restore(self, state: Dict):
+        self.lowest.restore(state["lowest"])
+        self.highest.restore(state["highest"])
+        self.k.restore(state["k"])
+        self.d.restore(state["d"])
+
+
+class StreamingIndicators:
+    """
+    一组增量指标（默认参数与 IndicatorCalculator 和 signals/ 下的检测器相同）
+
+    输出的键与批量计算的列名一致：MA20、MA60、EMA12、EMA26、MACD、MACD_signal、MACD_hist、
+    RSI、BB_upper、BB_middle、BB_lower、K、D、J。
+    """
+
+    def __init__(self, ma_periods: Tuple[int, ...] = (20, 60), ema_periods: Tuple[int, ...] = (12, 26),
+                 macd: Tuple[int, int, int] = (12, 26, 9), rsi_period: int = 14,
+                 bollinger: Tuple[int, float] = (20, 2.0), kdj: Tuple[int, int, int] = (9, 3, 3)):
+        self.sma = {f"MA{n}": StreamingSMA(n) for n in ma_periods}
+        self.ema = {f"EMA{n}": StreamingEMA(n) for n in ema_periods}
+        self.macd = StreamingMACD(*macd)
+        self.rsi = StreamingRSI(rsi_period)
+        self.bollinger = StreamingBollinger(*bollinger)
+        self.kdj = StreamingKDJ(*kdj)
+        self.last_ts: Optional[int] = None  # 最后一根已写入的已收盘K线
+        self.values: Dict[str, float] = {}  # 最新值（含未收盘K线）
+        self._pending: Optional[Tuple[int, float, float, float]] = None  # 未收盘K线
+
+    @classmethod
+    def from_config(cls, indicator_config: Dict) -> "StreamingIndicators":
+        """由 settings.yaml 的 signals.indicators 创建（未声明的指标取默认参数）"""
+        def params(name: str) -> Dict:
+            return indicator_config.get(name) or {}
+        ma, ema, macd = params("ma"), params("ema"), params("macd")
+        rsi, bollinger, kdj = params("rsi"), params("bollinger"), params("kdj")
+        return cls(
+            ma_periods=tuple(ma.get("periods", (20, 60))),
+            ema_periods=(ema.get("fast", 12), ema.get("slow", 26)),
+            macd=(macd.get("fast", 12), macd.get("slow", 26), macd.get("signal", 9)),
+            rsi_period=rsi.get("period", 14),
+            bollinger=(bollinger.get("period", 20), bollinger.get("std_dev", 2.0)),
+            kdj=(kdj.get("period", 9), kdj.get("k_period", 3), kdj.get("d_period", 3)),
+        )
+
+    def _compute(self, high: float, low: float, close: float, commit: bool) -> Dict[str, float]:
+        step = "update" if commit else "peek"
+        values = {name: getattr(sma, step)(close) for name, sma in self.sma.items()}
+        values.update({name: getattr(ema, step)(close) for name, ema in self.ema.items()})
+        values["MACD"], values["MACD_signal"], values["MACD_hist"] = getattr(self.macd, step)(close)
+        values["RSI"] = getattr(self.rsi, step)(close)
+        values["BB_upper"], values["BB_middle"], values["BB_lower"] = getattr(self.bollinger, step)(close)
+        values["K"], values["D"], values["J"] = getattr(self.kdj, step)(high, low, close)
+        return values
+
+    def update(self, high: float, low: float, close: float, confirmed: bool = True,
+               ts: Optional[int] = None) -> Dict[str, float]:
+        """
+        写入一根K线
+
+        Args:
+            high, low, close: 价格
+            confirmed: 是否已收盘；未收盘K线只计算当前值，不改变状态，可反复更新
+            ts: 开盘时间（毫秒，可选）；未收盘K线换成下一根时，上一根按最后的价格写入
+
+        Returns:
+            最新指标值
+        """
+        pending = self._pending
+        if pending is not None and ts is not None and ts != pending[0]:
+            # 漏掉了收盘推送：以最后一次更新的价格作为收盘
+            self._commit(*pending)
+        if confirmed:
+            self._pending = None
+            if ts is not None and self.last_ts is not None and ts <= self.last_ts:
+                return self.values  # 重复的收盘推送
+            return self._commit(ts, high, low, close)
+        self._pending = (ts, high, low, close)
+        self.values = self._compute(high, low, close, commit=False)
+        return self.values
+
+    def _commit(self, ts: Optional[int], high: float, low: float, close: float) -> Dict[str, float]:
+        self._pending = None
+        self.last_ts = ts
+        self.values = self._compute(high, low, close, commit=True)
+        return self.values
+
+    def on_bar(self, event: BarEvent):
+        """CandleBuffer 监听器：buffer.subscribe(engine.on_bar)"""
+        self.update(float(event.ohlcv[1]), float(event.ohlcv[2]), float(event.ohlcv[3]),
+                    confirmed=event.confirmed, ts=int(event.ts))
+
+    def seed(self, df: pd.DataFrame, last_confirmed: bool = True) -> Dict[str, float]:
+        """
+        用历史K线初始化（逐根写入，只在启动时执行一次）
+
+        Args:
+            df: OHLCV DataFrame
+            last_confirmed: 最后一根是否已收盘（否则按未收盘K线处理）
+        """
+        ts = df.index.values.astype("datetime64[ms]").astype(np.int64)
+        prices = df[["high", "low", "close"]].to_numpy(dtype=np.float64)
+        for i in range(len(df)):
+            confirmed = last_confirmed or i < len(df) - 1
+            self.update(*prices[i], confirmed=confirmed, ts=int(ts[i]))
+        return self.values
+
+    def snapshot(self) -> Dict:
+        """导出全部状态（可 JSON 序列化）"""
+        return {
+            "sma": {name: sma.snapshot() for name, sma in self.sma.items()},
+            "ema": {name: ema.snapshot() for name, ema in self.ema.items()},
+            "macd": self.macd.snapshot(),
+            "rsi": self.rsi.snapshot(),
+            "bollinger": self.bollinger.snapshot(),
+            "kdj": self.kdj.snapshot(),
+            "last_ts": self.last_ts,
+            "values": dict(self.values),
+            "pending": list(self._pending) if self._pending is not None else None,
+        }
+
+    def restore(self, state: Dict):
+        """恢复 snapshot() 导出的状态（指标参数需与导出时相同）"""
+        for name, sma in self.sma.items():
+            sma.restore(state["sma"][name])
+        for name, ema in self.ema.items():
+            ema.restore(state["ema"][name])
+        self.macd.restore(state["macd"])
+        self.rsi.restore(state["rsi"])
+        self.bollinger.restore(state["bollinger"])
+        self.kdj.restore(state["kdj"])
+        self.last_ts = state["last_ts"]
+        self.values = dict(state["values"])
+        self._pending = tuple(state["pending"]) if state["pending"] is not None else None
@@ -0,0 +1,145 @@
+"""
+模拟行情生成模块 - 向量化生成 OHLCV 数据（压力测试、基准测试和备用数据使用）
+
+价格为几何布朗运动，叠加跳跃（复合泊松）和波动率状态切换；所有K线一次性由数组运算生成，
+千万级K线在数秒内完成。生成的数据满足 low <= min(open, close) <= max(open, close) <= high，
+且每根K线的开盘价等于上一根的收盘价。
+"""
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+from app.backfill import BAR_MILLISECONDS
+from app.kline_store import OHLCV_COLUMNS
+
+
+DAY_MS = BAR_MILLISECONDS["1D"]
+
+
+def interval_milliseconds(interval: str) -> int:
+    """周期时长（毫秒），支持 OKX 格式（4H）和配置格式（4h）；不支持月线"""
+    bar = interval.upper() if interval[-1] in "hdw" else interval
+    if bar not in BAR_MILLISECONDS:
+        raise ValueError(f"不支持的周期: {interval}")
+    return BAR_MILLISECONDS[bar]
+
+
+def synthetic_arrays(n_bars: int, interval: str = "1d", n_symbols: int = 1,
+                     start_price: Union[float, Sequence[float]] = 10.0,
+                     drift: float = 0.0, volatility: float = 0.02,
+                     jump_intensity: float = 0.0, jump_scale: float = 0.05,
+                     regimes: Sequence[float] = (1.0,), regime_switch: float = 0.01,
+                     correlation: float = 0.0, end_ms: Optional[int] = None,
+                     seed: Optional[int] = 42) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    生成多个交易对的 OHLCV 数组
+
+    Args:
+        n_bars: 每个交易对的K线数量
+        interval: 周期（1m ~ 1w）
+        n_symbols: 交易对数量
+        start_price: 起始价格（单个值或每个交易对一个）
+        drift: 日收益率均值
+        volatility: 日波动率（按周期时长换算到每根K线）
+        jump_intensity: 每天的平均跳跃次数
+        jump_scale: 跳跃幅度的标准差（对数收益率）
+        regimes: 各波动率状态的倍数（如 (0.5, 1.0, 3.0)）
+        regime_switch: 每根K线切换到下一个状态的概率
+        correlation: 交易对之间收益率的相关系数（单因子模型）
+        end_ms: 最后一根K线的开盘时间（默认为当前时间所在的K线）
+        seed: 随机种子
+
+    Returns:
+        (ts, ohlcv)：int64 时间戳 (n_bars,)，float64 数组 (n_symbols, n_bars, 5)
+    """
+    rng = np.random.default_rng(seed)
+    bar_ms = interval_milliseconds(interval)
+    dt = bar_ms / DAY_MS
+    shape = (n_symbols, n_bars)
+
+    if end_ms is None:
+        end_ms = int(pd.Timestamp.now("UTC").value // 1_000_000)
+    end_ms = end_ms // bar_ms * bar_ms
+    ts = end_ms - np.arange(n_bars - 1, -1, -1, dtype=np.int64) * bar_ms
+
+    # 波动率状态：切换点处状态编号加一，循环使用各状态
+    if len(regimes) > 1:
+        switches = np.cumsum(rng.random(shape) < regime_switch, axis=1)
+        sigma = np.asarray(regimes, dtype=np.float64)[switches % len(regimes)]
+        sigma *= volatility * np.sqrt(dt)
+    else:
+        sigma = np.full(shape, regimes[0] * volatility * np.sqrt(dt))
+
+    shocks = rng.standard_normal(shape)
+    if correlation:
+        common = rng.standard_normal(n_bars)
+        shocks *= np.sqrt(1.0 - correlation)
+        shocks += np.sqrt(correlation) * common
+
+    ohlcv = np.empty((n_symbols, n_bars, 5), dtype=np.float64)
+
+    # 成交量：对数正态，价格波动越大成交量越大
+    volume = ohlcv[:, :, 4]
+    volume[:] = rng.lognormal(np.log(2_000_000 * dt), 0.3, shape)
+    volume *= 1.0 + np.abs(shocks)
+
+    # 几何布朗运动的对数收益率（原地复用 shocks 的内存）
+    log_returns = shocks
+    log_returns *= sigma
+    log_returns += drift * dt - 0.5 * sigma ** 2
+    if jump_intensity > 0:
+        jumps = rng.poisson(jump_intensity * dt, shape)
+        has_jump = jumps > 0
+        log_returns[has_jump] += (
+            rng.standard_normal(int(has_jump.sum())) * jump_scale * np.sqrt(jumps[has_jump])
+        )
+
+    start = np.broadcast_to(np.asarray(start_price, dtype=np.float64), (n_symbols,))
+    close = ohlcv[:, :, 3]
+    np.cumsum(log_returns, axis=1, out=close)
+    close += np.log(start)[:, None]
+    np.exp(close, out=close)
+
+    opens = ohlcv[:, :, 0]
+    opens[:, 0] = start
+    opens[:, 1:] = close[:, :-1]
+
+    # 影线长度与当根波动率成正比
+    wick = np.abs(rng.standard_normal((2,) + shape))
+    wick *= 0.5 * sigma
+    np.maximum(opens, close, out=ohlcv[:, :, 1])
+    ohlcv[:, :, 1] *= np.exp(wick[0])
+    np.minimum(opens, close, out=ohlcv[:, :, 2])
+    ohlcv[:, :, 2] *= np.exp(-wick[1])
+
+    return ts, ohlcv
+
+
+def generate_ohlcv(n_bars: int, interval: str = "1d", start_price: float = 10.0,
+                   **kwargs) -> pd.DataFrame:
+    """
+    生成单个交易对的 OHLCV DataFrame（参数同 synthetic_arrays）
+
+    Returns:
+        以 timestamp 为索引的 DataFrame（open, high, low, close, volume）
+    """
+    ts, ohlcv = synthetic_arrays(n_bars, interval, 1, start_price, **kwargs)
+    return _to_frame(ts, ohlcv[0])
+
+
+def generate_market(symbols: List[str], n_bars: int, interval: str = "1d",
+                    start_price: Union[float, Sequence[float]] = 10.0,
+                    **kwargs) -> Dict[str, pd.DataFrame]:
+    """
+    生成多个交易对的 OHLCV（共用时间轴，参数同 synthetic_arrays）
+
+    Returns:
+        {交易对: DataFrame}
+    """
+    ts, ohlcv = synthetic_arrays(n_bars, interval, len(symbols), start_price, **kwargs)
+    return {symbol: _to_frame(ts, ohlcv[i]) for i, symbol in enumerate(symbols)}
+
+
+def _to_frame(ts: np.ndarray, ohlcv: np.ndarray) -> pd.DataFrame:
+    index = pd.DatetimeIndex(pd.to_datetime(ts, unit="ms"), name="timestamp")
+    return pd.DataFrame(ohlcv, index=index, columns=OHLCV_COLUMNS, copy=False)
@@ -9,8 +9,13 @@ from datetime import datetime, timedelta
 class Backtester:
     """回测器"""
     
-    def __init__(self, df: pd.DataFrame):
-        self.df = df.copy()
+    def __init__(self, df: pd.DataFrame, copy: bool = True):
+        """
+        Args:
+            df: 包含信号的 DataFrame
+            copy: 是否复制 df（回测只读取数据，调用方不再修改 df 时可传 False 共用同一份）
+        """
+        self.df = df.copy() if copy else df
         self.signals = []
         self.trades = []
     
@@ -0,0 +1,494 @@
+#!/usr/bin/env python3
+"""
+性能基准测试脚本
+
+用法: python3 benchmark.py [parse|synthetic|e2e|hedge|quality|streaming|kernels|batch|grid|memory|variance|series]
+
+e2e 使用本地 OKX 替身服务（app/mock_okx.py）运行完整的信号检测流程，不访问 okx.com。
+"""
+import contextlib
+import copy
+import io
+import json
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+import yaml
+from pathlib import Path
+
+from app.candle_parser import candles_to_frame, parse_candles
+from app.data_quality import check_ohlcv
+from app import kernels
+from app.indicators import IndicatorCalculator
+from app.param_grid import cross_signals, sweep_ema_cross
+from app.streaming import RollingStats, StreamingIndicators
+from app.synthetic import generate_market, generate_ohlcv, synthetic_arrays
+from signals.signal_manager import SignalManager
+
+
+def timeit(func, repeat: int = 5) -> float:
+    """返回多次运行中最快一次的耗时（毫秒）"""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def make_okx_payload(rows: int) -> bytes:
+    """构造 OKX K线接口格式的响应体（倒序）"""
+    ts = 1_700_000_000_000 - np.arange(rows, dtype=np.int64) * 60_000
+    close = 10 + np.cumsum(np.random.default_rng(0).normal(0, 0.01, rows))
+    data = [
+        [str(t), f"{c:.4f}", f"{c * 1.01:.4f}", f"{c * 0.99:.4f}", f"{c:.4f}",
+         "12345.67", "123.4", "1234.5", "1"]
+        for t, c in zip(ts, close)
+    ]
+    return json.dumps({"code": "0", "msg": "", "data": data}).encode()
+
+
+def legacy_parse(raw: bytes) -> pd.DataFrame:
+    """原实现：JSON 解码 -> 9 列 object DataFrame -> 逐列类型转换 -> 复制"""
+    data = json.loads(raw)["data"]
+    data.reverse()
+    df = pd.DataFrame(data, columns=[
+        "timestamp", "open", "high", "low", "close", "volume",
+        "volCcy", "volCcyQuote", "confirm"
+    ])
+    df["timestamp"] = pd.to_numeric(df["timestamp"])
+    df["timestamp"] = pd.to_datetime(df["timestamp"], unit="ms")
+    for col in ["open", "high", "low", "close", "volume"]:
+        df[col] = df[col].astype(float)
+    df = df[["timestamp", "open", "high", "low", "close", "volume"]].copy()
+    df.set_index("timestamp", inplace=True)
+    return df
+
+
+def bench_parse():
+    """K线响应解析：原实现 vs NumPy 直接解析"""
+    print("="*60)
+    print("⏱️  K线响应解析")
+    print("="*60)
+    print(f"{'行数':>10} {'原实现(ms)':>14} {'NumPy(ms)':>14} {'加速':>8}")
+
+    for rows in (100, 100_000):
+        raw = make_okx_payload(rows)
+        repeat = 50 if rows <= 1000 else 3
+
+        expected = legacy_parse(raw)
+        actual = candles_to_frame(parse_candles(raw))
+        assert np.array_equal(expected.to_numpy(), actual.to_numpy())
+        assert expected.index.equals(actual.index)
+
+        legacy_ms = timeit(lambda: legacy_parse(raw), repeat)
+        fast_ms = timeit(lambda: candles_to_frame(parse_candles(raw)), repeat)
+        print(f"{rows:>10} {legacy_ms:>14.3f} {fast_ms:>14.3f} {legacy_ms / fast_ms:>7.1f}x")
+
+
+def legacy_mock_data(days: int, start_price: float = 10.0) -> pd.DataFrame:
+    """原实现：逐根K线追加 dict 的随机游走"""
+    dates = pd.date_range(end="2024-01-01", periods=days, freq="D")
+    np.random.seed(42)
+    returns = np.random.normal(0.001, 0.02, days)
+    prices = [start_price]
+    for ret in returns[1:]:
+        prices.append(prices[-1] * (1 + ret))
+    data = []
+    for i, (date, close) in enumerate(zip(dates, prices)):
+        volatility = abs(np.random.normal(0, 0.01))
+        data.append({
+            "timestamp": date,
+            "open": prices[i-1] if i > 0 else close,
+            "high": close * (1 + volatility),
+            "low": close * (1 - volatility),
+            "close": close,
+            "volume": np.random.uniform(1000000, 5000000)
+        })
+    return pd.DataFrame(data).set_index("timestamp")
+
+
+def bench_synthetic():
+    """模拟行情生成：原逐行循环 vs 向量化生成器"""
+    print("="*60)
+    print("⏱️  模拟行情生成")
+    print("="*60)
+    print(f"{'K线数':>12} {'原实现(ms)':>14} {'向量化(ms)':>14} {'加速':>8}")
+
+    rows = 100_000
+    legacy_ms = timeit(lambda: legacy_mock_data(rows), 1)
+    fast_ms = timeit(lambda: generate_ohlcv(rows, "1d", drift=0.001), 3)
+    print(f"{rows:>12,} {legacy_ms:>14.1f} {fast_ms:>14.1f} {legacy_ms / fast_ms:>7.1f}x")
+
+    # 千万级：100 个交易对 × 10 万根 1 分钟K线，含跳跃和波动率状态切换
+    started = time.perf_counter()
+    _, ohlcv = synthetic_arrays(
+        100_000, "1m", n_symbols=100, jump_intensity=1.0,
+        regimes=(0.5, 1.0, 3.0), correlation=0.5
+    )
+    elapsed = time.perf_counter() - started
+    print(f"{ohlcv.shape[0] * ohlcv.shape[1]:>12,} {'-':>14} {elapsed * 1000:>14.1f}"
+          f"   ({ohlcv.nbytes / 1e9:.1f} GB)")
+
+
+def run_e2e(n_symbols: int, runs: int = 3, **server_options) -> dict:
+    """
+    用替身服务运行 n_symbols 个交易对的信号检测任务
+
+    每次运行都新建 QuantSignalSystem（与 scheduler.py 一致），本地存储在多次运行间保留，
+    第一次为冷启动，之后为增量更新。
+
+    Returns:
+        {"cold": 首次各阶段耗时, "warm": 之后各次耗时列表, "server": 替身服务统计}
+    """
+    from app.mock_okx import MockOKXHTTPServer
+    from main_v2 import QuantSignalSystem
+    from position_manager import PositionManager
+
+    with open("config/settings.yaml", "r", encoding="utf-8") as f:
+        base_config = yaml.safe_load(f)
+
+    with tempfile.TemporaryDirectory() as tmp, MockOKXHTTPServer(**server_options) as server:
+        config = copy.deepcopy(base_config)
+        config["symbols"] = [f"S{i:04d}/USDT" for i in range(n_symbols)]
+        config["exchange"]["api_base"] = server.api_base
+        config["exchange"]["hedge"]["enable"] = False  # 不向真实的备用地址发请求
+        config["data"]["store"]["dir"] = f"{tmp}/klines"
+        config["data"]["backfill"]["checkpoint_dir"] = f"{tmp}/backfill"
+        config["logging"]["file"] = f"{tmp}/signal_log.txt"
+        config["logging"]["level"] = "ERROR"
+        config["notify"]["serverchan"]["enable"] = False
+        config_path = Path(tmp) / "settings.yaml"
+        config_path.write_text(yaml.safe_dump(config, allow_unicode=True), encoding="utf-8")
+
+        timings = []
+        for _ in range(runs):
+            with contextlib.redirect_stdout(io.StringIO()):
+                system = QuantSignalSystem(str(config_path))
+                system.position_manager = PositionManager(data_file=f"{tmp}/positions.json")
+                system.run_signal_check()
+            timings.append(system.last_run_timings)
+        return {"cold": timings[0], "warm": timings[1:], "server": dict(server.stats)}
+
+
+def bench_e2e():
+    """端到端：本地替身服务 + 完整信号检测流程（10 / 100 / 1000 个交易对）"""
+    from app.rate_limit import OKX_RATE_LIMITS, set_rate_limit
+
+    print("="*60)
+    print("⏱️  端到端信号检测（本地 OKX 替身服务）")
+    print("="*60)
+
+    # 替身服务不限速，同时放宽客户端令牌桶，测量流程本身的吞吐
+    for endpoint in OKX_RATE_LIMITS:
+        set_rate_limit(endpoint, 1_000_000, 1.0)
+
+    print(f"{'交易对':>8} {'冷启动(s)':>10} {'获取(s)':>9} {'分析(s)':>9} {'次/秒':>8} {'请求数':>8}")
+    for n_symbols in (10, 100, 1000):
+        result = run_e2e(n_symbols, latency=0.005)
+        warm = result["warm"]
+        fetch = float(np.median([t["fetch"] for t in warm]))
+        analyze = float(np.median([t["analyze"] for t in warm]))
+        total = float(np.median([t["total"] for t in warm]))
+        print(f"{n_symbols:>8} {result['cold']['total']:>10.2f} {fetch:>9.2f} {analyze:>9.2f} "
+              f"{1 / total:>8.2f} {result['server']['requests']:>8}")
+
+    # 故障注入：5% 错误 + OKX 服务端限速 + 延迟抖动，恢复客户端按 OKX 限速
+    for endpoint, (capacity, period) in OKX_RATE_LIMITS.items():
+        set_rate_limit(endpoint, capacity, period)
+    result = run_e2e(100, runs=2, latency=0.02, jitter=0.05, error_rate=0.05, rate_limited=True)
+    stats = result["server"]
+    print(f"\n故障注入（100 个交易对，5% 错误，OKX 限速）: 冷启动 {result['cold']['total']:.2f}s | "
+          f"增量 {result['warm'][0]['total']:.2f}s | 请求 {stats['requests']} 次 | "
+          f"错误 {stats['errors']} | 限流 {stats['rate_limited']}")
+
+
+def bench_hedge():
+    """对冲请求：主地址 5% 请求慢 1 秒时的尾部延迟"""
+    from app.fetch_data import OKXDataFetcher
+    from app.mock_okx import MockOKXHTTPServer
+    from app.rate_limit import OKX_RATE_LIMITS, set_rate_limit
+
+    print("="*60)
+    print("⏱️  对冲请求（主地址 5% 请求额外延迟 1s）")
+    print("="*60)
+
+    for endpoint in OKX_RATE_LIMITS:
+        set_rate_limit(endpoint, 1_000_000, 1.0)
+
+    print(f"{'模式':>8} {'p50(ms)':>10} {'p95(ms)':>10} {'p99(ms)':>10} {'max(ms)':>10} {'对冲率':>8}")
+    with MockOKXHTTPServer(latency=0.01, jitter=0.01, slow_rate=0.05, slow_latency=1.0, seed=1) as primary, \
+            MockOKXHTTPServer(latency=0.01, jitter=0.01, seed=2) as mirror:
+        for hedged in (False, True):
+            fetcher = OKXDataFetcher(config={
+                "exchange": {
+                    "api_base": primary.api_base,
+                    "hedge": {"enable": hedged, "mirror_base": mirror.api_base}
+                },
+                "data": {"store": {"enable": False}, "cache": False}
+            })
+            latencies = []
+            with contextlib.redirect_stdout(io.StringIO()):
+                for i in range(400):
+                    started = time.perf_counter()
+                    fetcher.fetch_klines(f"S{i % 50:04d}/USDT", "4h", 100)
+                    latencies.append((time.perf_counter() - started) * 1000)
+            p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+            rate = fetcher.hedger.stats()["hedge_rate"] if fetcher.hedger else 0.0
+            print(f"{'对冲' if hedged else '无对冲':>8} {p50:>10.1f} {p95:>10.1f} {p99:>10.1f} "
+                  f"{max(latencies):>10.1f} {rate:>7.1%}")
+        if fetcher.hedger:
+            stats = fetcher.hedger.stats()
+            print(f"备用地址先返回 {stats['hedge_wins']} 次，累计节省 {stats['latency_saved_ms']:.0f}ms，"
+                  f"对冲延迟 {stats['delay_ms']:.0f}ms")
+
+
+def bench_quality():
+    """数据质量检查：实时K线窗口与百万级历史回补"""
+    print("="*60)
+    print("⏱️  数据质量检查")
+    print("="*60)
+    print(f"{'K线数':>12} {'干净数据(ms)':>14} {'含异常(ms)':>14} {'每百万行(ms)':>14}")
+
+    rng = np.random.default_rng(0)
+    for rows in (500, 100_000, 5_000_000):
+        df = generate_ohlcv(rows, "1m", seed=1)
+        dirty = df.copy()
+        bad = rng.choice(rows - 2, max(rows // 1000, 3), replace=False) + 1
+        dirty.iloc[bad[0::3], 3] *= 1.5                              # 尖刺
+        dirty.iloc[bad[1::3], 1] = dirty.iloc[bad[1::3], 2] * 0.99   # high < low
+        dirty.iloc[bad[2::3], 4] = 0                                 # 零成交量
+        dirty = dirty.drop(dirty.index[bad[:len(bad) // 10]])        # 缺口
+        repeat = 20 if rows <= 100_000 else 3
+        clean_ms = timeit(lambda: check_ohlcv(df, 60_000), repeat)
+        dirty_ms = timeit(lambda: check_ohlcv(dirty, 60_000), repeat)
+        print(f"{rows:>12,} {clean_ms:>14.2f} {dirty_ms:>14.2f} {dirty_ms / rows * 1e6:>14.1f}")
+
+
+def bench_streaming():
+    """每根新K线的指标更新：批量重算整个窗口 vs 增量更新"""
+    print("="*60)
+    print("⏱️  每根K线的指标更新")
+    print("="*60)
+    print(f"{'窗口':>8} {'批量重算(ms)':>14} {'增量(us)':>12} {'加速':>10}")
+
+    calculator = IndicatorCalculator()
+    for window in (100, 500, 5_000):
+        df = generate_ohlcv(window + 1000, "4h", seed=1)
+        engine = StreamingIndicators()
+        engine.seed(df.iloc[:window])
+        prices = df[["high", "low", "close"]].to_numpy()[window:]
+        batch_ms = timeit(lambda: calculator.calculate_indicators(df.iloc[-window:]), 5)
+        started = time.perf_counter()
+        for high, low, close in prices:
+            engine.update(high, low, close)
+        stream_us = (time.perf_counter() - started) / len(prices) * 1e6
+        print(f"{window:>8,} {batch_ms:>14.2f} {stream_us:>12.1f} {batch_ms * 1000 / stream_us:>9.0f}x")
+
+
+def bench_kernels():
+    """指标实现：pandas rolling/ewm vs NumPy 内核（100 ~ 1000 万根K线）"""
+    print("="*60)
+    print("⏱️  指标内核：pandas vs numpy（ms，括号内为加速倍数）")
+    print("="*60)
+    print(f"{'K线数':>12} {'EMA(12)':>18} {'SMA(20)':>18} {'STD(20)':>18} {'MIN(9)':>18} {'信号分析':>18}")
+
+    for rows in (100, 1_000, 100_000, 1_000_000, 10_000_000):
+        df = generate_ohlcv(rows, "1m", seed=1)
+        close, low = df["close"], df["low"]
+        values, lows = close.to_numpy(), low.to_numpy()
+        repeat = 20 if rows <= 100_000 else 3
+        cases = [
+            (lambda: close.ewm(span=12, adjust=False).mean(), lambda: kernels.ema(values, 2 / 13)),
+            (lambda: close.rolling(20).mean(), lambda: kernels.sma(values, 20)),
+            (lambda: close.rolling(20).std(), lambda: kernels.rolling_std(values, 20)),
+            (lambda: low.rolling(9).min(), lambda: kernels.rolling_min(lows, 9)),
+        ]
+        if rows <= 1_000_000:
+            managers = [SignalManager({"signals": {"backend": backend}}) for backend in ("pandas", "numpy")]
+            cases.append((lambda: managers[0].analyze(df), lambda: managers[1].analyze(df)))
+        cells = []
+        for pandas_case, numpy_case in cases:
+            pandas_ms = timeit(pandas_case, repeat)
+            numpy_ms = timeit(numpy_case, repeat)
+            cells.append(f"{pandas_ms:.2f}/{numpy_ms:.2f} ({pandas_ms / numpy_ms:.1f}x)")
+        print(f"{rows:>12,} " + " ".join(f"{cell:>18}" for cell in cells))
+
+
+def bench_batch():
+    """多交易对信号分析：逐个 analyze vs analyze_batch（矩阵一次计算）"""
+    print("="*60)
+    print("⏱️  多交易对信号分析（每个交易对 200 根K线，ms）")
+    print("="*60)
+    print(f"{'交易对':>8} {'逐个(pandas)':>14} {'逐个(numpy)':>14} {'analyze_frames':>16} {'analyze_batch':>15}")
+
+    manager = SignalManager({"signals": {"backend": "numpy"}})
+    pandas_manager = SignalManager({})
+    for count in (10, 100, 500, 2000):
+        frames = generate_market([f"S{i}" for i in range(count)], 200, "4h", seed=1)
+        _, ohlcv = synthetic_arrays(200, "4h", count, seed=1)
+        close, high, low = ohlcv[..., 3].copy(), ohlcv[..., 1].copy(), ohlcv[..., 2].copy()
+        repeat = 3 if count >= 500 else 5
+        loop_pandas = timeit(lambda: [pandas_manager.analyze(df) for df in frames.values()], repeat)
+        loop_numpy = timeit(lambda: [manager.analyze(df) for df in frames.values()], repeat)
+        per_frame = timeit(lambda: manager.analyze_frames(frames), repeat)
+        batch = timeit(lambda: manager.analyze_batch(close, high, low), repeat)
+        print(f"{count:>8} {loop_pandas:>14.1f} {loop_numpy:>14.1f} {per_frame:>16.1f} {batch:>15.2f}")
+
+
+def bench_grid():
+    """参数扫描：50×50 组 EMA 快慢线，参数网格一次计算 vs 逐组 pandas 计算"""
+    print("="*60)
+    print("⏱️  EMA 交叉参数扫描（50 × 50 组，s）")
+    print("="*60)
+    print(f"{'K线数':>10} {'逐组(估算)':>12} {'参数网格':>10}")
+
+    fast_periods, slow_periods = np.arange(2, 52), np.arange(10, 210, 4)
+    for rows in (1_000, 10_000, 100_000):
+        close = generate_ohlcv(rows, "1h", seed=1)["close"]
+
+        def per_combination():
+            # 逐组重算：每组参数各算一遍快慢线和交叉信号（只跑一行，按 50 行估算）
+            for slow in slow_periods:
+                slow_line = close.ewm(span=int(slow), adjust=False).mean().to_numpy()
+                fast_line = close.ewm(span=int(fast_periods[0]), adjust=False).mean().to_numpy()
+                cross_signals(fast_line, slow_line)
+
+        loop_s = timeit(per_combination, 1) / 1000 * len(fast_periods)
+        values = close.to_numpy()
+        grid_s = timeit(lambda: sweep_ema_cross(values, fast_periods, slow_periods), 1) / 1000
+        print(f"{rows:>10,} {loop_s:>12.2f} {grid_s:>10.2f}")
+
+
+# 在独立进程中运行 指标 → 信号 → 回测，输出 (运行前 RSS, 峰值 RSS)，单位 KB（Linux）
+MEMORY_SCRIPT = """
+import gc, resource, sys
+from app.indicators import IndicatorCalculator
+from app.synthetic import generate_ohlcv
+from backtest import Backtester
+
+rows, lean = int(sys.argv[1]), sys.argv[2] == "lean"
+df = generate_ohlcv(rows, "1m", seed=1)
+gc.collect()
+with open("/proc/self/statm") as f:
+    before = int(f.read().split()[1]) * resource.getpagesize() // 1024
+calculator = IndicatorCalculator("numpy", lean=lean)
+df = calculator.detect_signals(calculator.calculate_indicators(df))
+Backtester(df, copy=not lean).run_backtest()
+print(before, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+
+def bench_memory():
+    """指标/信号/回测流程的峰值内存：默认（逐阶段复制）vs 精简模式（lean_pipeline）"""
+    print("="*60)
+    print("⏱️  峰值内存（MB，流程运行期间相对运行前的增量）")
+    print("="*60)
+    print(f"{'K线数':>12} {'默认':>10} {'精简':>10} {'减少':>8}")
+
+    for rows in (100_000, 500_000, 1_000_000):
+        growth = {}
+        for mode in ("copy", "lean"):
+            output = subprocess.run(
+                [sys.executable, "-c", MEMORY_SCRIPT, str(rows), mode],
+                capture_output=True, text=True, check=True, cwd=Path(__file__).resolve().parent
+            ).stdout.split()
+            before, peak = int(output[-2]), int(output[-1])
+            growth[mode] = (peak - before) / 1024
+        print(f"{rows:>12,} {growth['copy']:>10.1f} {growth['lean']:>10.1f} "
+              f"{1 - growth['lean'] / growth['copy']:>8.0%}")
+
+
+def exact_rolling_var(values: np.ndarray, length: int, chunk: int = 1_000_000) -> np.ndarray:
+    """参考值：逐窗口两遍法（先求窗口均值再求离差平方和），分段计算控制内存"""
+    windows = np.lib.stride_tricks.sliding_window_view(values, length)
+    return np.concatenate([windows[i:i + chunk].var(axis=-1, ddof=1) for i in range(0, len(windows), chunk)])
+
+
+def legacy_rolling_var(values: np.ndarray, length: int) -> np.ndarray:
+    """原实现：窗口的 Σx 与 Σx²（先减去整体均值）相减，Σx² - (Σx)²/n"""
+    centered = values - values.mean()
+    total = kernels._window_sums(centered, length)
+    total_sq = kernels._window_sums(centered * centered, length)
+    return np.maximum(total_sq - total * total / length, 0.0) / (length - 1)
+
+
+def bench_variance():
+    """滚动方差（布林带）：Welford 内核 / 增量 vs pandas 与原累加和实现，1000 万根K线的精度"""
+    print("="*60)
+    print("⏱️  滚动方差 VAR(20)：耗时与相对两遍法参考值的最大相对误差")
+    print("="*60)
+    print(f"{'数据':>10} {'K线数':>12} {'实现':>14} {'耗时':>12} {'最大相对误差':>14}")
+
+    length = 20
+    for rows in (1_000_000, 10_000_000):
+        close = generate_ohlcv(rows, "1m", seed=1)["close"].to_numpy()
+        # 长期漂移：价格从 1 附近涨到 1e5 量级，窗口内波动相对价格很小
+        drifting = close / close[0] * np.exp(np.linspace(0.0, 11.5, rows))
+        for label, values in (("1m 行情", close), ("长期漂移", drifting)):
+            expected = exact_rolling_var(values, length)
+            series = pd.Series(values)
+
+            def streaming() -> np.ndarray:
+                stats = RollingStats(length)
+                return np.array([stats.update(x)[1] for x in values.tolist()])[length - 1:]
+
+            cases = [
+                ("pandas", lambda: series.rolling(length).var().to_numpy()[length - 1:], 1),
+                ("原累加和", lambda: legacy_rolling_var(values, length), 1),
+                ("Welford 内核", lambda: kernels.rolling_mean_var(values, length)[1][length - 1:], 1),
+                ("Welford 增量", streaming, len(values)),
+            ]
+            for name, compute, per in cases:
+                started = time.perf_counter()
+                actual = compute()
+                elapsed = time.perf_counter() - started
+                error = np.max(np.abs(actual - expected) / expected)
+                cost = f"{elapsed * 1e6 / per:.2f} us/根" if per > 1 else f"{elapsed * 1000:.0f} ms"
+                print(f"{label:>10} {rows:>12,} {name:>14} {cost:>12} {error:>14.2e}")
+
+
+def bench_series():
+    """逐根K线的综合信号（回测用）：逐根调用 analyze vs analyze_series 一次计算"""
+    print("="*60)
+    print("⏱️  逐根K线综合信号（s）")
+    print("="*60)
+    print(f"{'K线数':>10} {'逐根 analyze(估算)':>20} {'analyze_series':>16}")
+
+    manager = SignalManager({"signals": {"backend": "numpy"}})
+    for rows in (1_000, 10_000, 100_000):
+        df = generate_ohlcv(rows, "1h", seed=1)
+        # 逐根调用的总耗时约为 K线数 × 平均窗口（一半长度）上 analyze 的耗时
+        loop_s = timeit(lambda: manager.analyze(df.iloc[:rows // 2]), 3) / 1000 * rows
+        series_s = timeit(lambda: manager.analyze_series(df), 3) / 1000
+        print(f"{rows:>10,} {loop_s:>20.1f} {series_s:>16.3f}")
+
+
+BENCHMARKS = {
+    "parse": bench_parse,
+    "synthetic": bench_synthetic,
+    "e2e": bench_e2e,
+    "hedge": bench_hedge,
+    "quality": bench_quality,
+    "streaming": bench_streaming,
+    "kernels": bench_kernels,
+    "batch": bench_batch,
+    "grid": bench_grid,
+    "memory": bench_memory,
+    "variance": bench_variance,
+    "series": bench_series,
+}
+
+
+if __name__ == "__main__":
+    import sys
+
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            print(f"用法: python3 benchmark.py [{'|'.join(BENCHMARKS)}]")
+            sys.exit(1)
+        BENCHMARKS[name]()
@@ -5,8 +5,10 @@
 import yaml
 import schedule
 import time
+import pandas as pd
 from datetime import datetime
 from pathlib import Path
+from typing import Optional
 
 from app.fetch_data import OKXDataFetcher
 from app.indicators import IndicatorCalculator
@@ -22,7 +24,11 @@ class CryptoSignalLite:
         self.config_path = config_path
         self.config = self.load_config()
         self.fetcher = OKXDataFetcher(symbol=self.config["symbol"])
-        self.calculator = IndicatorCalculator()
+        self.calculator = IndicatorCalculator(
+            backend=self.config.get("indicator_backend", "pandas"),
+            lean=self.config.get("lean_pipeline", False),
+            lazy=self.config.get("lazy_indicators", False)
+        )
         self.notifier = Notifier(
             method=self.config.get("notify", {}).get("method", "serverchan"),
             key=self.config.get("notify", {}).get("key")
@@ -38,12 +44,17 @@ class CryptoSignalLite:
         with open(config_file, "r", encoding="utf-8") as f:
             return yaml.safe_load(f)
     
-    def analyze_interval(self, interval: str) -> dict:
+    def _data_limit(self) -> int:
+        """K线数量：回测使用 data_limit 根历史数据，且不少于指标所需的预热长度"""
+        return max(self.config.get("data_limit", 500), self.calculator.warmup_bars())
+    
+    def analyze_interval(self, interval: str, df: Optional[pd.DataFrame] = None) -> dict:
         """
         分析单个周期的数据
         
         Args:
             interval: 时间周期
+            df: 已获取的K线数据（为空时单独请求）
             
         Returns:
             分析结果字典
@@ -53,15 +64,20 @@ class CryptoSignalLite:
         print(f"{'='*60}")
         
         # 1. 获取数据
-        df = self.fetcher.fetch_klines(
-            interval=interval,
-            limit=self.config.get("data_limit", 500)
-        )
+        if df is None:
+            df = self.fetcher.fetch_klines(
+                symbol=self.config["symbol"],
+                interval=interval,
+                limit=self._data_limit()
+            )
         
         if df is None or df.empty:
             print(f"❌ 无法获取 {interval} 数据")
             return {}
         
+        # 数据质量检查（修复异常K线后再计算指标）
+        df = self.fetcher.validate(df, self.config["symbol"], interval)
+        
         # 2. 计算技术指标
         print("🔢 计算技术指标...")
         df = self.calculator.calculate_indicators(df)
@@ -75,7 +91,7 @@ class CryptoSignalLite:
         
         # 5. 回测
         print("📈 运行历史回测...")
-        backtester = Backtester(df)
+        backtester = Backtester(df, copy=not self.calculator.lean)
         backtest_result = backtester.run_backtest()
         
         # 6. 可视化
@@ -108,9 +124,21 @@ class CryptoSignalLite:
         intervals = self.config.get("intervals", ["1d"])
         results = {}
         
+        # 只请求基础周期，其余周期在本地合成
+        frames = {}
+        try:
+            frames = self.fetcher.fetch_timeframes(
+                self.config["symbol"],
+                intervals,
+                limit=self._data_limit(),
+                base_interval=self.config.get("base_interval")
+            )
+        except Exception as e:
+            print(f"⚠️  多周期获取失败，改为逐个周期获取: {e}")
+        
         for interval in intervals:
             try:
-                result = self.analyze_interval(interval)
+                result = self.analyze_interval(interval, frames.get(interval))
                 results[interval] = result
                 
                 # 打印最新信号
@@ -135,7 +163,7 @@ class CryptoSignalLite:
                           f"最大回撤: {backtest.get('max_drawdown', 0):.2f}%")
                     
                     # 打印最近12个月交易记录
-                    backtester = Backtester(result.get("data"))
+                    backtester = Backtester(result.get("data"), copy=not self.calculator.lean)
                     backtester.print_recent_trades_table(months=12)
                 
                 # 打印图表路径
@@ -2,13 +2,21 @@
 量化信号监控系统 - 主程序
 每4小时运行一次信号检测，每日生成报告
 """
+import asyncio
 import yaml
 import sys
+import time
+import pandas as pd
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, List, Optional
 
+from app.async_fetcher import AsyncFetchEngine
 from app.fetch_data import OKXDataFetcher
+from app.http_client import get_http_client
+from app.candle_buffer import BarEvent
+from app.okx_stream import OKX_WS_URL, OKXCandleStream
+from app.streaming import StreamingIndicators
 from signals.signal_manager import SignalManager
 from notifier.serverchan_push import ServerChanNotifier
 from position_manager import PositionManager
@@ -18,10 +26,15 @@ from logger import SignalLogger
 class QuantSignalSystem:
     """量化信号监控系统"""
     
+    SIGNAL_INTERVAL = "4h"  # 使用4小时线进行信号检测
+    
     def __init__(self, config_path: str = "config/settings.yaml"):
         self.config_path = Path(config_path)
         self.config = self._load_config()
         
+        # 共享 HTTP 连接池按配置创建一次（数据获取、通知推送之后都取得同一个实例）
+        self.http = get_http_client(self.config.get("http"))
+        
         # 初始化组件
         self.logger = SignalLogger(
             log_file=self.config["logging"]["file"],
@@ -30,9 +43,18 @@ class QuantSignalSystem:
             backup_count=self.config["logging"]["backup_count"]
         )
         
-        self.fetcher = OKXDataFetcher()
+        self.fetcher = OKXDataFetcher(config=self.config)
+        self.fetch_engine = AsyncFetchEngine(
+            self.fetcher,
+            max_concurrency=self.config["data"].get("max_concurrency", 16)
+        )
         self.signal_manager = SignalManager(self.config)
         
+        # 按信号检测器声明的预热长度获取K线（有本地存储时只增量请求新K线）
+        self.signal_limit = self._signal_limit()
+        for symbol in self.config["symbols"]:
+            self.fetcher.declare_lookback(symbol, self.SIGNAL_INTERVAL, self.signal_limit)
+        
         # 通知器
         notify_config = self.config.get("notify", {})
         if notify_config.get("method") == "serverchan" and notify_config.get("serverchan", {}).get("enable"):
@@ -46,6 +68,9 @@ class QuantSignalSystem:
         max_holding_days = self.config["signals"]["max_holding_days"]
         self.position_manager = PositionManager(max_holding_days=max_holding_days)
         
+        # 实时模式下每个交易对的增量指标（由K线推送更新，见 run_stream）
+        self.live_indicators: Dict[str, StreamingIndicators] = {}
+        
         self.logger.log_info("="*60)
         self.logger.log_info("🚀 量化信号监控系统启动")
         self.logger.log_info(f"时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
@@ -59,12 +84,22 @@ class QuantSignalSystem:
         with open(self.config_path, 'r', encoding='utf-8') as f:
             return yaml.safe_load(f)
     
-    def check_signal(self, symbol: str) -> Dict:
+    def _signal_limit(self) -> int:
+        """每次信号检测获取的K线数量（data.limit 为 auto 时取检测器所需的最少数量）"""
+        limit = self.config["data"].get("limit", "auto")
+        if limit == "auto":
+            return self.signal_manager.warmup_bars()
+        return max(int(limit), self.signal_manager.warmup_bars())
+    
+    def check_signal(self, symbol: str, df: Optional[pd.DataFrame] = None,
+                     signal_result: Optional[Dict] = None) -> Dict:
         """
         检测单个交易对的信号
         
         Args:
             symbol: 交易对（如 "AR/USDT"）
+            df: 已获取的K线数据（为空时单独获取）
+            signal_result: 已批量算好的信号（见 SignalManager.analyze_frames，此时 df 已做过质量检查）
             
         Returns:
             检测结果字典
@@ -75,11 +110,9 @@ class QuantSignalSystem:
         
         try:
             # 1. 获取数据（使用4小时线进行信号检测）
-            intervals = self.config["data"]["intervals"]
-            signal_interval = "4h"  # 使用4小时线
-            
-            self.logger.log_info(f"📥 获取 {symbol} {signal_interval} 数据...")
-            df = self.fetcher.fetch_klines(symbol, signal_interval, self.config["data"]["limit"])
+            if df is None:
+                self.logger.log_info(f"📥 获取 {symbol} {self.SIGNAL_INTERVAL} 数据...")
+                df = self.fetcher.fetch_klines(symbol, self.SIGNAL_INTERVAL)
             
             if df is None or df.empty:
                 self.logger.log_error(f"❌ 无法获取 {symbol} 数据")
@@ -87,9 +120,20 @@ class QuantSignalSystem:
             
             self.logger.log_info(f"✅ 获取到 {len(df)} 根K线数据")
             
-            # 2. 信号分析
-            self.logger.log_info("🔍 分析交易信号...")
-            signal_result = self.signal_manager.analyze(df)
+            if df.attrs.get("stale"):
+                # OKX 不可用时返回的是本地旧数据，不据此通知或开平仓
+                self.logger.log_error(
+                    f"⚠️  {symbol} 数据已过期（截至 {df.attrs.get('as_of')}），跳过本次信号检测"
+                )
+                return {}
+            
+            if signal_result is None:
+                # 数据质量检查（修复异常K线后再分析）
+                df = self.fetcher.validate(df, symbol, self.SIGNAL_INTERVAL)
+                
+                # 2. 信号分析
+                self.logger.log_info("🔍 分析交易信号...")
+                signal_result = self.signal_manager.analyze(df)
             
             # 3. 记录信号
             self.logger.log_signal(symbol, signal_result)
@@ -191,17 +235,151 @@ class QuantSignalSystem:
         symbols = self.config["symbols"]
         results = {}
         
+        # 并发获取所有交易对的数据，质量检查后一次批量计算所有交易对的信号，再逐个处理
+        started = time.perf_counter()
+        frames = self.fetch_engine.fetch_all_sync(symbols, [self.SIGNAL_INTERVAL])
+        fetched = time.perf_counter()
+        
+        frames = {symbol: frames[symbol][self.SIGNAL_INTERVAL] for symbol in symbols}
+        # 无数据或已过期的交易对不参与批量计算，由 check_signal 提示并跳过
+        ready = {}
+        for symbol, df in frames.items():
+            if df is None or df.empty or df.attrs.get("stale"):
+                continue
+            try:
+                ready[symbol] = self.fetcher.validate(df, symbol, self.SIGNAL_INTERVAL)
+            except Exception as e:
+                # 只影响这个交易对：不参与批量计算，由 check_signal 单独处理并记录错误
+                self.logger.log_error(f"❌ {symbol} 数据质量检查出错: {e}")
+        try:
+            signals = self.signal_manager.analyze_frames(ready)
+        except Exception as e:
+            # 批量计算失败时逐个交易对分析，出错的交易对在 check_signal 中单独跳过
+            self.logger.log_error(f"⚠️  批量分析出错，改为逐个分析: {e}", exc_info=True)
+            signals = {}
+        
         for symbol in symbols:
-            result = self.check_signal(symbol)
+            result = self.check_signal(symbol, ready.get(symbol, frames[symbol]), signals.get(symbol))
             if result:
                 results[symbol] = result
         
+        # 各阶段耗时（秒），压测脚本读取
+        self.last_run_timings = {
+            "fetch": fetched - started,
+            "analyze": time.perf_counter() - fetched,
+            "total": time.perf_counter() - started
+        }
+        self.logger.log_info(
+            f"⏱️  获取 {self.last_run_timings['fetch']:.2f}s | "
+            f"分析 {self.last_run_timings['analyze']:.2f}s | {len(symbols)} 个交易对"
+        )
+        
+        features = self.signal_manager.feature_stats()
+        self.logger.log_info(
+            f"🧮 特征缓存: 复用 {features['hits']} 次 | 计算 {features['misses']} 次"
+        )
+        
+        for host, stats in self.fetcher.http.stats().items():
+            self.logger.log_info(
+                f"🌐 {host}: 请求 {stats['requests']} 次 | 新建连接 {stats['connections']} 个 | "
+                f"复用率 {stats['reuse_rate']:.0%}"
+            )
+        for key, gaps in self.fetcher.gap_stats().items():
+            if gaps["gaps"]:
+                self.logger.log_info(
+                    f"🕳️  {key}: 缺口 {gaps['gaps']} 处 | 缺失 {gaps['missing_bars']} 根 | "
+                    f"最大缺口 {gaps['largest_gap_bars']} 根"
+                )
+        if self.fetcher.hedger is not None:
+            hedge = self.fetcher.hedger.stats()
+            self.logger.log_info(
+                f"🔀 对冲请求: {hedge['hedged']}/{hedge['requests']} 次 ({hedge['hedge_rate']:.1%}) | "
+                f"备用地址先返回 {hedge['hedge_wins']} 次 | 节省延迟 {hedge['latency_saved_ms']:.0f}ms | "
+                f"当前对冲延迟 {hedge['delay_ms']:.0f}ms"
+            )
+        
         self.logger.log_info("\n" + "="*60)
         self.logger.log_info("✅ 信号检测任务完成")
         self.logger.log_info("="*60)
         
         return results
     
+    def run_backfill(self, start: Optional[str] = None):
+        """
+        回补所有交易对、所有分析周期的历史K线（合并进本地存储）
+
+        中断后重新运行会从断点继续，已完成的分页不再请求。
+
+        Args:
+            start: 回补起始日期，默认取 data.backfill.start
+        """
+        start = start or self.config["data"].get("backfill", {}).get("start")
+        if not start:
+            raise ValueError("未指定回补起始日期（命令行参数或 data.backfill.start）")
+        
+        intervals = list(self.config["data"].get("intervals") or [self.SIGNAL_INTERVAL])
+        base_interval = self.config["data"].get("base_interval")
+        if base_interval and base_interval not in intervals:
+            intervals.append(base_interval)
+        
+        self.logger.log_info(f"📚 回补 {start} 以来的历史K线: {'/'.join(intervals)}")
+        results = {}
+        for symbol in self.config["symbols"]:
+            for interval in intervals:
+                try:
+                    df = self.fetcher.fetch_history(symbol, interval, start=start)
+                    results[(symbol, interval)] = len(df)
+                    self.logger.log_info(f"✅ {symbol} {interval} 回补 {len(df)} 根K线")
+                except Exception as e:
+                    # 已完成的分页保留在断点中，重新运行时继续
+                    self.logger.log_error(f"❌ 回补 {symbol} {interval} 失败: {e}")
+        return results
+    
+    def run_stream(self):
+        """实时模式：订阅K线推送，每根K线收盘时立即检测信号"""
+        stream_config = self.config.get("stream", {})
+        stream = OKXCandleStream(
+            self.config["symbols"],
+            [self.SIGNAL_INTERVAL],
+            self._on_bar_close,
+            url=stream_config.get("url", OKX_WS_URL),
+            max_bars=self.signal_limit,
+            fetcher=self.fetcher,
+            on_bar_update=self._on_bar_update
+        )
+        
+        self.logger.log_info("📶 实时模式启动，预热历史K线...")
+        stream.warm_up()
+        
+        # 增量指标用预热后的缓冲区初始化，之后每条推送（含未收盘K线的原地更新）O(1) 更新
+        indicator_config = self.config["signals"].get("indicators") or {}
+        for key, (symbol, _) in stream.channels.items():
+            buffer = stream.buffers[key]
+            engine = StreamingIndicators.from_config(indicator_config)
+            if buffer.count:
+                last_ts = int(buffer.ts[buffer.count - 1])
+                engine.seed(buffer.frame(), last_confirmed=buffer.last_confirmed_ts == last_ts)
+            self.live_indicators[symbol] = engine
+        
+        try:
+            asyncio.run(stream.run())
+        except KeyboardInterrupt:
+            self.logger.log_info("👋 实时模式已停止")
+    
+    def _on_bar_update(self, symbol: str, interval: str, event: BarEvent):
+        """K线更新回调：增量更新该交易对的指标（收盘回调之前调用）"""
+        self.live_indicators[symbol].on_bar(event)
+    
+    async def _on_bar_close(self, symbol: str, interval: str, df: pd.DataFrame):
+        """K线收盘回调：在线程中运行信号检测，不阻塞推送接收"""
+        self.logger.log_info(f"🕯️ {symbol} {interval} K线收盘，立即检测信号")
+        values = self.live_indicators[symbol].values
+        self.logger.log_info(
+            f"📈 {symbol} 最新指标: MACD柱 {values['MACD_hist']:.6f} | RSI {values['RSI']:.2f} | "
+            f"K/D/J {values['K']:.2f}/{values['D']:.2f}/{values['J']:.2f}"
+        )
+        await asyncio.to_thread(self.check_signal, symbol, df)
+    
     def generate_daily_report(self):
         """生成每日报告"""
         self.logger.log_info("\n" + "="*60)
@@ -216,16 +394,21 @@ class QuantSignalSystem:
             stats = self.position_manager.get_statistics(symbol)
             open_positions = self.position_manager.get_open_positions(symbol)
             
-            # 获取最新价格
+            # 最新价格即最新4小时K线的收盘价；4小时数据在信号检测后已缓存，不再重复请求
+            try:
+                df = self.fetcher.validate(
+                    self.fetcher.fetch_klines(symbol, self.SIGNAL_INTERVAL), symbol, self.SIGNAL_INTERVAL
+                )
+            except:
+                df = None
+            
             try:
-                df = self.fetcher.fetch_klines(symbol, "1d", 1)
                 latest_price = float(df["close"].iloc[-1]) if not df.empty else 0.0
             except:
                 latest_price = 0.0
             
             # 获取最新信号
             try:
-                df = self.fetcher.fetch_klines(symbol, "4h", 100)
                 signal_result = self.signal_manager.analyze(df)
                 latest_signal = signal_result.get("type", "无")
             except:
@@ -255,6 +438,14 @@ def main():
         # 生成日报
         system = QuantSignalSystem()
         system.generate_daily_report()
+    elif len(sys.argv) > 1 and sys.argv[1] == "--backfill":
+        # 回补历史K线（python3 main_v2.py --backfill [起始日期]）
+        system = QuantSignalSystem()
+        system.run_backfill(sys.argv[2] if len(sys.argv) > 2 else None)
+    elif len(sys.argv) > 1 and sys.argv[1] == "--stream":
+        # 实时模式（K线收盘即检测）
+        system = QuantSignalSystem()
+        system.run_stream()
     else:
         # 信号检测
         system = QuantSignalSystem()
@@ -1,10 +1,11 @@
 """
 Server酱 推送模块
 """
-import requests
 from typing import Optional, Dict
 from datetime import datetime
 
+from app.http_client import get_http_client
+
 
 class ServerChanNotifier:
     """Server酱通知器"""
@@ -40,7 +41,7 @@ class ServerChanNotifier:
             data["desp"] = f"{desp}\n\n{content}"
         
         try:
-            response = requests.post(url, data=data, timeout=10)
+            response = get_http_client().post(url, data=data, timeout=10)
             response.raise_for_status()
             result = response.json()
             
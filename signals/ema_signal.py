@@ -4,7 +4,10 @@ EMA 信号检测模块
 """
 import pandas as pd
 import numpy as np
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Tuple
+
+from app.batch_indicators import last_two, previous
+from app.feature_cache import FeatureCache
 
 
 class EMASignal:
@@ -14,16 +17,38 @@ class EMASignal:
         self.fast_period = fast_period
         self.slow_period = slow_period
     
-    def calculate_ema(self, series: pd.Series, period: int) -> pd.Series:
-        """计算指数移动平均"""
-        return series.ewm(span=period, adjust=False).mean()
+    @classmethod
+    def from_config(cls, params: Dict) -> "EMASignal":
+        """由 settings.yaml 的 signals.indicators.ema 创建"""
+        return cls(fast_period=params.get("fast", 12), slow_period=params.get("slow", 26))
+    
+    def indicators(self) -> Dict[str, Dict]:
+        """依赖的指标（app/indicator_plan.py 的 INDICATORS）"""
+        return {"ema": {"fast": self.fast_period, "slow": self.slow_period}}
+    
+    def columns(self) -> List[str]:
+        """批量分析读取的指标列"""
+        return [f"EMA{self.fast_period}", f"EMA{self.slow_period}"]
     
-    def detect_signal(self, df: pd.DataFrame) -> Dict:
+    def min_bars(self) -> int:
+        """给出信号所需的最少K线数量（不足时 detect_signal 返回无信号）"""
+        return self.slow_period
+    
+    def warmup_bars(self) -> int:
+        """
+        检测所需的最少K线数量
+        
+        EMA 的初值取第一根收盘价，约 2 倍周期后初值影响可忽略；多 1 根用于判断交叉。
+        """
+        return 2 * self.slow_period + 1
+    
+    def detect_signal(self, df: pd.DataFrame, features: Optional[FeatureCache] = None) -> Dict:
         """
         检测EMA信号
         
         Args:
             df: 包含价格数据的DataFrame
+            features: 同一份数据的特征缓存（与其他检测器共用，为空时单独计算）
             
         Returns:
             信号字典: {
@@ -41,70 +66,98 @@ class EMASignal:
                 "details": {}
             }
         
-        close = df["close"]
+        features = features or FeatureCache(df)
+        close = features.series("close")
         
-        # 计算EMA
-        ema_fast = self.calculate_ema(close, self.fast_period)
-        ema_slow = self.calculate_ema(close, self.slow_period)
+        # 计算EMA（与 MACD 的快慢线相同时直接复用）
+        ema_fast = features.ema("close", self.fast_period)
+        ema_slow = features.ema("close", self.slow_period)
         
         # 获取最新值
         latest_fast = ema_fast.iloc[-1]
         latest_slow = ema_slow.iloc[-1]
         prev_fast = ema_fast.iloc[-2] if len(ema_fast) > 1 else latest_fast
         prev_slow = ema_slow.iloc[-2] if len(ema_slow) > 1 else latest_slow
+        price = close.iloc[-1]
         
-        # 判断交叉
-        cross_up = (latest_fast > latest_slow) and (prev_fast <= prev_slow)
-        cross_down = (latest_fast < latest_slow) and (prev_fast >= prev_slow)
+        signal, strength = self.evaluate(latest_fast, latest_slow, prev_fast, prev_slow, price)
+        return self.describe(signal, strength, latest_fast, latest_slow, price)
+    
+    def evaluate(self, fast, slow, prev_fast, prev_slow, price) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        根据最新两根K线的快慢线判断信号（标量或任意形状的数组，逐元素计算）
         
-        # 计算信号强度（基于EMA差距和趋势）
-        ema_diff = abs(latest_fast - latest_slow) / latest_slow if latest_slow > 0 else 0
-        trend_strength = abs(ema_fast.diff().iloc[-1]) / close.iloc[-1] if close.iloc[-1] > 0 else 0
+        Args:
+            fast, slow: 最新的快线、慢线
+            prev_fast, prev_slow: 上一根的快线、慢线
+            price: 最新收盘价
+            
+        Returns:
+            (signal, strength)：1/-1/0 与 0.0-1.0
+        """
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # 判断交叉
+            cross_up = (fast > slow) & (prev_fast <= prev_slow)
+            cross_down = (fast < slow) & (prev_fast >= prev_slow)
+            
+            # 计算信号强度（基于EMA差距和趋势）
+            ema_diff = np.where(slow > 0, np.abs(fast - slow) / slow, 0)
+            trend_strength = np.where(price > 0, np.abs(fast - prev_fast) / price, 0)
         
-        strength = min(1.0, (ema_diff * 10 + trend_strength * 100))
+        raw = ema_diff * 10 + trend_strength * 100
+        strength = np.where(raw < 1.0, raw, 1.0)
+        signal = np.where(cross_up, 1, np.where(cross_down, -1, 0))
+        # 无交叉时强度减半
+        return signal, np.where(signal != 0, strength, strength * 0.5)
+    
+    def detect_series(self, df: pd.DataFrame, features: Optional[FeatureCache] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        逐根K线的信号（第 t 根与 detect_signal(df.iloc[:t+1]) 相同，K线不足 min_bars 的部分由调用方置为无信号）
         
-        if cross_up:
-            return {
-                "signal": 1,
-                "strength": strength,
-                "type": "买入",
-                "details": {
-                    "ema_fast": float(latest_fast),
-                    "ema_slow": float(latest_slow),
-                    "cross_type": "上穿",
-                    "price": float(close.iloc[-1])
-                }
-            }
-        elif cross_down:
-            return {
-                "signal": -1,
-                "strength": strength,
-                "type": "卖出",
-                "details": {
-                    "ema_fast": float(latest_fast),
-                    "ema_slow": float(latest_slow),
-                    "cross_type": "下穿",
-                    "price": float(close.iloc[-1])
-                }
-            }
+        Returns:
+            (signal, strength) 数组，长度与 df 相同
+        """
+        features = features or FeatureCache(df)
+        close = features.series("close").to_numpy(dtype=np.float64)
+        fast = features.ema("close", self.fast_period).to_numpy()
+        slow = features.ema("close", self.slow_period).to_numpy()
+        return self.evaluate(fast, slow, previous(fast), previous(slow), close)
+    
+    def evaluate_batch(self, values: Dict[str, np.ndarray], close: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        多个交易对最新一根K线的信号
+        
+        Args:
+            values: 指标矩阵（含 columns() 中的列），形状 (交易对, 时间)
+            close: 收盘价矩阵
+        """
+        (fast, prev_fast), (slow, prev_slow) = (last_two(values[name]) for name in self.columns())
+        return self.evaluate(fast, slow, prev_fast, prev_slow, close[..., -1])
+    
+    def describe_batch(self, values: Dict[str, np.ndarray], row: int, signal, strength,
+                       close: np.ndarray) -> Dict:
+        """批量结果中第 row 个交易对的信号字典"""
+        fast, slow = (values[name][row, -1] for name in self.columns())
+        return self.describe(signal, strength, fast, slow, close[row, -1])
+    
+    def describe(self, signal, strength, fast: float, slow: float, price: float) -> Dict:
+        """由 evaluate 的结果生成信号字典"""
+        details = {"ema_fast": float(fast), "ema_slow": float(slow)}
+        if signal == 1:
+            signal_type = "买入"
+            details["cross_type"] = "上穿"
+        elif signal == -1:
+            signal_type = "卖出"
+            details["cross_type"] = "下穿"
         else:
             # 无交叉，但可以判断趋势方向
-            if latest_fast > latest_slow:
-                trend_signal = 1
-                trend_type = "多头"
-            else:
-                trend_signal = -1
-                trend_type = "空头"
-            
-            return {
-                "signal": 0,
-                "strength": strength * 0.5,  # 无交叉时强度减半
-                "type": f"趋势{trend_type}",
-                "details": {
-                    "ema_fast": float(latest_fast),
-                    "ema_slow": float(latest_slow),
-                    "trend": trend_type,
-                    "price": float(close.iloc[-1])
-                }
-            }
-
+            trend_type = "多头" if fast > slow else "空头"
+            signal_type = f"趋势{trend_type}"
+            details["trend"] = trend_type
+        details["price"] = float(price)
+        return {
+            "signal": int(signal),
+            "strength": float(strength),
+            "type": signal_type,
+            "details": details
+        }
@@ -3,7 +3,10 @@ KDJ 信号检测模块
 """
 import pandas as pd
 import numpy as np
-from typing import Dict
+from typing import Dict, List, Optional, Tuple
+
+from app.batch_indicators import last_two, previous
+from app.feature_cache import FeatureCache
 
 
 class KDJSignal:
@@ -14,46 +17,53 @@ class KDJSignal:
         self.k_period = k_period
         self.d_period = d_period
     
-    def calculate_kdj(self, df: pd.DataFrame) -> Dict[str, pd.Series]:
+    @classmethod
+    def from_config(cls, params: Dict) -> "KDJSignal":
+        """由 settings.yaml 的 signals.indicators.kdj 创建"""
+        return cls(period=params.get("period", 9), k_period=params.get("k_period", 3),
+                   d_period=params.get("d_period", 3))
+    
+    def indicators(self) -> Dict[str, Dict]:
+        """依赖的指标（app/indicator_plan.py 的 INDICATORS）"""
+        return {"kdj": {"period": self.period, "k_period": self.k_period, "d_period": self.d_period}}
+    
+    def columns(self) -> List[str]:
+        """批量分析读取的指标列"""
+        return ["K", "D", "J"]
+    
+    def min_bars(self) -> int:
+        """给出信号所需的最少K线数量（不足时 detect_signal 返回无信号）"""
+        return self.period
+    
+    def warmup_bars(self) -> int:
+        """检测所需的最少K线数量（RSV 窗口的 2 倍，K/D 平滑在此期间收敛，多 1 根用于判断交叉）"""
+        return 2 * self.period + 1
+    
+    def calculate_kdj(self, df: pd.DataFrame, features: Optional[FeatureCache] = None) -> Dict[str, pd.Series]:
         """
         计算KDJ指标
         
+        RSV = (收盘价 - N日最低价) / (N日最高价 - N日最低价) × 100（缺失时取 50），
+        K 为 RSV 的 EMA（alpha=1/k_period），D 为 K 的 EMA（alpha=1/d_period），J = 3K - 2D。
+        
         Args:
             df: 包含high, low, close的DataFrame
+            features: 同一份数据的特征缓存（为空时单独计算）
             
         Returns:
             K, D, J 序列
         """
-        high = df["high"]
-        low = df["low"]
-        close = df["close"]
-        
-        # 计算RSV
-        lowest_low = low.rolling(window=self.period).min()
-        highest_high = high.rolling(window=self.period).max()
-        
-        rsv = (close - lowest_low) / (highest_high - lowest_low) * 100
-        rsv = rsv.fillna(50)  # 处理NaN
-        
-        # 计算K值（RSV的EMA）
-        k = rsv.ewm(alpha=1/self.k_period, adjust=False).mean()
-        
-        # 计算D值（K的EMA）
-        d = k.ewm(alpha=1/self.d_period, adjust=False).mean()
-        
-        # 计算J值
-        j = 3 * k - 2 * d
-        
-        return {
-            "k": k,
-            "d": d,
-            "j": j
-        }
+        features = features or FeatureCache(df)
+        return features.kdj(self.period, self.k_period, self.d_period)
     
-    def detect_signal(self, df: pd.DataFrame) -> Dict:
+    def detect_signal(self, df: pd.DataFrame, features: Optional[FeatureCache] = None) -> Dict:
         """
         检测KDJ信号
         
+        Args:
+            df: 包含high, low, close的DataFrame
+            features: 同一份数据的特征缓存（与其他检测器共用，为空时单独计算）
+        
         Returns:
             信号字典
         """
@@ -65,7 +75,7 @@ class KDJSignal:
                 "details": {}
             }
         
-        kdj_data = self.calculate_kdj(df)
+        kdj_data = self.calculate_kdj(df, features)
         k = kdj_data["k"]
         d = kdj_data["d"]
         j = kdj_data["j"]
@@ -77,96 +87,100 @@ class KDJSignal:
         prev_k = k.iloc[-2] if len(k) > 1 else latest_k
         prev_d = d.iloc[-2] if len(d) > 1 else latest_d
         
-        # 判断交叉
-        cross_up = (latest_k > latest_d) and (prev_k <= prev_d)
-        cross_down = (latest_k < latest_d) and (prev_k >= prev_d)
+        signal, strength = self.evaluate(latest_k, latest_d, prev_k, prev_d)
+        return self.describe(signal, strength, latest_k, latest_d, latest_j, prev_k, prev_d,
+                             df["close"].iloc[-1])
+    
+    @staticmethod
+    def _zones(k, d, prev_k, prev_d):
+        """交叉与超买超卖判断"""
+        cross_up = (k > d) & (prev_k <= prev_d)
+        cross_down = (k < d) & (prev_k >= prev_d)
+        oversold = (k < 20) & (d < 20)
+        overbought = (k > 80) & (d > 80)
+        return cross_up, cross_down, oversold, overbought
+    
+    def evaluate(self, k, d, prev_k, prev_d) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        根据最新两根K线的 K/D 判断信号（标量或任意形状的数组，逐元素计算）
         
-        # 计算信号强度
-        kd_diff = abs(latest_k - latest_d)
-        strength = min(1.0, kd_diff / 50.0)  # 归一化到0-1
+        Returns:
+            (signal, strength)
+        """
+        cross_up, cross_down, oversold, overbought = self._zones(k, d, prev_k, prev_d)
         
-        # 超买超卖判断
-        oversold = latest_k < 20 and latest_d < 20
-        overbought = latest_k > 80 and latest_d > 80
+        # 计算信号强度（归一化到0-1）
+        kd_diff = np.abs(k - d) / 50.0
+        strength = np.where(kd_diff < 1.0, kd_diff, 1.0)
+        boosted = np.where(strength + 0.3 < 1.0, strength + 0.3, 1.0)
         
-        if cross_up and oversold:
-            # 金叉 + 超卖 = 强烈买入信号
-            return {
-                "signal": 1,
-                "strength": min(1.0, strength + 0.3),
-                "type": "买入",
-                "details": {
-                    "k": float(latest_k),
-                    "d": float(latest_d),
-                    "j": float(latest_j),
-                    "cross_type": "金叉",
-                    "position": "超卖区域",
-                    "price": float(df["close"].iloc[-1])
-                }
-            }
-        elif cross_down and overbought:
-            # 死叉 + 超买 = 强烈卖出信号
-            return {
-                "signal": -1,
-                "strength": min(1.0, strength + 0.3),
-                "type": "卖出",
-                "details": {
-                    "k": float(latest_k),
-                    "d": float(latest_d),
-                    "j": float(latest_j),
-                    "cross_type": "死叉",
-                    "position": "超买区域",
-                    "price": float(df["close"].iloc[-1])
-                }
-            }
-        elif cross_up:
-            return {
-                "signal": 1,
-                "strength": strength,
-                "type": "买入",
-                "details": {
-                    "k": float(latest_k),
-                    "d": float(latest_d),
-                    "j": float(latest_j),
-                    "cross_type": "金叉",
-                    "price": float(df["close"].iloc[-1])
-                }
-            }
-        elif cross_down:
-            return {
-                "signal": -1,
-                "strength": strength,
-                "type": "卖出",
-                "details": {
-                    "k": float(latest_k),
-                    "d": float(latest_d),
-                    "j": float(latest_j),
-                    "cross_type": "死叉",
-                    "price": float(df["close"].iloc[-1])
-                }
-            }
+        signal = np.where(cross_up, 1, np.where(cross_down, -1, 0))
+        strength = np.select(
+            [cross_up & oversold, cross_down & overbought, cross_up | cross_down],
+            [boosted, boosted, strength],
+            strength * 0.3
+        )
+        return signal, strength
+    
+    def detect_series(self, df: pd.DataFrame, features: Optional[FeatureCache] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        逐根K线的信号（第 t 根与 detect_signal(df.iloc[:t+1]) 相同，K线不足 min_bars 的部分由调用方置为无信号）
+        
+        Returns:
+            (signal, strength) 数组，长度与 df 相同
+        """
+        kdj_data = self.calculate_kdj(df, features)
+        k, d = kdj_data["k"].to_numpy(), kdj_data["d"].to_numpy()
+        return self.evaluate(k, d, previous(k), previous(d))
+    
+    def evaluate_batch(self, values: Dict[str, np.ndarray], close: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        多个交易对最新一根K线的信号
+        
+        Args:
+            values: 指标矩阵（含 columns() 中的列），形状 (交易对, 时间)
+            close: 收盘价矩阵
+        """
+        (k, prev_k), (d, prev_d) = last_two(values["K"]), last_two(values["D"])
+        return self.evaluate(k, d, prev_k, prev_d)
+    
+    def describe_batch(self, values: Dict[str, np.ndarray], row: int, signal, strength,
+                       close: np.ndarray) -> Dict:
+        """批量结果中第 row 个交易对的信号字典"""
+        (k, prev_k), (d, prev_d) = last_two(values["K"][row]), last_two(values["D"][row])
+        return self.describe(signal, strength, k, d, values["J"][row, -1], prev_k, prev_d, close[row, -1])
+    
+    def describe(self, signal, strength, k: float, d: float, j: float, prev_k: float, prev_d: float,
+                 price: float) -> Dict:
+        """由 evaluate 的结果生成信号字典"""
+        cross_up, cross_down, oversold, overbought = self._zones(k, d, prev_k, prev_d)
+        details = {"k": float(k), "d": float(d), "j": float(j)}
+        if signal == 1:
+            # 金叉（+ 超卖 = 强烈买入信号）
+            signal_type = "买入"
+            details["cross_type"] = "金叉"
+            if oversold:
+                details["position"] = "超卖区域"
+        elif signal == -1:
+            # 死叉（+ 超买 = 强烈卖出信号）
+            signal_type = "卖出"
+            details["cross_type"] = "死叉"
+            if overbought:
+                details["position"] = "超买区域"
         else:
             # 无交叉，判断位置
             if oversold:
                 position = "超卖"
-                trend_signal = 1
             elif overbought:
                 position = "超买"
-                trend_signal = -1
             else:
                 position = "中性"
-                trend_signal = 0
-            
-            return {
-                "signal": 0,
-                "strength": strength * 0.3,
-                "type": f"位置{position}",
-                "details": {
-                    "k": float(latest_k),
-                    "d": float(latest_d),
-                    "j": float(latest_j),
-                    "position": position,
-                    "price": float(df["close"].iloc[-1])
-                }
-            }
-
+            signal_type = f"位置{position}"
+            details["position"] = position
+        details["price"] = float(price)
+        return {
+            "signal": int(signal),
+            "strength": float(strength),
+            "type": signal_type,
+            "details": details
+        }
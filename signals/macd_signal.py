@@ -1,8 +1,12 @@
 """
 MACD 信号检测模块
 """
+import numpy as np
 import pandas as pd
-from typing import Dict
+from typing import Dict, List, Optional, Tuple
+
+from app.batch_indicators import last_two, previous
+from app.feature_cache import FeatureCache
 
 
 class MACDSignal:
@@ -13,28 +17,35 @@ class MACDSignal:
         self.slow = slow
         self.signal = signal
     
-    def calculate_ema(self, series: pd.Series, period: int) -> pd.Series:
-        """计算指数移动平均"""
-        return series.ewm(span=period, adjust=False).mean()
+    @classmethod
+    def from_config(cls, params: Dict) -> "MACDSignal":
+        """由 settings.yaml 的 signals.indicators.macd 创建"""
+        return cls(fast=params.get("fast", 12), slow=params.get("slow", 26), signal=params.get("signal", 9))
     
-    def calculate_macd(self, series: pd.Series) -> Dict[str, pd.Series]:
-        """计算MACD指标"""
-        ema_fast = self.calculate_ema(series, self.fast)
-        ema_slow = self.calculate_ema(series, self.slow)
-        macd_line = ema_fast - ema_slow
-        signal_line = self.calculate_ema(macd_line, self.signal)
-        histogram = macd_line - signal_line
-        
-        return {
-            "macd": macd_line,
-            "signal": signal_line,
-            "histogram": histogram
-        }
+    def indicators(self) -> Dict[str, Dict]:
+        """依赖的指标（app/indicator_plan.py 的 INDICATORS）"""
+        return {"macd": {"fast": self.fast, "slow": self.slow, "signal": self.signal}}
+    
+    def columns(self) -> List[str]:
+        """批量分析读取的指标列"""
+        return ["MACD", "MACD_signal", "MACD_hist"]
     
-    def detect_signal(self, df: pd.DataFrame) -> Dict:
+    def min_bars(self) -> int:
+        """给出信号所需的最少K线数量（不足时 detect_signal 返回无信号）"""
+        return self.slow
+    
+    def warmup_bars(self) -> int:
+        """检测所需的最少K线数量（慢线与信号线串联的 2 倍周期，多 1 根用于判断交叉）"""
+        return 2 * (self.slow + self.signal) + 1
+    
+    def detect_signal(self, df: pd.DataFrame, features: Optional[FeatureCache] = None) -> Dict:
         """
         检测MACD信号
         
+        Args:
+            df: 包含价格数据的DataFrame
+            features: 同一份数据的特征缓存（与其他检测器共用，为空时单独计算）
+        
         Returns:
             信号字典
         """
@@ -46,8 +57,9 @@ class MACDSignal:
                 "details": {}
             }
         
-        close = df["close"]
-        macd_data = self.calculate_macd(close)
+        features = features or FeatureCache(df)
+        close = features.series("close")
+        macd_data = features.macd(self.fast, self.slow, self.signal)
         
         macd = macd_data["macd"]
         signal_line = macd_data["signal"]
@@ -58,66 +70,96 @@ class MACDSignal:
         latest_signal = signal_line.iloc[-1]
         latest_hist = histogram.iloc[-1]
         prev_hist = histogram.iloc[-2] if len(histogram) > 1 else latest_hist
+        hist_max = abs(histogram).max() if len(histogram) > 0 else 1
         
-        # 判断交叉
-        cross_up = (latest_hist > 0) and (prev_hist <= 0)
-        cross_down = (latest_hist < 0) and (prev_hist >= 0)
+        signal, strength = self.evaluate(latest_macd, latest_signal, latest_hist, prev_hist, hist_max)
+        return self.describe(signal, strength, latest_macd, latest_signal, latest_hist, close.iloc[-1])
+    
+    def evaluate(self, macd, signal_line, hist, prev_hist, hist_max) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        根据最新两根K线的MACD柱判断信号（标量或任意形状的数组，逐元素计算）
         
-        # 计算信号强度（基于MACD柱的大小和趋势）
-        hist_abs = abs(latest_hist)
-        hist_max = abs(histogram).max() if len(histogram) > 0 else 1
-        strength = min(1.0, hist_abs / hist_max if hist_max > 0 else 0)
+        Args:
+            macd, signal_line, hist: 最新的MACD线、信号线、柱状图
+            prev_hist: 上一根的柱状图
+            hist_max: 窗口内柱状图绝对值的最大值（归一化强度）
+            
+        Returns:
+            (signal, strength)
+        """
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # 判断交叉
+            cross_up = (hist > 0) & (prev_hist <= 0)
+            cross_down = (hist < 0) & (prev_hist >= 0)
+            
+            # 计算信号强度（基于MACD柱的大小和趋势）
+            ratio = np.where(hist_max > 0, np.abs(hist) / hist_max, 0)
+            strength = np.where(ratio < 1.0, ratio, 1.0)
+            
+            # 增强强度计算（考虑MACD和信号线的位置）
+            macd_strength = np.abs(macd - signal_line) / np.abs(macd)
+            strength = np.where(np.abs(macd) > 0, (strength + macd_strength) / 2, strength)
         
-        # 增强强度计算（考虑MACD和信号线的位置）
-        if abs(latest_macd) > 0:
-            macd_strength = abs(latest_macd - latest_signal) / abs(latest_macd)
-            strength = (strength + macd_strength) / 2
+        signal = np.where(cross_up, 1, np.where(cross_down, -1, 0))
+        return signal, np.where(signal != 0, strength, strength * 0.5)
+    
+    def detect_series(self, df: pd.DataFrame, features: Optional[FeatureCache] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        逐根K线的信号（第 t 根与 detect_signal(df.iloc[:t+1]) 相同，K线不足 min_bars 的部分由调用方置为无信号）
         
-        if cross_up:
-            return {
-                "signal": 1,
-                "strength": strength,
-                "type": "买入",
-                "details": {
-                    "macd": float(latest_macd),
-                    "signal": float(latest_signal),
-                    "histogram": float(latest_hist),
-                    "cross_type": "柱状图上穿",
-                    "price": float(close.iloc[-1])
-                }
-            }
-        elif cross_down:
-            return {
-                "signal": -1,
-                "strength": strength,
-                "type": "卖出",
-                "details": {
-                    "macd": float(latest_macd),
-                    "signal": float(latest_signal),
-                    "histogram": float(latest_hist),
-                    "cross_type": "柱状图下穿",
-                    "price": float(close.iloc[-1])
-                }
-            }
+        归一化强度用的柱状图最大值取到第 t 根为止的累计最大值。
+        
+        Returns:
+            (signal, strength) 数组，长度与 df 相同
+        """
+        features = features or FeatureCache(df)
+        macd_data = features.macd(self.fast, self.slow, self.signal)
+        hist = macd_data["histogram"].to_numpy()
+        hist_max = np.fmax.accumulate(np.abs(hist))
+        return self.evaluate(macd_data["macd"].to_numpy(), macd_data["signal"].to_numpy(), hist, previous(hist),
+                             hist_max)
+    
+    def evaluate_batch(self, values: Dict[str, np.ndarray], close: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        多个交易对最新一根K线的信号
+        
+        Args:
+            values: 指标矩阵（含 columns() 中的列），形状 (交易对, 时间)
+            close: 收盘价矩阵
+        """
+        hist, prev_hist = last_two(values["MACD_hist"])
+        hist_max = np.fmax.reduce(np.abs(values["MACD_hist"]), axis=-1)
+        return self.evaluate(values["MACD"][..., -1], values["MACD_signal"][..., -1], hist, prev_hist, hist_max)
+    
+    def describe_batch(self, values: Dict[str, np.ndarray], row: int, signal, strength,
+                       close: np.ndarray) -> Dict:
+        """批量结果中第 row 个交易对的信号字典"""
+        macd, signal_line, hist = (values[name][row, -1] for name in self.columns())
+        return self.describe(signal, strength, macd, signal_line, hist, close[row, -1])
+    
+    def describe(self, signal, strength, macd: float, signal_line: float, hist: float,
+                 price: float) -> Dict:
+        """由 evaluate 的结果生成信号字典"""
+        details = {
+            "macd": float(macd),
+            "signal": float(signal_line),
+            "histogram": float(hist)
+        }
+        if signal == 1:
+            signal_type = "买入"
+            details["cross_type"] = "柱状图上穿"
+        elif signal == -1:
+            signal_type = "卖出"
+            details["cross_type"] = "柱状图下穿"
         else:
             # 无交叉，判断趋势
-            if latest_hist > 0:
-                trend = "多头"
-                trend_signal = 1
-            else:
-                trend = "空头"
-                trend_signal = -1
-            
-            return {
-                "signal": 0,
-                "strength": strength * 0.5,
-                "type": f"趋势{trend}",
-                "details": {
-                    "macd": float(latest_macd),
-                    "signal": float(latest_signal),
-                    "histogram": float(latest_hist),
-                    "trend": trend,
-                    "price": float(close.iloc[-1])
-                }
-            }
-
+            trend = "多头" if hist > 0 else "空头"
+            signal_type = f"趋势{trend}"
+            details["trend"] = trend
+        details["price"] = float(price)
+        return {
+            "signal": int(signal),
+            "strength": float(strength),
+            "type": signal_type,
+            "details": details
+        }
@@ -0,0 +1,49 @@
+"""
+检测器登记表 - settings.yaml 的 signals.detectors 按名称在这里查找检测器类
+
+检测器由 signals.indicators 中的同名参数块构造（from_config），并声明：
+- indicators(): 依赖的指标及参数，SignalManager 把所有检测器的声明编译成一份执行计划
+  （app/indicator_plan.py），共用的中间序列只算一次
+- columns(): 从计划中读取的列
+- min_bars() / evaluate_batch() / describe_batch(): 批量分析时的判断与信号字典
+- detect_series(): 逐根K线的信号（SignalManager.analyze_series）
+
+新增检测器：实现以上方法后用 register_detector 登记，再加入 settings.yaml 的 signals.detectors。
+"""
+from typing import Dict, Sequence
+
+from signals.ema_signal import EMASignal
+from signals.macd_signal import MACDSignal
+from signals.kdj_signal import KDJSignal
+
+
+DETECTORS: Dict[str, type] = {
+    "ema": EMASignal,
+    "macd": MACDSignal,
+    "kdj": KDJSignal,
+}
+
+# signals.detectors 未配置时启用的检测器
+DEFAULT_DETECTORS = ("ema", "macd", "kdj")
+
+
+def register_detector(name: str, detector: type):
+    """登记新检测器"""
+    DETECTORS[name] = detector
+
+
+def create_detectors(names: Sequence[str], indicator_config: Dict[str, dict]) -> Dict[str, object]:
+    """
+    按名称创建检测器
+
+    Args:
+        names: 启用的检测器（settings.yaml 的 signals.detectors）
+        indicator_config: settings.yaml 的 signals.indicators
+
+    Returns:
+        {名称: 检测器}，顺序与 names 相同
+    """
+    unknown = [name for name in names if name not in DETECTORS]
+    if unknown:
+        raise ValueError(f"未知的检测器: {', '.join(unknown)}（可选 {', '.join(DETECTORS)}）")
+    return {name: DETECTORS[name].from_config(indicator_config.get(name) or {}) for name in names}
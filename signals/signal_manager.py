@@ -1,13 +1,22 @@
 """
 信号管理器 - 综合多个指标生成最终信号
 """
+import numpy as np
 import pandas as pd
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 
-from signals.ema_signal import EMASignal
-from signals.macd_signal import MACDSignal
-from signals.kdj_signal import KDJSignal
+from app.batch_indicators import group_by_length, stack_frames
+from app.feature_cache import FeatureCache
+from app.indicator_plan import IndicatorPlan, compile_plan
+from signals.registry import DEFAULT_DETECTORS, create_detectors
+
+
+# 批量结果中 level / type 的编码（level 的顺序与 should_notify 的级别顺序一致）
+LEVELS = ("none", "weak", "medium", "strong")
+SIGNAL_TYPES = ("无", "买入", "卖出", "买入（弱）", "卖出（弱）")
+# combine 的返回值在 analyze_batch 结果中的键
+COMBINED_KEYS = ("signal", "strength", "level", "type", "buy_count", "sell_count")
 
 
 class SignalManager:
@@ -15,33 +24,36 @@ class SignalManager:
     
     def __init__(self, config: dict):
         self.config = config
-        indicator_config = config.get("signals", {}).get("indicators", {})
+        signal_config = config.get("signals", {})
+        indicator_config = signal_config.get("indicators") or {}
         
-        # 初始化各个信号检测器
-        ema_config = indicator_config.get("ema", {})
-        self.ema_signal = EMASignal(
-            fast_period=ema_config.get("fast", 12),
-            slow_period=ema_config.get("slow", 26)
-        )
+        # 按 signals.detectors 创建信号检测器（见 signals/registry.py）
+        self.detectors = create_detectors(signal_config.get("detectors") or DEFAULT_DETECTORS, indicator_config)
+        self.ema_signal = self.detectors.get("ema")
+        self.macd_signal = self.detectors.get("macd")
+        self.kdj_signal = self.detectors.get("kdj")
         
-        macd_config = indicator_config.get("macd", {})
-        self.macd_signal = MACDSignal(
-            fast=macd_config.get("fast", 12),
-            slow=macd_config.get("slow", 26),
-            signal=macd_config.get("signal", 9)
-        )
+        # 声明的指标与检测器依赖的指标编译成一份执行计划（批量分析时共用的中间序列只算一次）
+        declarations = dict(indicator_config)
+        for detector in self.detectors.values():
+            declarations.update(detector.indicators())
+        self.plan: IndicatorPlan = compile_plan(declarations)
         
-        kdj_config = indicator_config.get("kdj", {})
-        self.kdj_signal = KDJSignal(
-            period=kdj_config.get("period", 9),
-            k_period=kdj_config.get("k_period", 3),
-            d_period=kdj_config.get("d_period", 3)
-        )
+        # 指标实现（pandas / numpy）
+        self.backend = signal_config.get("backend", "pandas")
         
         # 信号强度阈值
-        signal_config = config.get("signals", {})
         self.strong_threshold = signal_config.get("strong_threshold", 0.8)
         self.medium_threshold = signal_config.get("medium_threshold", 0.6)
+        
+        # 特征缓存命中统计（累计）；last_features 为最近一次分析使用的缓存
+        self.feature_hits = 0
+        self.feature_misses = 0
+        self.last_features: Optional[FeatureCache] = None
+    
+    def warmup_bars(self) -> int:
+        """所有检测器所需K线数量的最大值（每次检测只需获取这么多K线）"""
+        return max(detector.warmup_bars() for detector in self.detectors.values())
     
     def analyze(self, df: pd.DataFrame) -> Dict:
         """
@@ -60,7 +72,7 @@ class SignalManager:
                     "ema": {...},
                     "macd": {...},
                     "kdj": {...}
-                },
+                },  # 各检测器的信号字典（键为 signals.detectors 中的名称）
                 "timestamp": datetime,
                 "price": float
             }
@@ -68,67 +80,214 @@ class SignalManager:
         if df is None or df.empty:
             return self._empty_signal()
         
-        # 获取各个指标的信号
-        ema_result = self.ema_signal.detect_signal(df)
-        macd_result = self.macd_signal.detect_signal(df)
-        kdj_result = self.kdj_signal.detect_signal(df)
+        # 获取各个指标的信号（共用一份特征缓存，相同的 EMA 等序列只计算一次）
+        features = FeatureCache(df, self.backend)
+        results = {name: detector.detect_signal(df, features) for name, detector in self.detectors.items()}
+        self.feature_hits += features.hits
+        self.feature_misses += features.misses
+        self.last_features = features
         
-        # 综合判断
-        signals = [ema_result, macd_result, kdj_result]
+        return self._result(df, results)
+    
+    def _result(self, df: pd.DataFrame, results: Dict[str, Dict], combined: Optional[Tuple] = None) -> Dict:
+        """
+        综合各检测器的结果生成最终信号字典
+        
+        Args:
+            results: {检测器名称: 信号字典}
+            combined: 已由 combine 批量算好的结果（按 COMBINED_KEYS 的顺序），为空时现算
+        """
+        signals = list(results.values())
+        final_signal, avg_strength, level, kind, buy_count, sell_count = combined or self.combine(
+            np.array([s["signal"] for s in signals]),
+            np.array([s["strength"] for s in signals])
+        )
+        
+        return {
+            "signal": int(final_signal),
+            "strength": float(avg_strength),
+            "level": LEVELS[level],
+            "type": SIGNAL_TYPES[kind],
+            "indicators": results,
+            "timestamp": datetime.now(),
+            "price": float(df["close"].iloc[-1]),
+            "consensus": {
+                "buy_count": int(buy_count),
+                "sell_count": int(sell_count),
+                "total_indicators": len(signals)
+            }
+        }
+    
+    def combine(self, signals: np.ndarray, strengths: np.ndarray) -> Tuple[np.ndarray, ...]:
+        """
+        综合判断（逐元素，第一维为各检测器）
         
+        Args:
+            signals: 各检测器的信号 1/-1/0，形状 (检测器数, ...)
+            strengths: 各检测器的强度，形状同 signals
+            
+        Returns:
+            (最终信号, 平均强度, level 编码, type 编码, 买入数, 卖出数)，
+            编码对应 LEVELS / SIGNAL_TYPES
+        """
         # 统计买入和卖出信号数量
-        buy_count = sum(1 for s in signals if s["signal"] == 1)
-        sell_count = sum(1 for s in signals if s["signal"] == -1)
+        buy_count = (signals == 1).sum(axis=0)
+        sell_count = (signals == -1).sum(axis=0)
         
         # 计算平均强度
-        avg_strength = sum(s["strength"] for s in signals) / len(signals) if signals else 0
-        
-        # 判断最终信号
-        if buy_count >= 2:  # 至少2个指标看多
-            final_signal = 1
-            signal_type = "买入"
-        elif sell_count >= 2:  # 至少2个指标看空
-            final_signal = -1
-            signal_type = "卖出"
-        elif buy_count == 1 and sell_count == 0:
-            final_signal = 1
-            signal_type = "买入（弱）"
-        elif sell_count == 1 and buy_count == 0:
-            final_signal = -1
-            signal_type = "卖出（弱）"
-        else:
-            final_signal = 0
-            signal_type = "无"
+        total = strengths[0]
+        for strength in strengths[1:]:
+            total = total + strength
+        avg_strength = total / len(strengths)
+        
+        # 判断最终信号：至少2个指标同向为确认信号，只有1个且无反向为弱信号
+        kind = np.select(
+            [buy_count >= 2, sell_count >= 2,
+             (buy_count == 1) & (sell_count == 0), (sell_count == 1) & (buy_count == 0)],
+            [1, 2, 3, 4],
+            0
+        )
+        final_signal = np.select([(kind == 1) | (kind == 3), (kind == 2) | (kind == 4)], [1, -1], 0)
         
         # 确定信号级别
-        if final_signal != 0:
-            if avg_strength >= self.strong_threshold:
-                level = "strong"
-            elif avg_strength >= self.medium_threshold:
-                level = "medium"
-            else:
-                level = "weak"
-        else:
-            level = "none"
+        level = np.select(
+            [final_signal == 0, avg_strength >= self.strong_threshold, avg_strength >= self.medium_threshold],
+            [0, 3, 2],
+            1
+        )
+        return final_signal, avg_strength, level, kind, buy_count, sell_count
+    
+    def analyze_series(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        逐根K线的综合信号（第 t 行与 analyze(df.iloc[:t+1]) 的结果相同），用于回测和图表
         
-        return {
+        各检测器对整段K线一次向量化计算（detect_series），不必逐根重跑 analyze。
+        回测：Backtester(df.join(result))；图表：ChartVisualizer 读取 signal 列标记买卖点。
+        
+        Args:
+            df: 包含OHLCV数据的DataFrame
+            
+        Returns:
+            与 df 同索引的 DataFrame：signal、strength、level（Categorical，见 LEVELS）、
+            type（Categorical，见 SIGNAL_TYPES）、buy_count、sell_count，
+            以及各检测器的 {名称}_signal / {名称}_strength
+        """
+        if df is None or df.empty:
+            return pd.DataFrame(columns=list(COMBINED_KEYS))
+        
+        features = FeatureCache(df, self.backend)
+        bars = np.arange(1, len(df) + 1)  # 第 t 根时的K线数量
+        detected = {}
+        for name, detector in self.detectors.items():
+            signal, strength = detector.detect_series(df, features)
+            # K线不足时与 detect_signal 相同，返回无信号
+            enough = bars >= detector.min_bars()
+            detected[f"{name}_signal"] = np.where(enough, signal, 0)
+            detected[f"{name}_strength"] = np.where(enough, strength, 0.0)
+        self.feature_hits += features.hits
+        self.feature_misses += features.misses
+        self.last_features = features
+        
+        final_signal, avg_strength, level, kind, buy_count, sell_count = self.combine(
+            np.stack([detected[f"{name}_signal"] for name in self.detectors]),
+            np.stack([detected[f"{name}_strength"] for name in self.detectors])
+        )
+        return pd.DataFrame({
             "signal": final_signal,
             "strength": avg_strength,
-            "level": level,
-            "type": signal_type,
-            "indicators": {
-                "ema": ema_result,
-                "macd": macd_result,
-                "kdj": kdj_result
-            },
-            "timestamp": datetime.now(),
-            "price": float(df["close"].iloc[-1]),
-            "consensus": {
-                "buy_count": buy_count,
-                "sell_count": sell_count,
-                "total_indicators": len(signals)
+            "level": pd.Categorical.from_codes(level, LEVELS),
+            "type": pd.Categorical.from_codes(kind, SIGNAL_TYPES),
+            "buy_count": buy_count,
+            "sell_count": sell_count,
+            **detected
+        }, index=df.index)
+    
+    def batch_columns(self) -> List[str]:
+        """analyze_batch 需要的指标列（各检测器 columns() 的并集）"""
+        columns = {}
+        for detector in self.detectors.values():
+            columns.update(dict.fromkeys(detector.columns()))
+        return list(columns)
+    
+    def analyze_batch(self, close: np.ndarray, high: np.ndarray, low: np.ndarray) -> Dict:
+        """
+        批量分析多个交易对的最新信号（与逐个调用 analyze 的结果一致）
+        
+        Args:
+            close, high, low: (交易对, 时间) 矩阵，每行一个交易对，K线数量相同
+            
+        Returns:
+            {
+                "signal": 最终信号数组, "strength": 平均强度数组,
+                "level": level 编码数组, "type": type 编码数组（见 LEVELS / SIGNAL_TYPES）,
+                "buy_count": 数组, "sell_count": 数组,
+                "indicators": {"ema": {"signal", "strength"}, "macd": {...}, "kdj": {...}},
+                "values": 检测器用到的指标矩阵（见 batch_columns）
             }
-        }
+        """
+        close = np.atleast_2d(np.asarray(close, dtype=np.float64))
+        high = np.atleast_2d(np.asarray(high, dtype=np.float64))
+        low = np.atleast_2d(np.asarray(low, dtype=np.float64))
+        bars = close.shape[-1]
+        # 执行计划中只运行检测器用到的步骤（均线、RSI、布林带不参与信号判断）
+        values = self.plan.run({"close": close, "high": high, "low": low}, self.batch_columns())
+        
+        results = {}
+        for name, detector in self.detectors.items():
+            if bars < detector.min_bars():
+                # K线不足时与 detect_signal 相同，返回无信号
+                results[name] = {"signal": np.zeros(len(close), dtype=int), "strength": np.zeros(len(close))}
+                continue
+            signal, strength = detector.evaluate_batch(values, close)
+            results[name] = {"signal": signal, "strength": strength}
+        
+        combined = self.combine(
+            np.stack([results[name]["signal"] for name in results]),
+            np.stack([results[name]["strength"] for name in results])
+        )
+        batch = dict(zip(COMBINED_KEYS, combined))
+        batch.update({"indicators": results, "values": values})
+        return batch
+    
+    def analyze_frames(self, frames: Dict[str, pd.DataFrame]) -> Dict[str, Dict]:
+        """
+        批量分析多个交易对，返回与 analyze 格式相同的结果
+        
+        K线数量相同的交易对堆叠成一个矩阵，每组只做一次向量化计算。
+        
+        Args:
+            frames: {交易对: K线数据}
+            
+        Returns:
+            {交易对: analyze 格式的信号字典}
+        """
+        order = list(frames)
+        results = {symbol: self._empty_signal() for symbol, df in frames.items() if df is None or df.empty}
+        frames = {symbol: df for symbol, df in frames.items() if symbol not in results}
+        
+        for symbols in group_by_length(frames):
+            arrays = stack_frames([frames[symbol] for symbol in symbols])
+            batch = self.analyze_batch(arrays["close"], arrays["high"], arrays["low"])
+            bars = arrays["close"].shape[-1]
+            
+            for row, symbol in enumerate(symbols):
+                detected = {}
+                for name, detector in self.detectors.items():
+                    if bars < detector.min_bars():
+                        detected[name] = {"signal": 0, "strength": 0.0, "type": "无", "details": {}}
+                        continue
+                    result = batch["indicators"][name]
+                    detected[name] = detector.describe_batch(
+                        batch["values"], row, result["signal"][row], result["strength"][row], arrays["close"]
+                    )
+                results[symbol] = self._result(
+                    frames[symbol], detected, combined=tuple(batch[key][row] for key in COMBINED_KEYS)
+                )
+        return {symbol: results[symbol] for symbol in order}
+    
+    def feature_stats(self) -> Dict[str, int]:
+        """特征缓存累计命中统计"""
+        return {"hits": self.feature_hits, "misses": self.feature_misses}
     
     def _empty_signal(self) -> Dict:
         """返回空信号"""
@@ -2,6 +2,8 @@
 """
 系统测试脚本
 """
+from unittest import mock
+
 from main_v2 import QuantSignalSystem
 from signals.signal_manager import SignalManager
 from notifier.serverchan_push import ServerChanNotifier
@@ -90,8 +92,10 @@ def test_full_system():
     print("🧪 测试完整系统（信号检测）")
     print("="*60)
     
-    system = QuantSignalSystem()
-    results = system.run_signal_check()
+    # 与程序启动时相同：共享 HTTP 客户端按配置新建（同一进程中之前的测试已创建过默认实例）
+    with mock.patch("app.http_client._default_client", None), mock.patch("app.http_client._default_config", None):
+        system = QuantSignalSystem()
+        results = system.run_signal_check()
     
     print(f"\n✅ 检测完成，共处理 {len(results)} 个交易对")
     for symbol, result in results.items():
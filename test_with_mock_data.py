@@ -1,47 +1,46 @@
 """
 使用模拟数据测试程序功能
 """
+import asyncio
+import json
+import tempfile
+import threading
+import time
+import types
+import warnings
+from unittest import mock
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
-from app.indicators import IndicatorCalculator
+import requests
+from app.async_fetcher import AsyncFetchEngine
+from app.backfill import BackfillCheckpoint
+from app.circuit_breaker import CircuitBreaker, CircuitOpenError
+from app.data_quality import check_ohlcv
+from app.feature_cache import FeatureCache
+from app.fetch_cache import CandleCache
+from app.fetch_data import OKXDataFetcher
+from app.hedging import HedgedRequester
+from app.http_client import HttpClient, get_http_client
+from app.indicator_plan import compile_plan, register_indicator
+from app import kernels
+from app.kline_store import KlineStore
+from app.rate_limit import TokenBucket, get_rate_limiter
+from app.mock_okx import MockOKXHTTPServer, MockOKXWebSocketServer
+from app.okx_stream import OKXCandleStream
+from app.resample import bars_needed, bucket_starts, next_bar_close, resample_ohlcv
+from app.param_grid import cross_signals, kdj_grid, macd_grid, sweep_ema_cross
+from app.streaming import RollingStats, StreamingIndicators
+from app.synthetic import generate_ohlcv
+from app.indicators import IndicatorCalculator, IndicatorFrame
+from signals.kdj_signal import KDJSignal
+from signals.signal_manager import SignalManager
 from backtest import Backtester
 from visualize import ChartVisualizer
 
 
 def generate_mock_data(days=500, start_price=10.0):
     """生成模拟K线数据"""
-    dates = pd.date_range(end=datetime.now(), periods=days, freq='D')
-    
-    # 生成价格走势（带趋势和波动）
-    np.random.seed(42)
-    returns = np.random.normal(0.001, 0.02, days)  # 日收益率
-    prices = [start_price]
-    
-    for ret in returns[1:]:
-        prices.append(prices[-1] * (1 + ret))
-    
-    # 生成OHLCV数据
-    data = []
-    for i, (date, close) in enumerate(zip(dates, prices)):
-        volatility = abs(np.random.normal(0, 0.01))
-        high = close * (1 + volatility)
-        low = close * (1 - volatility)
-        open_price = prices[i-1] if i > 0 else close
-        volume = np.random.uniform(1000000, 5000000)
-        
-        data.append({
-            'timestamp': date,
-            'open': open_price,
-            'high': high,
-            'low': low,
-            'close': close,
-            'volume': volume
-        })
-    
-    df = pd.DataFrame(data)
-    df.set_index('timestamp', inplace=True)
-    return df
+    return generate_ohlcv(days, "1d", start_price, drift=0.001, volatility=0.02, seed=42)
 
 
 def test_indicators():
@@ -119,6 +118,896 @@ def test_visualize(df):
     return chart_path
 
 
+def test_stream_mode():
+    """测试实时模式（本地 WebSocket 替身服务，离线运行）"""
+    print("\n" + "="*60)
+    print("🧪 测试实时K线推送模式")
+    print("="*60)
+    
+    history = generate_mock_data(days=100, start_price=15.0)
+    closed_bars = []
+    engine = StreamingIndicators()
+    engine.seed(history.iloc[:-3])
+    
+    async def on_bar_close(symbol, interval, df):
+        closed_bars.append((symbol, interval, df))
+    
+    async def run():
+        async with MockOKXWebSocketServer() as server:
+            stream = OKXCandleStream(["AR/USDT"], ["1d"], on_bar_close, url=server.url, max_bars=100,
+                                     on_bar_update=lambda symbol, interval, event: engine.on_bar(event))
+            stream.buffers[("AR-USDT", "1D")].seed(history.iloc[:-3])
+            task = asyncio.create_task(stream.run())
+            await server.wait_for_subscribers(1)
+            # 错误事件和无法解析的消息只记录，不中断订阅
+            await server.broadcast(json.dumps({"event": "error", "code": "60018", "msg": "Invalid instId"}))
+            await server.broadcast("{not json")
+            
+            tail = history.iloc[-3:]
+            timestamps = tail.index.values.astype("datetime64[ms]").astype(np.int64)
+            rows = [
+                [str(ts), *(str(v) for v in bar), "0", "0", "1"]
+                for ts, bar in zip(timestamps, tail.to_numpy())
+            ]
+            await server.replay("candle1D", "AR-USDT", rows, updates_per_bar=2)
+            for _ in range(100):
+                if len(closed_bars) == 3:
+                    break
+                await asyncio.sleep(0.01)
+            stream.stop()
+            await task
+    
+    asyncio.run(run())
+    
+    assert len(closed_bars) == 3, f"收盘回调次数错误: {len(closed_bars)}"
+    latest = closed_bars[-1][2]
+    assert len(latest) == 100
+    assert np.allclose(latest.to_numpy(), history[["open", "high", "low", "close", "volume"]].to_numpy())
+    # 增量指标由推送事件更新（含未收盘K线的原地更新），与整段重算一致
+    batch = IndicatorCalculator().calculate_indicators(history).iloc[-1]
+    assert all(np.isclose(engine.values[name], batch[name]) for name in ("MA60", "MACD_hist", "RSI", "BB_lower"))
+    print(f"✅ 收到 {len(closed_bars)} 次K线收盘回调，缓冲区与历史数据一致")
+
+
+def test_http_stand_in():
+    """测试 REST 替身服务（分页获取与直接请求的结果一致）"""
+    print("\n" + "="*60)
+    print("🧪 测试 OKX REST 替身服务")
+    print("="*60)
+    
+    with MockOKXHTTPServer() as server:
+        fetcher = OKXDataFetcher(config={
+            "exchange": {"api_base": server.api_base},
+            "data": {"store": {"enable": False}, "cache": False}
+        })
+        recent = fetcher.fetch_klines("AR/USDT", "4h", 100)
+        paged = fetcher.fetch_klines("AR/USDT", "4h", 350)
+        requests_made = server.stats["requests"]
+    
+    assert len(recent) == 100 and len(paged) == 350
+    assert paged.index.is_monotonic_increasing and paged.index.is_unique
+    assert np.array_equal(paged.tail(100).to_numpy(), recent.to_numpy())
+    print(f"✅ 替身服务返回 {len(paged)} 根K线，共 {requests_made} 次请求，分页结果一致")
+
+
+def test_data_quality():
+    """测试数据质量检查（重复、乱序、高低价异常、尖刺、缺口）"""
+    print("\n" + "="*60)
+    print("🧪 测试数据质量检查")
+    print("="*60)
+    
+    df = generate_mock_data(days=300)
+    bar_ms = 86_400_000
+    clean, report = check_ohlcv(df, bar_ms)
+    assert report.clean and clean is df
+    
+    dirty = df.copy()
+    dirty.iloc[100, 3] *= 1.8                          # 单根尖刺
+    dirty.iloc[150, 1] = dirty.iloc[150, 2] * 0.95     # high < low
+    dirty.iloc[180, 4] = 0                             # 零成交量
+    dirty = pd.concat([dirty.iloc[:250], dirty.iloc[[249]], dirty.iloc[255:]])  # 重复 + 缺口
+    dirty = dirty.iloc[::-1]                           # 乱序
+    
+    fixed, report = check_ohlcv(dirty, bar_ms)
+    assert report.unsorted and report.duplicates == 1
+    assert report.spikes == 1 and report.high_low_fixed >= 1 and report.zero_volume == 1
+    assert report.gaps == 1 and report.missing_bars == 5
+    assert fixed.index.is_monotonic_increasing and fixed.index.is_unique
+    assert (fixed["high"] >= fixed[["open", "close", "low"]].max(axis=1)).all()
+    assert (fixed["low"] <= fixed[["open", "close"]].min(axis=1)).all()
+    assert abs(fixed["close"].iloc[100] / df["close"].iloc[100] - 1) < 0.05
+    assert fixed.attrs["quality"]["spikes"] == 1
+    print(f"✅ {report}")
+
+
+def test_streaming_indicators():
+    """测试增量指标与批量计算一致（含未收盘K线更新和状态快照恢复）"""
+    print("\n" + "="*60)
+    print("🧪 测试增量指标")
+    print("="*60)
+    
+    df = generate_mock_data(days=500)
+    batch = IndicatorCalculator().calculate_indicators(df)
+    kdj = KDJSignal().calculate_kdj(df)
+    batch["K"], batch["D"], batch["J"] = kdj["k"], kdj["d"], kdj["j"]
+    batch["EMA12"] = df["close"].ewm(span=12, adjust=False).mean()
+    batch["EMA26"] = df["close"].ewm(span=26, adjust=False).mean()
+    
+    engine = StreamingIndicators()
+    rows = []
+    for i, (high, low, close) in enumerate(df[["high", "low", "close"]].to_numpy()):
+        if i == 250:
+            # 中途导出状态，换一个新实例恢复后继续
+            state = engine.snapshot()
+            engine = StreamingIndicators()
+            engine.restore(state)
+        engine.update(high * 1.01, low, close * 1.01, confirmed=False, ts=i)  # 未收盘K线
+        rows.append(engine.update(high, low, close, confirmed=True, ts=i))
+    streamed = pd.DataFrame(rows, index=df.index)
+    
+    for column in streamed.columns:
+        assert np.allclose(streamed[column], batch[column], rtol=1e-9, atol=1e-9, equal_nan=True), column
+    print(f"✅ {len(streamed.columns)} 个指标逐根与批量计算一致（共 {len(df)} 根K线）")
+
+
+def test_feature_cache():
+    """测试特征缓存（各检测器共用的 EMA 等序列每次分析只计算一次）"""
+    print("\n" + "="*60)
+    print("🧪 测试特征缓存")
+    print("="*60)
+    
+    df = generate_mock_data(days=200)
+    manager = SignalManager({})
+    result = manager.analyze(df)
+    features = manager.last_features
+    
+    # EMA12/EMA26 由 EMASignal 计算，MACDSignal 直接复用
+    assert features.hits > 0 and features.misses == features.stats()["features"]
+    ema_fast = features.ema("close", 12)
+    assert np.allclose(ema_fast, df["close"].ewm(span=12, adjust=False).mean())
+    assert result["indicators"]["macd"]["details"]["macd"] == float(
+        (ema_fast - features.ema("close", 26)).iloc[-1]
+    )
+    print(f"✅ 特征缓存: {features.stats()}")
+
+
+def test_numpy_backend():
+    """测试 NumPy 指标内核与 pandas 实现一致"""
+    print("\n" + "="*60)
+    print("🧪 测试 NumPy 指标内核")
+    print("="*60)
+    
+    df = generate_mock_data(days=500)
+    expected = IndicatorCalculator("pandas").calculate_indicators(df)
+    actual = IndicatorCalculator("numpy").calculate_indicators(df)
+    for column in expected.columns:
+        assert np.allclose(actual[column], expected[column], rtol=1e-9, atol=1e-9, equal_nan=True), column
+    
+    for end in range(80, len(df), 10):
+        window = df.iloc[:end]
+        expected = SignalManager({}).analyze(window)
+        actual = SignalManager({"signals": {"backend": "numpy"}}).analyze(window)
+        assert (actual["signal"], actual["level"]) == (expected["signal"], expected["level"])
+        assert abs(actual["strength"] - expected["strength"]) < 1e-9
+    print("✅ 指标与信号分析结果与 pandas 实现一致")
+
+
+def test_batch_analysis():
+    """测试多交易对批量分析与逐个分析一致"""
+    print("\n" + "="*60)
+    print("🧪 测试多交易对批量分析")
+    print("="*60)
+    
+    manager = SignalManager({"signals": {"backend": "numpy"}})
+    frames = {f"S{i}": generate_mock_data(days=days, start_price=5.0 + i)
+              for i, days in enumerate([20, 120, 120, 200, 200, 200])}
+    # 价格不变的交易对：各指标应精确为常数，不应出现交叉
+    flat = generate_mock_data(days=120)
+    flat[["open", "high", "low", "close"]] = 3.0
+    frames["FLAT"] = flat
+    
+    results = manager.analyze_frames(frames)
+    assert list(results) == list(frames)
+    for symbol, df in frames.items():
+        expected = manager.analyze(df)
+        actual = results[symbol]
+        assert (actual["signal"], actual["level"], actual["type"]) == \
+            (expected["signal"], expected["level"], expected["type"]), symbol
+        assert abs(actual["strength"] - expected["strength"]) < 1e-12, symbol
+        for name, indicator in expected["indicators"].items():
+            assert actual["indicators"][name]["type"] == indicator["type"], (symbol, name)
+    assert results["FLAT"]["signal"] == 0
+    
+    close = np.array([df["close"].to_numpy() for df in frames.values() if len(df) == 200])
+    batch = manager.analyze_batch(close, close * 1.01, close * 0.99)
+    assert batch["signal"].shape == (3,) and batch["values"]["MACD"].shape == close.shape
+    print(f"✅ {len(frames)} 个交易对批量分析结果与逐个分析一致")
+
+
+def test_param_grid():
+    """测试参数网格与逐组计算一致"""
+    print("\n" + "="*60)
+    print("🧪 测试参数网格")
+    print("="*60)
+    
+    df = generate_mock_data(days=500)
+    close, high, low = (df[column].to_numpy() for column in ("close", "high", "low"))
+    features = FeatureCache(df)
+    
+    macd_params = [(12, 26, 9), (5, 35, 5), (8, 21, 5)]
+    grid = macd_grid(close, macd_params)
+    for row, params in enumerate(macd_params):
+        expected = features.macd(*params)
+        for key in ("macd", "signal", "histogram"):
+            assert np.allclose(grid[key][row], expected[key], rtol=1e-9, atol=1e-9), (params, key)
+    
+    kdj_params = [(9, 3, 3), (14, 3, 3), (9, 5, 2)]
+    grid = kdj_grid(close, high, low, kdj_params)
+    for row, params in enumerate(kdj_params):
+        expected = features.kdj(*params)
+        for key in ("k", "d", "j"):
+            assert np.allclose(grid[key][row], expected[key], rtol=1e-9, atol=1e-9), (params, key)
+    
+    # 交叉信号网格与 EMASignal 的判断一致
+    fast, slow = features.ema("close", 12).to_numpy(), features.ema("close", 26).to_numpy()
+    signals = cross_signals(fast, slow)
+    expected, _ = SignalManager({}).ema_signal.evaluate(fast[1:], slow[1:], fast[:-1], slow[:-1], close[1:])
+    assert (signals[1:] == expected).all() and signals[0] == 0
+    
+    result = sweep_ema_cross(close, range(3, 13), range(15, 40, 5))
+    assert len(result) == 10 * 5 and (result["fast"] < result["slow"]).all()
+    best = result.iloc[0]
+    print(f"✅ 参数网格与逐组计算一致；最优 EMA({best['fast']:.0f}, {best['slow']:.0f}) "
+          f"收益 {best['total_return']:.2f}% / {best['trades']:.0f} 笔")
+
+
+def test_lean_pipeline():
+    """测试精简模式（不逐阶段复制）与默认流程结果一致"""
+    print("\n" + "="*60)
+    print("🧪 测试精简模式")
+    print("="*60)
+    
+    df = generate_mock_data(days=500)
+    columns = list(df.columns)
+    default = IndicatorCalculator("numpy")
+    lean = IndicatorCalculator("numpy", lean=True)
+    expected = default.detect_signals(default.calculate_indicators(df))
+    actual = lean.detect_signals(lean.calculate_indicators(df))
+    
+    # 调用方的数据不受影响，辅助列不再保留
+    assert list(df.columns) == columns
+    assert "MA_cross_up" not in actual.columns
+    assert actual["signal"].dtype == np.int8 and isinstance(actual["signal_type"].dtype, pd.CategoricalDtype)
+    assert (actual["signal"].to_numpy() == expected["signal"].to_numpy()).all()
+    assert (actual["signal_type"].astype(str).to_numpy() == expected["signal_type"].to_numpy()).all()
+    assert lean.get_latest_signal(actual) == default.get_latest_signal(expected)
+    assert Backtester(actual, copy=False).run_backtest() == Backtester(expected).run_backtest()
+    print(f"✅ 精简模式结果一致（{int((actual['signal'] != 0).sum())} 个信号）")
+
+
+def test_lazy_indicators():
+    """测试惰性指标列（读取时才计算，结果与一次算完相同）"""
+    print("\n" + "="*60)
+    print("🧪 测试惰性指标列")
+    print("="*60)
+    
+    df = generate_mock_data(days=500)
+    eager = IndicatorCalculator("numpy")
+    lazy = IndicatorCalculator("numpy", lazy=True)
+    features = FeatureCache(df, "numpy")
+    frame = lazy.calculate_indicators(df, features)
+    assert list(frame.columns) == list(df.columns) and "BB_upper" in frame
+    
+    # 信号检测只读取均线、MACD柱和 RSI，布林带没有被计算
+    result = lazy.detect_signals(frame)
+    assert set(result.pending()) == {"MACD", "MACD_signal", "BB_upper", "BB_middle", "BB_lower"}
+    assert ("std", ("close",), (20,)) not in features._features
+    expected = eager.detect_signals(eager.calculate_indicators(df))
+    assert (result["signal"] == expected["signal"]).all()
+    assert lazy.get_latest_signal(result) == eager.get_latest_signal(expected)
+    
+    # 读取时按需计算（筛选后的子集按索引对齐）
+    assert np.allclose(result["BB_upper"], expected["BB_upper"], equal_nan=True)
+    tail = result[result.index >= result.index[-50]]
+    assert np.allclose(tail["BB_lower"], expected["BB_lower"].iloc[-50:])
+    
+    # 每个 DataFrame 各自持有声明：修改一个不影响派生的或新建的 DataFrame
+    tail.lazy["extra"] = lambda: tail["close"]
+    assert "extra" not in result.lazy and IndicatorFrame(df).lazy == {}
+    print(f"✅ 惰性指标列结果一致（信号检测计算了 {features.stats()['misses']} 个特征）")
+
+
+def test_indicator_plan():
+    """测试由配置编译的指标执行计划"""
+    print("\n" + "="*60)
+    print("🧪 测试指标执行计划")
+    print("="*60)
+    
+    df = generate_mock_data(days=500)
+    data = {column: df[column].to_numpy() for column in ("close", "high", "low")}
+    plan = compile_plan({"ma": {"periods": [20, 60]}, "ema": {}, "macd": {}, "bollinger": {}, "kdj": {}})
+    values = plan.run(data)
+    
+    # 共用的中间序列只有一个步骤：EMA12/26 与 MACD 快慢线、MA20 与布林带中轨
+    assert plan.columns["BB_middle"] == plan.columns["MA20"]
+    assert plan.columns["EMA12"] in plan.columns["MACD"][1]
+    features = FeatureCache(df, "numpy")
+    assert np.array_equal(values["MACD_hist"], features.macd()["histogram"], equal_nan=True)
+    assert np.array_equal(values["BB_upper"], features.bbands()["upper"], equal_nan=True)
+    assert np.array_equal(values["J"], features.kdj()["j"])
+
+    # 缺失值只影响包含它的窗口（内核改用 pandas 计算），与 pandas 后端一致
+    gappy = df.copy()
+    gappy.loc[gappy.index[100], "close"] = np.nan
+    values = plan.run({column: gappy[column].to_numpy() for column in ("close", "high", "low")})
+    reference = FeatureCache(gappy, "pandas")
+    assert not np.isnan(values["EMA12"]).any() and not FeatureCache(gappy, "numpy").ema("close", 12).isna().any()
+    assert np.allclose(values["MA20"], reference.sma("close", 20), equal_nan=True)
+    assert np.isnan(values["MA20"]).sum() == 19 + 20
+
+    # 登记的指标在单个交易对的分析（特征缓存、IndicatorCalculator）中按同一份步骤计算
+    register_indicator("ma_spread", lambda plan, fast=5, slow=10: {"MA_spread": plan.step(
+        "difference", [plan.step("sma", ["close"], fast), plan.step("sma", ["close"], slow)])})
+    spread = compile_plan({"ma_spread": {}}).run(data)["MA_spread"]
+    frame = IndicatorCalculator("numpy", indicators={"ma_spread": {}}).calculate_indicators(df)
+    assert np.array_equal(frame["MA_spread"], spread, equal_nan=True)
+    assert np.allclose(FeatureCache(df).indicator("ma_spread")["MA_spread"], spread, equal_nan=True)
+
+    # 预热长度随配置的周期变化（串联的 EMA 延迟相加）
+    assert IndicatorCalculator(indicators={"ma": {"periods": [20, 200]}}).warmup_bars() == 201
+    macd = compile_plan({"macd": {"slow": 52}})
+    assert macd.warmup_bars() == 2 * (52 + 9) + 2 > compile_plan({"macd": {}}).warmup_bars()
+    assert np.isfinite(macd.run(data)["MACD_hist"][macd.warmup_bars() - 2:]).all()
+
+    # 检测器按配置启用，只执行检测器需要的步骤
+    manager = SignalManager({"signals": {"backend": "numpy", "detectors": ["macd", "kdj"],
+                                         "indicators": {"macd": {"fast": 8, "slow": 21}, "rsi": {}}}})
+    assert list(manager.detectors) == ["macd", "kdj"] and manager.macd_signal.fast == 8
+    steps = manager.plan.required(manager.batch_columns())
+    assert not any(step[0] == "rsi" for step in steps)
+    expected = manager.analyze(df)
+    actual = manager.analyze_frames({"S": df})["S"]
+    assert (actual["signal"], actual["level"]) == (expected["signal"], expected["level"])
+    assert abs(actual["strength"] - expected["strength"]) < 1e-12
+    assert list(actual["indicators"]) == ["macd", "kdj"] and actual["consensus"]["total_indicators"] == 2
+    print(f"✅ 执行计划结果一致（{len(plan.columns)} 列共 {len(plan.steps)} 个步骤）")
+
+
+def test_rolling_variance():
+    """测试滚动方差（Welford）在价格长期漂移时的精度"""
+    print("\n" + "="*60)
+    print("🧪 测试滚动方差")
+    print("="*60)
+    
+    # 价格上涨十几个数量级，窗口内波动相对价格很小：Σx² - (Σx)²/n 会相消失去精度
+    close = generate_mock_data(days=20000)["close"].to_numpy()
+    close = close * np.exp(np.linspace(0.0, 11.5, len(close)))
+    windows = np.lib.stride_tricks.sliding_window_view(close, 20)
+    expected = windows.var(axis=-1, ddof=1)
+    
+    mean, var = kernels.rolling_mean_var(close, 20)
+    assert np.isnan(var[:19]).all()
+    assert np.allclose(var[19:], expected, rtol=1e-9, atol=0)
+    assert np.allclose(mean[19:], windows.mean(axis=-1), rtol=1e-12, atol=0)
+    assert np.allclose(kernels.rolling_std(np.stack([close, close[::-1]]), 20)[1, 19:],
+                       np.sqrt(expected[::-1]), rtol=1e-9, atol=0)
+    
+    stats = RollingStats(20)
+    streamed = np.array([stats.update(x)[1] for x in close])
+    assert np.allclose(streamed[19:], expected, rtol=1e-9, atol=0)
+    
+    # peek 不修改状态，导出的状态恢复后结果相同
+    restored = RollingStats(20)
+    restored.restore(stats.snapshot())
+    peeked = stats.peek(close[0])
+    assert stats.snapshot() == restored.snapshot()
+    assert restored.update(close[0]) == peeked
+    assert np.allclose(stats.value, (mean[-1], var[-1]), rtol=1e-9, atol=0)
+    print(f"✅ 滚动方差与两遍法一致（{len(close)} 根K线，价格 {close.min():.3g} ~ {close.max():.3g}）")
+
+
+def test_signal_series():
+    """测试逐根K线的综合信号与逐根调用 analyze 一致"""
+    print("\n" + "="*60)
+    print("🧪 测试逐根K线综合信号")
+    print("="*60)
+    
+    df = generate_mock_data(days=150)
+    for backend in ("pandas", "numpy"):
+        manager = SignalManager({"signals": {"backend": backend}})
+        series = manager.analyze_series(df)
+        assert list(series.index) == list(df.index)
+        for t in range(len(df)):
+            expected = manager.analyze(df.iloc[:t + 1])
+            row = series.iloc[t]
+            assert (row["signal"], row["level"], row["type"]) == \
+                (expected["signal"], expected["level"], expected["type"]), (backend, t)
+            assert row["strength"] == expected["strength"], (backend, t)
+            assert (row["buy_count"], row["sell_count"]) == \
+                (expected["consensus"]["buy_count"], expected["consensus"]["sell_count"]), (backend, t)
+    
+    # 可直接回测
+    result = Backtester(df.join(series)).run_backtest()
+    assert manager.analyze_series(df.iloc[:0]).empty
+    print(f"✅ {len(df)} 根K线逐根结果一致（{int((series['signal'] != 0).sum())} 个信号，"
+          f"回测 {result.get('total_trades', 0)} 笔）")
+
+
+def test_kline_store():
+    """测试本地K线存储（追加、增量追加、整体替换、limit 切片、中断写入后的恢复）"""
+    print("\n" + "="*60)
+    print("🧪 测试本地K线存储")
+    print("="*60)
+    
+    df = generate_mock_data(days=50)
+    ts = df.index.values.astype("datetime64[ms]").astype(np.int64)
+    ohlcv = df[["open", "high", "low", "close", "volume"]].to_numpy()
+    
+    with tempfile.TemporaryDirectory() as root:
+        store = KlineStore(root)
+        assert store.count("AR-USDT", "1D") == 0 and store.last_timestamp("AR-USDT", "1D") is None
+        assert store.frame("AR-USDT", "1D").empty
+        
+        # 增量追加只写入比已存储数据更新的K线（与已有数据重叠的部分跳过）
+        assert store.append("AR-USDT", "1D", ts[:30], ohlcv[:30]) == 30
+        assert store.append("AR-USDT", "1D", ts[20:], ohlcv[20:]) == 20
+        assert store.append("AR-USDT", "1D", ts[:10], ohlcv[:10]) == 0
+        stored = store.frame("AR-USDT", "1D")
+        assert np.array_equal(stored.to_numpy(), ohlcv) and stored.index.equals(df.index.rename("timestamp"))
+        
+        # limit：0 为空表，大于存储数量时返回全部
+        assert store.frame("AR-USDT", "1D", 0).empty
+        assert np.array_equal(store.frame("AR-USDT", "1D", 5).to_numpy(), ohlcv[-5:])
+        assert len(store.frame("AR-USDT", "1D", 500)) == 50
+        
+        # 中断写入：OHLCV 多写了一行半、时间戳少一行，读取以较短的为准，下次追加前先截断对齐
+        ts_path, ohlcv_path = store._paths("AR-USDT", "1D")
+        with open(ohlcv_path, "ab") as f:
+            f.write(ohlcv[-1].tobytes() + b"\0" * 20)
+        with open(ts_path, "r+b") as f:
+            f.truncate(49 * 8)
+        assert store.count("AR-USDT", "1D") == 49 and store.last_timestamp("AR-USDT", "1D") == ts[48]
+        assert store.append("AR-USDT", "1D", ts[45:], ohlcv[45:]) == 1
+        assert ts_path.stat().st_size == 50 * 8 and ohlcv_path.stat().st_size == 50 * 40
+        assert np.array_equal(store.frame("AR-USDT", "1D").to_numpy(), ohlcv)
+        
+        # 整体替换（向更早的历史扩展），不留临时文件
+        store.replace("AR-USDT", "1D", ts[10:20], ohlcv[10:20])
+        assert np.array_equal(store.frame("AR-USDT", "1D").to_numpy(), ohlcv[10:20])
+        assert sorted(path.name for path in ts_path.parent.iterdir()) == ["ohlcv.f8", "ts.i8"]
+    print("✅ 追加/替换/切片/中断恢复结果正确")
+
+
+def test_resample():
+    """测试周期合成的K线边界（与按香港时间对齐的 OKX K线一致）"""
+    print("\n" + "="*60)
+    print("🧪 测试周期合成")
+    print("="*60)
+    
+    def ms(text):
+        return int(pd.Timestamp(text).value // 1_000_000)
+    
+    def starts(text, bar):
+        return int(bucket_starts(np.array([ms(text)], dtype=np.int64), bar)[0])
+    
+    # 日线从 UTC 16:00 开盘；周线从香港时间周一 00:00（UTC 周日 16:00）；月线从香港时间每月 1 日
+    assert starts("2024-01-01 15:59:59.999", "1D") == ms("2023-12-31 16:00")
+    assert starts("2024-01-01 16:00", "1D") == ms("2024-01-01 16:00")
+    assert starts("2024-01-07 16:00", "1W") == ms("2024-01-07 16:00")          # 香港时间周一 00:00
+    assert starts("2024-01-07 15:59", "1W") == ms("2023-12-31 16:00")
+    assert starts("2024-02-29 16:00", "1M") == ms("2024-02-29 16:00")          # 香港时间 3 月 1 日
+    assert starts("2024-02-29 15:59", "1M") == ms("2024-01-31 16:00")
+    assert next_bar_close(ms("2024-12-15"), "1M") == ms("2024-12-31 16:00")
+    assert next_bar_close(ms("2024-01-03"), "1W") == ms("2024-01-07 16:00")
+    
+    # 与 pandas 按香港时间重采样的结果一致；数据从周期中间开始时丢弃不完整的首根
+    index = pd.date_range("2024-01-03 08:00", periods=1200, freq="4h")  # UTC 对齐的 4H，起点为香港时间 16:00
+    rng = np.random.default_rng(5)
+    close = 10 + np.cumsum(rng.normal(0, 0.1, len(index)))
+    base = pd.DataFrame({"open": close + rng.normal(0, 0.05, len(index)), "high": close + 1,
+                         "low": close - 1, "close": close, "volume": rng.uniform(1, 2, len(index))}, index=index)
+    agg = {"open": "first", "high": "max", "low": "min", "close": "last", "volume": "sum"}
+    local = base.tz_localize("UTC").tz_convert("Asia/Hong_Kong")
+    for bar, rule in (("1D", "1D"), ("1W", "W-MON"), ("1M", "MS")):
+        expected = local.resample(rule, closed="left", label="left").agg(agg).iloc[1:]
+        expected.index = expected.index.tz_convert("UTC").tz_localize(None)
+        actual = resample_ohlcv(base, bar)
+        assert actual.index.equals(expected.index.rename("timestamp")), bar
+        assert np.allclose(actual.to_numpy(), expected.to_numpy()), bar
+    
+    # 从周期开头开始的数据保留首根
+    aligned = base[base.index >= "2024-01-07 16:00"]
+    assert resample_ohlcv(aligned, "1W").index[0] == pd.Timestamp("2024-01-07 16:00")
+    
+    # 合成所需的基础K线过多时直接请求该周期（500 根周线约需 3500 根日线）
+    assert bars_needed("1D", "1W", 500) == 501 * 7 and bars_needed("4H", "4H", 100) == 100
+    fetcher = OKXDataFetcher(config={"data": {"store": {"enable": False}, "cache": False}})
+    requests = []
+    fetcher.fetch_klines = lambda symbol, interval, limit: requests.append((interval, limit)) or base
+    fetcher.fetch_timeframes("AR/USDT", ["1d", "1w"], limit=500, base_interval="1d")
+    assert requests == [("1d", 500), ("1w", 500)]
+    requests.clear()
+    fetcher.fetch_timeframes("AR/USDT", ["1d", "1w"], limit=100, base_interval="1d")
+    assert requests == [("1d", 101 * 7)]
+    print("✅ 日/周/月线边界与香港时间对齐，不完整的首根被丢弃")
+
+
+def test_candle_cache():
+    """测试K线缓存（收盘时过期、小 limit 切片、并发请求合并及首个请求失败）"""
+    print("\n" + "="*60)
+    print("🧪 测试K线缓存")
+    print("="*60)
+    
+    df = generate_mock_data(days=200)
+    now = {"ms": int(pd.Timestamp("2024-01-01 15:00").value // 1_000_000)}
+    clock = types.SimpleNamespace(time=lambda: now["ms"] / 1000)
+    calls = []
+    
+    def loader(limit):
+        calls.append(limit)
+        return df.tail(limit)
+    
+    with mock.patch("app.fetch_cache.time", clock):
+        cache = CandleCache()
+        assert cache.get("AR-USDT", "1D", 100, loader) is not None and calls == [100]
+        
+        # 较小的 limit 从已缓存的条目切片，较大的重新请求
+        assert cache.get("AR-USDT", "1D", 30, loader).equals(df.tail(30)) and calls == [100]
+        cache.get("AR-USDT", "1D", 150, loader)
+        assert calls == [100, 150]
+        
+        # 日线在 UTC 16:00 收盘：之前一直命中，收盘后过期重新请求
+        now["ms"] += 3_600_000 - 1
+        cache.get("AR-USDT", "1D", 150, loader)
+        assert calls == [100, 150]
+        now["ms"] += 1
+        cache.get("AR-USDT", "1D", 150, loader)
+        assert calls == [100, 150, 150]
+        
+        # 同一个键的并发请求只调用一次 loader，等待者得到同一份结果
+        release = threading.Event()
+        
+        def slow_loader(limit):
+            calls.append(limit)
+            release.wait(5)
+            if failing:
+                raise ConnectionError("OKX 不可用")
+            return df.tail(limit)
+        
+        def request(results):
+            try:
+                results.append(cache.get("AR-USDT", "4H", 50, slow_loader))
+            except ConnectionError as e:
+                results.append(e)
+        
+        cache.invalidate()
+        for failing in (False, True):
+            if failing:
+                now["ms"] += 4 * 3_600_000  # 上一轮的缓存已过期，刷新失败时不能返回旧数据
+            calls.clear()
+            leader, waiter = [], []
+            threads = [threading.Thread(target=request, args=(leader,))]
+            threads[0].start()
+            while not calls:
+                time.sleep(0.001)
+            coalesced = cache.coalesced
+            threads.append(threading.Thread(target=request, args=(waiter,)))
+            threads[1].start()
+            while cache.coalesced == coalesced:
+                time.sleep(0.001)
+            release.set()
+            for thread in threads:
+                thread.join(5)
+                assert not thread.is_alive()
+            release.clear()
+            assert calls == [50]
+            if failing:
+                # 失败的结果不缓存，等待者收到同一个异常，下一次请求重新获取
+                assert isinstance(leader[0], ConnectionError) and waiter[0] is leader[0]
+                failing = False
+                release.set()
+                assert cache.get("AR-USDT", "4H", 50, slow_loader).equals(df.tail(50)) and calls == [50, 50]
+            else:
+                assert leader[0].equals(waiter[0])
+    print(f"✅ 缓存统计: {cache.stats()}")
+
+
+def test_circuit_breaker():
+    """测试熔断（关闭 → 打开 → 半开只放行一次试探）和熔断时返回过期数据"""
+    print("\n" + "="*60)
+    print("🧪 测试熔断与过期数据")
+    print("="*60)
+    
+    now = {"s": 1000.0}
+    clock = types.SimpleNamespace(monotonic=lambda: now["s"])
+    with mock.patch("app.circuit_breaker.time", clock):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.CLOSED and breaker.allow()
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN and not breaker.allow()
+        now["s"] += 60
+        assert breaker.allow() and breaker.state == CircuitBreaker.HALF_OPEN
+        assert not breaker.allow()                  # 半开只放行一个试探请求
+        breaker.record_failure()                    # 试探失败：重新打开
+        assert breaker.state == CircuitBreaker.OPEN and breaker.retry_in() == 60
+        now["s"] += 60
+        assert breaker.allow()
+        breaker.record_success()
+        assert breaker.state == CircuitBreaker.CLOSED and breaker.allow()
+        
+        with MockOKXHTTPServer() as server:
+            fetcher = OKXDataFetcher(config={
+                "exchange": {"api_base": server.api_base},
+                "data": {"store": {"enable": False}, "cache": False,
+                         "circuit_breaker": {"failure_threshold": 2, "reset_timeout": 60}}
+            })
+            good = fetcher.fetch_klines("AR/USDT", "4h", 100)
+            failure = requests.exceptions.ConnectionError("connection refused")
+            with mock.patch.object(fetcher.http.session, "get", side_effect=failure) as get:
+                # 请求失败时返回最近一次成功获取的数据，标记为过期
+                for _ in range(2):
+                    stale = fetcher.fetch_klines("AR/USDT", "4h", 100)
+                    assert stale.attrs["stale"] and stale.equals(good)
+                assert get.call_count == 2
+                # 熔断后不再发出请求，直接返回过期数据
+                assert fetcher.fetch_klines("AR/USDT", "4h", 50).attrs["as_of"] == good.index[-1]
+                assert get.call_count == 2
+                try:
+                    fetcher._request_candles("AR-USDT", "4H", 100)
+                    raise AssertionError("熔断时应抛出 CircuitOpenError")
+                except CircuitOpenError:
+                    pass
+                # 没有可用的本地数据时报错
+                try:
+                    fetcher.fetch_klines("ETH/USDT", "4h", 100)
+                    raise AssertionError("无数据时应抛出 ConnectionError")
+                except ConnectionError:
+                    pass
+            # 到期后试探请求成功，恢复正常获取
+            now["s"] += 60
+            fresh = fetcher.fetch_klines("AR/USDT", "4h", 100)
+            assert not fresh.attrs.get("stale") and fetcher.breakers.states()["market/candles:AR-USDT"] == "closed"
+    print(f"✅ 熔断状态: {fetcher.breakers.states()}")
+
+
+def test_http_client():
+    """测试 HTTP 客户端的超时、重试、按主机的连接池和共享实例的配置检查"""
+    print("\n" + "="*60)
+    print("🧪 测试 HTTP 客户端")
+    print("="*60)
+    
+    client = HttpClient({"connect_timeout": 1.5, "read_timeout": 7, "retries": 2, "backoff_factor": 0,
+                         "backoff_jitter": 0, "hosts": {"127.0.0.1": 2}})
+    assert client._timeout(None) == (1.5, 7) and client._timeout(5) == (1.5, 5) and client._timeout((2, 3)) == (2, 3)
+    
+    params = {"instId": "AR-USDT", "bar": "4H", "limit": "10"}
+    with MockOKXHTTPServer() as server:
+        # 同一主机的请求复用连接，配置了上限的主机使用独立的连接池
+        for _ in range(5):
+            assert client.get(f"{server.api_base}/market/candles", params=params).status_code == 200
+        assert client._adapters["127.0.0.1"]._pool_maxsize == 2
+        stats = client.stats()[server.host]
+        assert stats["requests"] == 5 and stats["connections"] == 1 and stats["reuse_rate"] == 0.8
+    
+    # 5xx 按 retries 重试，重试用完后返回最后的响应
+    with MockOKXHTTPServer(error_rate=1.0) as server:
+        response = client.get(f"{server.api_base}/market/candles", params=params)
+        assert response.status_code == 500 and server.stats["requests"] == 3
+    
+    # 读取超时
+    with MockOKXHTTPServer(latency=0.5) as server:
+        slow = HttpClient({"read_timeout": 0.1, "retries": 0})
+        try:
+            slow.get(f"{server.api_base}/market/candles", params=params)
+            raise AssertionError("应当读取超时")
+        except requests.exceptions.ConnectionError:
+            pass
+    client.close()
+    slow.close()
+    
+    # 共享实例创建后传入不同的配置不会生效，发出警告
+    with mock.patch("app.http_client._default_client", None), mock.patch("app.http_client._default_config", None):
+        shared = get_http_client()
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            assert get_http_client() is shared and not caught
+            assert get_http_client({"read_timeout": 30}) is shared and caught[0].category is RuntimeWarning
+        shared.close()
+    print(f"✅ 连接复用: {stats}")
+
+
+def test_async_fetcher():
+    """测试并发获取引擎（含在事件循环中调用同步入口）和令牌桶限速"""
+    print("\n" + "="*60)
+    print("🧪 测试并发获取与限速")
+    print("="*60)
+    
+    class SlowFetcher:
+        """每次获取耗时 0.2 秒，BAD/USDT 获取失败"""
+        def fetch_klines(self, symbol, interval, limit=None):
+            time.sleep(0.2)
+            if symbol == "BAD/USDT":
+                raise ConnectionError("connection refused")
+            return pd.DataFrame({"close": [1.0]}, index=pd.DatetimeIndex(["2024-01-01"], name="timestamp"))
+    
+    engine = AsyncFetchEngine(SlowFetcher(), max_concurrency=8)
+    symbols = ["AR/USDT", "ETH/USDT", "SOL/USDT", "BAD/USDT"]
+    started = time.perf_counter()
+    result = engine.fetch_all_sync(symbols, ["4h", "1d"])
+    elapsed = time.perf_counter() - started
+    # 8 个任务同时在途，总耗时接近单个任务
+    assert elapsed < 0.6, f"并发获取耗时 {elapsed:.2f}s"
+    assert result["BAD/USDT"] == {"4h": None, "1d": None}
+    assert all(result[s][i] is not None for s in symbols[:3] for i in ["4h", "1d"])
+    
+    # 在运行中的事件循环里（如实时模式的收盘回调）调用同步入口
+    async def callback():
+        return engine.fetch_all_sync(["AR/USDT"], ["4h"])
+    assert asyncio.run(callback())["AR/USDT"]["4h"] is not None
+    
+    # 令牌桶：4 个请求 / 2 秒，用完后按 2 个/秒 补充
+    now = {"s": 100.0}
+    def sleep(seconds):
+        now["s"] += seconds
+    clock = types.SimpleNamespace(monotonic=lambda: now["s"], sleep=sleep)
+    with mock.patch("app.rate_limit.time", clock):
+        bucket = TokenBucket(4, 2.0)
+        assert all(bucket.try_acquire() for _ in range(4)) and not bucket.try_acquire()
+        now["s"] += 0.5
+        assert bucket.try_acquire() and not bucket.try_acquire()
+        now["s"] += 10                              # 空闲再久也不超过桶容量
+        assert bucket.try_acquire(4) and not bucket.try_acquire()
+        bucket.acquire(2)                           # 配额不足时等待 1 秒
+        assert now["s"] == 111.5
+    
+    # 同一接口共用一个桶，容量按 OKX 限速表
+    assert get_rate_limiter("market/history-candles") is get_rate_limiter("market/history-candles")
+    assert get_rate_limiter("market/history-candles").capacity == 20
+    print(f"✅ 8 个任务并发耗时 {elapsed:.2f}s")
+
+
+def test_backfill_resume():
+    """测试历史回补的断点续传（中断后已完成的分页不再请求）和断点规划参数校验"""
+    print("\n" + "="*60)
+    print("🧪 测试历史回补断点续传")
+    print("="*60)
+    
+    with tempfile.TemporaryDirectory() as root, MockOKXHTTPServer(latency=0.01) as server:
+        fetcher = OKXDataFetcher(config={
+            "exchange": {"api_base": server.api_base},
+            "data": {"cache": False, "store": {"dir": f"{root}/klines"},
+                     "backfill": {"workers": 1, "checkpoint_dir": f"{root}/backfill"}}
+        })
+        request_candles = fetcher._request_candles
+        requested, failing = [], {"after": 3}
+        
+        def request(inst_id, bar, limit=100, after=None, history=False):
+            if history:
+                if len(requested) >= failing["after"]:
+                    raise requests.exceptions.ConnectionError("connection reset")
+                requested.append(after)
+            return request_candles(inst_id, bar, limit, after, history)
+        
+        with mock.patch.object(fetcher, "_request_candles", side_effect=request):
+            # 第一次回补在第 4 页中断，已完成的 3 页写入断点
+            try:
+                fetcher.fetch_history("AR/USDT", "4h", limit=1000)
+                raise AssertionError("回补应在中途中断")
+            except requests.exceptions.ConnectionError:
+                pass
+            checkpoint = BackfillCheckpoint(f"{root}/backfill", "AR-USDT", "4H", fetcher.PAGE_SIZE)
+            saved = set(checkpoint.pages)
+            assert saved == set(requested) and len(saved) == 3
+            
+            # 再次回补只请求剩余的 7 页
+            interrupted, failing["after"] = list(requested), float("inf")
+            requested.clear()
+            df = fetcher.fetch_history("AR/USDT", "4h", limit=1000)
+            assert len(requested) == 7 and not saved & set(requested)
+        assert not checkpoint.path.exists()        # 完成后删除断点
+        
+        # 结果与不使用断点的完整回补一致，已收盘部分合并进本地存储
+        full = fetcher.fetch_history("AR/USDT", "4h", limit=1000, resume=False)
+        assert len(df) == 1000 and df.equals(full)
+        assert fetcher.store.count("AR-USDT", "4H") == 999
+        
+        # 断点首行的规划参数（周期:每页数量）不一致时丢弃旧断点，保存时重新写入
+        path = checkpoint.path
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"plan": "4H:100"}) + "\n")
+            page = full.iloc[:100]
+            rows = [[int(ts.value // 10**6), *values, True] for ts, values in zip(page.index, page.to_numpy().tolist())]
+            f.write(json.dumps({"cursor": interrupted[0], "rows": rows}) + "\n")
+            f.write('{"cursor": 1, "rows": [[')     # 中断时写了半行
+        assert set(BackfillCheckpoint(f"{root}/backfill", "AR-USDT", "4H", 100).pages) == {interrupted[0]}
+        other = BackfillCheckpoint(f"{root}/backfill", "AR-USDT", "4H", 50)
+        assert not other.pages
+        other.save(interrupted[1], fetcher._request_candles("AR-USDT", "4H", 50, interrupted[1], True))
+        with open(path, "r", encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        assert json.loads(lines[0]) == {"plan": "4H:50"} and len(lines) == 2
+    print(f"✅ 中断后续传只请求剩余 {len(requested)} 页（已完成 {len(saved)} 页）")
+
+
+def test_hedged_requests():
+    """测试对冲请求（对冲延迟、限速配额、错误响应时等待另一个请求）"""
+    print("\n" + "="*60)
+    print("🧪 测试对冲请求")
+    print("="*60)
+    
+    class FakeHttp:
+        """按地址返回固定耗时和状态码的 HTTP 客户端（状态码为异常时抛出）"""
+        def __init__(self, routes):
+            self.routes = routes
+            self.calls = []
+        
+        def get(self, url, params=None, timeout=None):
+            base = next(base for base in self.routes if url.startswith(base))
+            latency, status = self.routes[base]
+            self.calls.append(base)
+            time.sleep(latency)
+            if isinstance(status, Exception):
+                raise status
+            return types.SimpleNamespace(status_code=status, source=base)
+    
+    primary, mirror = "https://www.okx.com/api/v5", "https://aws.okx.com/api/v5"
+    url = f"{primary}/market/candles"
+    
+    # 样本不足 20 个时使用 max_delay，之后取主地址耗时的 p95（限制在 min_delay ~ max_delay 之间）
+    hedger = HedgedRequester(FakeHttp({primary: (0.0, 200)}), primary, mirror,
+                             min_delay=0.05, max_delay=2.0)
+    for _ in range(19):
+        hedger.get(url)
+    assert hedger.delay() == 2.0
+    hedger.get(url)
+    assert hedger.delay() == 0.05                  # 主地址很快：取下限
+    hedger._latencies.clear()
+    hedger._latencies.extend(np.arange(1, 101) / 100)
+    assert abs(hedger.delay() - np.quantile(np.arange(1, 101) / 100, 0.95)) < 1e-12
+    hedger._latencies.extend([5.0] * 200)
+    assert hedger.delay() == 2.0                   # 取上限
+    assert hedger.stats()["hedged"] == 0
+    
+    # 主地址慢、备用地址快：超过对冲延迟后请求备用地址，备用地址的响应先返回
+    http = FakeHttp({primary: (0.4, 200), mirror: (0.02, 200)})
+    bucket = TokenBucket(1, 100.0)
+    hedger = HedgedRequester(http, primary, mirror, max_delay=0.05,
+                             allow_hedge=lambda url: bucket.try_acquire())
+    started = time.perf_counter()
+    response = hedger.get(url)
+    elapsed = time.perf_counter() - started
+    assert response.source == mirror and elapsed < 0.3
+    # 对冲请求占用限速配额：配额用完后不再对冲，等待主地址
+    response = hedger.get(url)
+    assert response.source == primary and http.calls.count(mirror) == 1
+    time.sleep(0.5)                                # 等待第一次的主请求完成，计入节省的延迟
+    stats = hedger.stats()
+    assert stats["requests"] == 2 and stats["hedged"] == 1 and stats["hedge_wins"] == 1
+    assert stats["latency_saved_ms"] > 200
+    
+    # 获取器的对冲配额取自 OKX 接口的共享令牌桶
+    fetcher = OKXDataFetcher(config={"data": {"store": {"enable": False}}})
+    with mock.patch.dict("app.rate_limit._buckets", {"market/history-candles": TokenBucket(2, 100.0)}):
+        history_url = f"{primary}/market/history-candles"
+        assert [fetcher._hedge_budget(history_url) for _ in range(3)] == [True, True, False]
+    
+    # 错误响应（429 限速 / 5xx）或请求异常时等待另一个请求的结果
+    cases = [
+        ({primary: (0.2, 200), mirror: (0.0, 429)}, primary),
+        ({primary: (0.1, 500), mirror: (0.2, 200)}, mirror),
+        ({primary: (0.1, requests.exceptions.ConnectionError("reset")), mirror: (0.2, 200)}, mirror),
+    ]
+    for routes, winner in cases:
+        hedger = HedgedRequester(FakeHttp(routes), primary, mirror, max_delay=0.05)
+        assert hedger.get(url).source == winner
+        assert hedger.stats()["hedge_wins"] == (winner == mirror)
+    # 两个请求都是错误响应时返回后完成的那个
+    hedger = HedgedRequester(FakeHttp({primary: (0.1, 503), mirror: (0.0, 429)}), primary, mirror, max_delay=0.05)
+    assert hedger.get(url).status_code == 503
+    print(f"✅ 对冲统计: {stats}")
+
+
 def main():
     """主测试函数"""
     print("\n" + "="*60)
@@ -135,6 +1024,69 @@ def main():
         # 3. 测试可视化
         test_visualize(df)
         
+        # 4. 测试实时模式
+        test_stream_mode()
+        
+        # 5. 测试 REST 替身服务
+        test_http_stand_in()
+        
+        # 6. 测试数据质量检查
+        test_data_quality()
+        
+        # 7. 测试增量指标
+        test_streaming_indicators()
+        
+        # 8. 测试特征缓存
+        test_feature_cache()
+        
+        # 9. 测试 NumPy 指标内核
+        test_numpy_backend()
+        
+        # 10. 测试多交易对批量分析
+        test_batch_analysis()
+        
+        # 11. 测试参数网格
+        test_param_grid()
+        
+        # 12. 测试精简模式
+        test_lean_pipeline()
+        
+        # 13. 测试惰性指标列
+        test_lazy_indicators()
+        
+        # 14. 测试指标执行计划
+        test_indicator_plan()
+        
+        # 15. 测试滚动方差
+        test_rolling_variance()
+        
+        # 16. 测试逐根K线综合信号
+        test_signal_series()
+        
+        # 17. 测试本地K线存储
+        test_kline_store()
+        
+        # 18. 测试周期合成
+        test_resample()
+        
+        # 19. 测试K线缓存
+        test_candle_cache()
+        
+        # 20. 测试熔断与过期数据
+        test_circuit_breaker()
+        
+        # 21. 测试 HTTP 客户端
+        test_http_client()
+        
+        # 22. 测试并发获取与限速
+        test_async_fetcher()
+        
+        # 23. 测试历史回补断点续传
+        test_backfill_resume()
+        
+        # 24. 测试对冲请求
+        test_hedged_requests()
+        
         print("\n" + "="*60)
         print("✅ 所有测试完成！")
         print("="*60)
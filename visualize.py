@@ -60,7 +60,7 @@ class ChartVisualizer:
         )
         
         # MA20 和 MA60
-        if "MA20" in df.columns:
+        if "MA20" in df:
             fig.add_trace(
                 go.Scatter(
                     x=df.index,
@@ -71,7 +71,7 @@ class ChartVisualizer:
                 row=1, col=1
             )
         
-        if "MA60" in df.columns:
+        if "MA60" in df:
             fig.add_trace(
                 go.Scatter(
                     x=df.index,
@@ -121,7 +121,7 @@ class ChartVisualizer:
             )
         
         # 2. MACD
-        if "MACD" in df.columns and "MACD_hist" in df.columns:
+        if "MACD" in df and "MACD_hist" in df:
             fig.add_trace(
                 go.Scatter(
                     x=df.index,
@@ -132,7 +132,7 @@ class ChartVisualizer:
                 row=2, col=1
             )
             
-            if "MACD_signal" in df.columns:
+            if "MACD_signal" in df:
                 fig.add_trace(
                     go.Scatter(
                         x=df.index,
@@ -156,7 +156,7 @@ class ChartVisualizer:
             )
         
         # 3. RSI
-        if "RSI" in df.columns:
+        if "RSI" in df:
             fig.add_trace(
                 go.Scatter(
                     x=df.index,